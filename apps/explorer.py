@@ -3,8 +3,10 @@ GlassOS File Explorer (AeroExplorer) Application
 File manager with VFS integration.
 """
 
+import struct
+from itertools import islice
 from typing import Dict, Any, List, Optional
-from PySide6.QtCore import QObject, Signal, Slot, Property
+from PySide6.QtCore import Qt, QObject, Signal, Slot, Property
 from .base_app import BaseApp
 
 
@@ -15,6 +17,7 @@ class ExplorerApp(BaseApp):
     itemsChanged = Signal()
     selectionChanged = Signal()
     viewModeChanged = Signal()
+    _vfsChanged = Signal(object)  # Watch events, hopped onto the GUI thread
     
     def __init__(self, window_id: str, vfs=None, parent=None):
         super().__init__(window_id, vfs, parent)
@@ -26,6 +29,9 @@ class ExplorerApp(BaseApp):
         self._view_mode = "grid"  # "grid" or "list"
         self._history = ["/"]
         self._history_index = 0
+        self._watch = None
+        self._search_results = None  # Pending results of a filtered search
+        self._vfsChanged.connect(self._apply_changes, Qt.QueuedConnection)
     
     @Property(str, notify=currentPathChanged)
     def currentPath(self) -> str:
@@ -36,6 +42,7 @@ class ExplorerApp(BaseApp):
         if self._current_path != value:
             self._current_path = value
             self.currentPathChanged.emit()
+            self._watch_current()
             self._refresh_items()
             self._update_title()
     
@@ -76,21 +83,69 @@ class ExplorerApp(BaseApp):
             return
         
         nodes = self._vfs.list_directory(self._current_path)
-        self._items = []
+        self._items = [self._make_item(node) for node in nodes]
+        self._items.sort(key=self._sort_key)
+        self.itemsChanged.emit()
+    
+    def _make_item(self, node) -> Dict[str, Any]:
+        """Build the view item for a node."""
+        return {
+            "name": node.name,
+            "path": node.path,
+            "isDirectory": node.file_type.value == "directory",
+            "size": self._format_size(node.size),
+            "sizeBytes": node.size,
+            "modified": node.modified,
+            "icon": self._get_icon(node),
+        }
+    
+    def _sort_key(self, item: Dict[str, Any]) -> tuple:
+        """Folders first, then by name."""
+        return (not item["isDirectory"], item["name"].lower())
+    
+    def _watch_current(self):
+        """Watch the current directory in place of the previous one."""
+        if not self._vfs:
+            return
+        if self._watch is not None:
+            self._vfs.unwatch(self._watch)
+        self._watch = self._vfs.watch(self._current_path, False, self._vfsChanged.emit)
+    
+    @Slot(object)
+    def _apply_changes(self, events: list):
+        """Update the listing from watch events instead of re-listing."""
+        prefix = self._current_path.rstrip("/") + "/"
+        
+        def in_view(path: Optional[str]) -> bool:
+            return bool(path) and path.startswith(prefix) and "/" not in path[len(prefix):]
         
-        for node in sorted(nodes, key=lambda x: (x.file_type.value != "directory", x.name.lower())):
-            item = {
-                "name": node.name,
-                "path": node.path,
-                "isDirectory": node.file_type.value == "directory",
-                "size": self._format_size(node.size),
-                "sizeBytes": node.size,
-                "modified": node.modified,
-                "icon": self._get_icon(node),
-            }
-            self._items.append(item)
+        items = {item["path"]: item for item in self._items}
+        for event in events:
+            if not in_view(event.path) and not in_view(event.old_path):
+                # The directory itself (or an ancestor) was deleted, renamed or moved
+                old = event.old_path
+                if old and (self._current_path == old or self._current_path.startswith(old + "/")):
+                    self.currentPath = event.path + self._current_path[len(old):]
+                    return
+                if not self._vfs.is_directory(self._current_path):
+                    self.navigateTo("/")
+                    return
+                continue
+            if event.old_path:
+                items.pop(event.old_path, None)
+            if event.kind == "deleted" or not in_view(event.path):
+                items.pop(event.path, None)
+                continue
+            node = self._vfs.get_node(event.path)
+            if node is None:
+                items.pop(event.path, None)
+            else:
+                items[event.path] = self._make_item(node)
         
+        self._items = sorted(items.values(), key=self._sort_key)
+        self._selected_items = [path for path in self._selected_items if path in items]
         self.itemsChanged.emit()
+        self.selectionChanged.emit()
     
     def _format_size(self, size: int) -> str:
         """Format file size to human-readable string."""
@@ -199,10 +254,7 @@ class ExplorerApp(BaseApp):
             return False
         
         path = f"{self._current_path}/{name}" if self._current_path != "/" else f"/{name}"
-        if self._vfs.create_directory(path):
-            self._refresh_items()
-            return True
-        return False
+        return self._vfs.create_directory(path)
     
     @Slot(str, result=bool)
     def deleteItem(self, path: str) -> bool:
@@ -210,10 +262,7 @@ class ExplorerApp(BaseApp):
         if not self._vfs:
             return False
         
-        if self._vfs.delete(path):
-            self._refresh_items()
-            return True
-        return False
+        return self._vfs.delete(path)
     
     @Slot(str, str, result=bool)
     def renameItem(self, path: str, new_name: str) -> bool:
@@ -221,27 +270,64 @@ class ExplorerApp(BaseApp):
         if not self._vfs:
             return False
         
-        if self._vfs.rename(path, new_name):
-            self._refresh_items()
-            return True
-        return False
+        return self._vfs.rename(path, new_name)
     
     @Slot(str, result=list)
     def search(self, query: str) -> List[Dict[str, Any]]:
-        """Search for files."""
+        """
+        Search for files. Queries with filters (e.g. `type:file size:>1MB`)
+        return their first page straight away; moreResults() pages on.
+        """
+        self._search_results = None
         if not self._vfs or not query:
             return []
         
-        nodes = self._vfs.search(query, self._current_path)
-        return [
-            {
-                "name": n.name,
-                "path": n.path,
-                "isDirectory": n.file_type.value == "directory",
-                "icon": self._get_icon(n),
-            }
-            for n in nodes
-        ]
+        if self._vfs.is_structured_query(query):
+            self._search_results = self._vfs.query(query, self._current_path)
+            return self.moreResults(50)
+        nodes = self._vfs.search_ranked(query, self._current_path, limit=100)
+        return [self._search_item(n) for n in nodes]
+    
+    @Slot(int, result=list)
+    def moreResults(self, count: int) -> List[Dict[str, Any]]:
+        """Get up to `count` further results of the last filtered search."""
+        if self._search_results is None:
+            return []
+        nodes = list(islice(self._search_results, count))
+        if len(nodes) < count:
+            self._search_results = None
+        return [self._search_item(n) for n in nodes]
+    
+    def _search_item(self, node) -> Dict[str, Any]:
+        return {
+            "name": node.name,
+            "path": node.path,
+            "isDirectory": node.file_type.value == "directory",
+            "icon": self._get_icon(node),
+        }
+    
+    @Slot(str, result=dict)
+    def previewInfo(self, path: str) -> Dict[str, Any]:
+        """Get a file's format and, for images, its pixel size from the header alone."""
+        if not self._vfs:
+            return {}
+        kind = self._vfs.content_type(path)
+        if kind is None:
+            return {}
+        header = self._vfs.read_range(path, 0, 32) or b""
+        width, height = self._image_size(kind, header)
+        return {"contentType": kind, "width": width, "height": height}
+    
+    def _image_size(self, kind: str, header: bytes) -> tuple:
+        """Read image dimensions from a format header; (0, 0) if unknown."""
+        if kind == "png" and len(header) >= 24:
+            return struct.unpack(">II", header[16:24])
+        if kind == "gif" and len(header) >= 10:
+            return struct.unpack("<HH", header[6:10])
+        if kind == "bmp" and len(header) >= 26:
+            width, height = struct.unpack("<ii", header[18:26])
+            return width, abs(height)
+        return 0, 0
     
     @Slot()
     def refresh(self):
@@ -250,12 +336,15 @@ class ExplorerApp(BaseApp):
     
     def onStart(self):
         """Initialize explorer."""
+        self._watch_current()
         self._refresh_items()
         self._update_title()
     
     def onStop(self):
         """Cleanup explorer."""
-        pass
+        if self._watch is not None:
+            self._vfs.unwatch(self._watch)
+            self._watch = None
     
     def getQmlComponent(self) -> str:
         return "apps/Explorer.qml"
@@ -269,6 +358,8 @@ class ExplorerApp(BaseApp):
     def restoreState(self, state: Dict[str, Any]):
         self._current_path = state.get("current_path", "/")
         self._view_mode = state.get("view_mode", "grid")
+        if self._watch is not None:
+            self._watch_current()
         self._refresh_items()
         self._update_title()
         self.viewModeChanged.emit()
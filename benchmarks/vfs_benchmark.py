@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+GlassOS VFS Micro-Benchmarks
+Measures how Virtual File System operations scale with tree size.
+
+Usage:
+    python benchmarks/vfs_benchmark.py populate [max_entries]
+    python benchmarks/vfs_benchmark.py substring [max_nodes]
+    python benchmarks/vfs_benchmark.py coldstart [nodes]
+    python benchmarks/vfs_benchmark.py stress [seconds] [readers]
+    python benchmarks/vfs_benchmark.py memory [nodes]
+"""
+
+import gc
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.vfs import VirtualFileSystem
+from core.vfs_search import TrigramIndex
+
+WORDS = [
+    "report", "invoice", "holiday", "photo", "draft", "notes", "budget",
+    "meeting", "project", "archive", "backup", "summary", "scan", "letter",
+    "music", "track", "video", "clip", "final", "review", "plan", "data",
+]
+EXTENSIONS = [".txt", ".md", ".jpg", ".png", ".mp3", ".pdf", ".json", ".log"]
+
+
+def make_vfs(root: str) -> VirtualFileSystem:
+    """Create an initialized VFS in a scratch directory."""
+    vfs = VirtualFileSystem(Path(root))
+    vfs.initialize()
+    return vfs
+
+
+def bench_populate(max_entries: int = 100_000):
+    """
+    Populate a single directory with N files at doubling sizes.
+    Linear scaling shows up as a flat per-entry cost.
+    """
+    print(f"{'entries':>10} {'total (s)':>10} {'per entry (µs)':>15}")
+    sizes = []
+    n = max_entries
+    while n >= 1000 and len(sizes) < 4:
+        sizes.insert(0, n)
+        n //= 2
+    
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as root:
+            vfs = make_vfs(root)
+            vfs.create_directory("/Bulk")
+            start = time.perf_counter()
+            for i in range(size):
+                vfs.create_file(f"/Bulk/file_{i}.txt", "x")
+            elapsed = time.perf_counter() - start
+            vfs.flush()
+        print(f"{size:>10} {elapsed:>10.2f} {elapsed / size * 1e6:>15.1f}")
+
+
+def make_names(count: int, seed: int = 42) -> list:
+    """Generate realistic-looking file names."""
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(WORDS)}_{rng.choice(WORDS)}-{rng.randint(0, 99999)}{rng.choice(EXTENSIONS)}"
+        for _ in range(count)
+    ]
+
+
+def bench_substring(max_nodes: int = 1_000_000):
+    """
+    Compare trigram-backed substring search against a linear name scan
+    at 10k, 100k and 1M names. Trigram time tracks the number of hits,
+    scan time tracks the number of names.
+    """
+    queries = ["invoice", "port_", "-123", "oto", "summary_backup", "zzz", "al"]
+    print(f"{'nodes':>10} {'hits':>8} {'build (s)':>10} {'scan (ms)':>10} "
+          f"{'trigram (ms)':>13} {'speedup':>8}")
+    size = 10_000
+    while size <= max_nodes:
+        names = make_names(size)
+        lowered = [name.lower() for name in names]
+        
+        start = time.perf_counter()
+        index = TrigramIndex()
+        for inode, name in enumerate(names):
+            index.add(inode, name)
+        build = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        for query in queries:
+            [i for i, name in enumerate(lowered) if query in name]
+        scan = (time.perf_counter() - start) / len(queries)
+        
+        hits = 0
+        start = time.perf_counter()
+        for query in queries:
+            hits += len([i for i in index.candidates(query) if query in lowered[i]])
+        trigram = (time.perf_counter() - start) / len(queries)
+        
+        print(f"{size:>10} {hits:>8} {build:>10.2f} {scan * 1e3:>10.2f} "
+              f"{trigram * 1e3:>13.2f} {scan / trigram:>7.1f}x")
+        size *= 10
+
+
+def write_legacy_index(root: Path, nodes: int, per_dir: int = 1000):
+    """
+    Write a JSON index (the pre-binary format) holding about `nodes` nodes,
+    streamed entry by entry so the generator itself stays small.
+    """
+    names = make_names(per_dir)
+    dirs = max(nodes // (per_dir + 1), 1)
+    stamp = "2024-01-01T12:00:00.000000"
+    
+    def entry(path, name, file_type, size, content_hash, children):
+        return json.dumps(path) + ":" + json.dumps({
+            "name": name, "path": path, "file_type": file_type, "size": size,
+            "created": stamp, "modified": stamp, "content_hash": content_hash,
+            "children": children, "metadata": {},
+        }, indent=2)
+    
+    with open(root / ".vfs_index.json", "w", encoding="utf-8") as f:
+        f.write('{\n"nodes": {\n')
+        f.write(entry("/", "root", "directory", 0, None, [f"/dir_{d}" for d in range(dirs)]))
+        for d in range(dirs):
+            dir_path = f"/dir_{d}"
+            children = [f"{dir_path}/{name}" for name in names]
+            f.write(",\n" + entry(dir_path, f"dir_{d}", "directory", 0, None, children))
+            for name, path in zip(names, children):
+                f.write(",\n" + entry(path, name, "file", 1, "0" * 64, []))
+        f.write('\n},\n"journal_seq": 0\n}\n')
+    return dirs * (per_dir + 1) + 1
+
+
+def index_bytes(root: Path) -> int:
+    """Size of a binary index: the root file plus its per-directory shards."""
+    shards = root / ".vfs_shards"
+    size = (root / ".vfs_index.bin").stat().st_size
+    if shards.exists():
+        size += sum(shard.stat().st_size for shard in shards.iterdir())
+    return size
+
+
+def bench_coldstart(nodes: int = 1_000_000):
+    """
+    Time initialize() for a large tree, first from a JSON index (which is
+    migrated on the way), then from the binary index it was migrated to,
+    fully loaded and with shards left for first access.
+    """
+    print(f"{'format':>13} {'nodes':>10} {'index (MB)':>11} {'startup (s)':>12} "
+          f"{'per node (µs)':>14} {'first search (s)':>17}")
+    with tempfile.TemporaryDirectory() as root:
+        root = Path(root)
+        count = write_legacy_index(root, nodes)
+        runs = [("json", False), ("binary", False), ("binary lazy", True)]
+        for label, lazy in runs:
+            if label == "json":
+                size = (root / ".vfs_index.json").stat().st_size / 1e6
+            else:
+                size = index_bytes(root) / 1e6
+            vfs = VirtualFileSystem(root, journal=False, lazy_shards=lazy)
+            start = time.perf_counter()
+            vfs.initialize()
+            elapsed = time.perf_counter() - start
+            
+            # Name indexes (and lazy shards) are loaded on demand, so the first search pays for them
+            start = time.perf_counter()
+            vfs.search("invoice")
+            search = time.perf_counter() - start
+            print(f"{label:>13} {count:>10} {size:>11.1f} {elapsed:>12.2f} "
+                  f"{elapsed / count * 1e6:>14.1f} {search:>17.2f}")
+            del vfs
+
+
+def bench_memory(nodes: int = 200_000):
+    """
+    Measure memory per node with tracemalloc: the tree as loaded from a
+    binary index, then with a snapshot of it held as well. Loading a
+    shard freezes it (to tell unchanged shards apart at save time), so
+    the loaded figure already includes the copies a snapshot shares.
+    """
+    print(f"{'stage':>10} {'nodes':>10} {'traced (MB)':>12} {'bytes/node':>11} {'peak (MB)':>10}")
+    with tempfile.TemporaryDirectory() as root:
+        root = Path(root)
+        count = write_legacy_index(root, nodes)
+        VirtualFileSystem(root, journal=False).initialize()  # Migrates to the binary index
+        gc.collect()
+        
+        # Load every shard, or only their stubs would be measured
+        tracemalloc.start()
+        vfs = VirtualFileSystem(root, journal=False, lazy_shards=False)
+        vfs.initialize()
+        gc.collect()
+        loaded, peak = tracemalloc.get_traced_memory()
+        snapshot = vfs.snapshot()
+        gc.collect()
+        held, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        for label, traced in (("loaded", loaded), ("snapshot", held)):
+            print(f"{label:>10} {count:>10} {traced / 1e6:>12.1f} {traced / count:>11.0f} "
+                  f"{peak / 1e6:>10.1f}")
+        snapshot.close()
+
+
+def run_stress(seconds: float = 5, readers: int = 4) -> Tuple[Dict[str, int], List[str]]:
+    """
+    Run reader threads against writers that keep renaming, moving and
+    rewriting, and check that readers never observe a half-applied change.
+    
+    Returns:
+        Read and write round counts, and the violations seen
+    """
+    with tempfile.TemporaryDirectory() as root:
+        vfs = make_vfs(root)
+        vfs.create_file("/A/stress_file_a.txt", "0")
+        vfs.create_directory("/B")
+        for i in range(200):
+            vfs.create_file(f"/A/filler_{i}.txt", "filler")
+        total_files = vfs.get_stats()["total_files"]
+        
+        stop = threading.Event()
+        errors = []
+        counts = {"reads": 0, "writes": 0}
+        
+        def writer():
+            names = ["stress_file_a.txt", "stress_file_b.txt"]
+            dirs = ["/A", "/B"]
+            n = 0
+            while not stop.is_set():
+                here = f"{dirs[n % 2]}/{names[n % 2]}"
+                vfs.write_file(here, str(n))
+                if not vfs.rename(here, names[(n + 1) % 2]):
+                    errors.append(f"rename of {here} failed")
+                if not vfs.move(f"{dirs[n % 2]}/{names[(n + 1) % 2]}", dirs[(n + 1) % 2]):
+                    errors.append("move failed")
+                n += 1
+                counts["writes"] += 1
+        
+        def reader():
+            reads = 0
+            while not stop.is_set():
+                # Every call sees the file exactly once, whatever the writer is doing
+                hits = vfs.search("stress_file")
+                if len(hits) != 1:
+                    errors.append(f"search saw {len(hits)} copies")
+                for directory in ("/A", "/B"):
+                    listed = [node.name for node in vfs.list_directory(directory)
+                              if node.name.startswith("stress_")]
+                    if len(listed) > 1:
+                        errors.append(f"listing of {directory} saw {listed}")
+                stats = vfs.get_stats()
+                if stats["total_files"] != total_files:
+                    errors.append(f"aggregates saw {stats['total_files']} files")
+                reads += 1
+            counts["reads"] += reads
+        
+        threads = [threading.Thread(target=writer)]
+        threads += [threading.Thread(target=reader) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        vfs.flush()
+    return counts, errors
+
+
+def bench_stress(seconds: int = 5, readers: int = 4):
+    """Run the reader/writer stress check. Exits non-zero on any violation."""
+    counts, errors = run_stress(seconds, readers)
+    print(f"{readers} readers, {seconds}s: {counts['reads']} read rounds, "
+          f"{counts['writes']} write rounds, {len(errors)} violations")
+    for error in errors[:10]:
+        print(f"  {error}")
+    return 1 if errors else 0
+
+
+BENCHMARKS = {
+    "populate": bench_populate,
+    "substring": bench_substring,
+    "coldstart": bench_coldstart,
+    "stress": bench_stress,
+    "memory": bench_memory,
+}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(__doc__)
+        return 1
+    args = [int(arg) for arg in sys.argv[2:]]
+    return BENCHMARKS[sys.argv[1]](*args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,15 +4,17 @@ Main container for the desktop, taskbar, and applications.
 """
 
 import sys
+from itertools import islice
 from pathlib import Path
 from typing import Dict, Any, Optional
 from PySide6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QApplication
-from PySide6.QtCore import Qt, QUrl, QObject, Signal, Slot, Property, QTimer
+from PySide6.QtCore import Qt, QUrl, QObject, Signal, Slot, Property, QTimer, QByteArray
 from PySide6.QtGui import QScreen, QColor, QIcon
 from PySide6.QtQml import QQmlApplicationEngine, QQmlContext
 
 from .config import Config
 from .vfs import VirtualFileSystem
+from .vfs_sync import MirrorSync
 from .window_manager import WindowManager
 
 
@@ -145,9 +147,33 @@ class SystemProvider(QObject):
 class VFSProvider(QObject):
     """Provides VFS access to QML."""
     
+    # Watched path and its batch of change events; emitted from the VFS
+    # watch thread, so connections to GUI objects are queued
+    pathChanged = Signal(str, list)
+    
     def __init__(self, vfs: VirtualFileSystem, parent=None):
         super().__init__(parent)
         self._vfs = vfs
+        self._watches = {}  # Watched path -> VFS watch
+    
+    @Slot(str, bool)
+    def watch(self, path: str, recursive: bool = False):
+        """Start emitting pathChanged for changes under a path."""
+        if path in self._watches:
+            return
+        self._watches[path] = self._vfs.watch(
+            path, recursive,
+            lambda events: self.pathChanged.emit(path, [
+                {"kind": e.kind, "path": e.path, "oldPath": e.old_path or ""} for e in events
+            ]),
+        )
+    
+    @Slot(str)
+    def unwatch(self, path: str):
+        """Stop emitting pathChanged for a path."""
+        watch = self._watches.pop(path, None)
+        if watch is not None:
+            self._vfs.unwatch(watch)
     
     @Slot(str, result=list)
     def listDirectory(self, path: str) -> list:
@@ -163,6 +189,20 @@ class VFSProvider(QObject):
             for n in nodes
         ]
     
+    @Slot(str, int, int, str, result=list)
+    def listDirectoryPage(self, path: str, offset: int, limit: int, sort_key: str = "type") -> list:
+        nodes = self._vfs.iter_directory(path, offset, limit, sort_key or None)
+        return [
+            {
+                "name": n.name,
+                "path": n.path,
+                "isDirectory": n.file_type.value == "directory",
+                "size": n.size,
+                "modified": n.modified,
+            }
+            for n in nodes
+        ]
+    
     @Slot(str, result=str)
     def readFile(self, path: str) -> str:
         content = self._vfs.read_file(path)
@@ -172,6 +212,29 @@ class VFSProvider(QObject):
     def writeFile(self, path: str, content: str) -> bool:
         return self._vfs.write_file(path, content)
     
+    @Slot(str, int, int, result=QByteArray)
+    def readRange(self, path: str, offset: int, length: int) -> QByteArray:
+        data = self._vfs.read_range(path, offset, length)
+        return QByteArray(data or b"")
+    
+    @Slot(str, result=str)
+    def contentType(self, path: str) -> str:
+        return self._vfs.content_type(path) or ""
+    
+    @Slot(str, result=dict)
+    def getUsage(self, path: str) -> dict:
+        usage = self._vfs.get_usage(path)
+        if usage is None:
+            return {}
+        return {
+            "bytes": usage["bytes"],
+            "files": usage["files"],
+            "directories": usage["directories"],
+            "quotaBytes": usage["quota_bytes"] if usage["quota_bytes"] is not None else -1,
+            "quotaFiles": usage["quota_files"] if usage["quota_files"] is not None else -1,
+            "availableBytes": usage["available_bytes"] if usage["available_bytes"] is not None else -1,
+        }
+    
     @Slot(str, result=bool)
     def createDirectory(self, path: str) -> bool:
         return self._vfs.create_directory(path)
@@ -180,13 +243,21 @@ class VFSProvider(QObject):
     def delete(self, path: str) -> bool:
         return self._vfs.delete(path)
     
+    @Slot(str, str, result=bool)
+    def move(self, path: str, dest_dir: str) -> bool:
+        return self._vfs.move(path, dest_dir)
+    
     @Slot(str, result=bool)
     def exists(self, path: str) -> bool:
         return self._vfs.exists(path)
     
     @Slot(str, str, result=list)
     def search(self, query: str, path: str = "/") -> list:
-        nodes = self._vfs.search(query, path)
+        if self._vfs.is_structured_query(query):
+            # Filters stream from the most selective index; stop at the first page
+            nodes = islice(self._vfs.query(query, path), 100)
+        else:
+            nodes = self._vfs.search_ranked(query, path, limit=100)
         return [
             {
                 "name": n.name,
@@ -195,6 +266,18 @@ class VFSProvider(QObject):
             }
             for n in nodes
         ]
+    
+    @Slot(str, str, result=list)
+    def searchContent(self, query: str, path: str = "/") -> list:
+        nodes = self._vfs.search_content(query, path)
+        return [
+            {
+                "name": n.name,
+                "path": n.path,
+                "isDirectory": False,
+            }
+            for n in nodes
+        ]
 
 
 class StorageProvider(QObject):
@@ -205,9 +288,10 @@ class StorageProvider(QObject):
     clipboardChanged = Signal()
     desktopUpdated = Signal()
     
-    def __init__(self, storage_root: Path, parent=None):
+    def __init__(self, storage_root: Path, parent=None, mirror: Optional[MirrorSync] = None):
         super().__init__(parent)
         self._storage_root = storage_root
+        self._mirror = mirror  # Keeps the VFS index of these files current
         self._current_wallpaper = ""
         self._system_volume = 75
         self._desktop_icons = [] # List of {name, icon, app, x, y}
@@ -279,6 +363,17 @@ class StorageProvider(QObject):
              clean_path = vfs_path.lstrip("/").replace("\\", "/")
         return self._storage_root / clean_path
     
+    def _mirror_changed(self, *real_paths: Path):
+        """Queue a resync of the VFS mirror for paths just changed on disk."""
+        if self._mirror is None:
+            return
+        for real_path in real_paths:
+            try:
+                relative = real_path.relative_to(self._storage_root)
+            except ValueError:
+                continue
+            self._mirror.notify("/" + str(relative).replace("\\", "/"))
+    
     def _is_safe_path(self, path: Path) -> bool:
         """Check if path is within storage root."""
         try:
@@ -366,6 +461,7 @@ class StorageProvider(QObject):
                     shutil.copy2(source_real, target_path)
             elif self._clipboard_op == "cut":
                 shutil.move(source_real, target_path)
+                self._mirror_changed(source_real)
                 self._clipboard_path = "" # Clear clipboard after cut
                 self._clipboard_op = ""
                 self.clipboardChanged.emit()
@@ -374,6 +470,7 @@ class StorageProvider(QObject):
                 if source_was_desktop:
                     self.desktopUpdated.emit()
                 
+            self._mirror_changed(target_path)
             print(f"📋 Pasted to {target_dir_vfs}")
             return True
         except Exception as e:
@@ -501,6 +598,7 @@ class StorageProvider(QObject):
                 json.dump(metadata, f)
             
             real_path.rename(target_path)
+            self._mirror_changed(real_path, target_path, meta_file)
             print(f"🗑 Moved to Trash: {vfs_path} -> {trash_name}")
             
             # Emit signal if we touched the desktop
@@ -538,6 +636,7 @@ class StorageProvider(QObject):
                 
             trash_item.rename(target_path)
             meta_file.unlink()
+            self._mirror_changed(trash_item, meta_file, target_path)
             print(f"♻ Restored from Trash: {trash_name} -> {target_path}")
             return True
         except Exception as e:
@@ -554,6 +653,7 @@ class StorageProvider(QObject):
                     shutil.rmtree(item)
                 else:
                     item.unlink()
+            self._mirror_changed(self._trash_dir)
             print("🧹 Recycle Bin emptied")
             return True
         except Exception as e:
@@ -587,6 +687,30 @@ class StorageProvider(QObject):
         
         return sorted(items, key=lambda x: (not x["isDirectory"], x["name"].lower()))
     
+    @Slot(str, str, result=list)
+    def search(self, query: str, vfs_path: str = "/") -> list:
+        """
+        Search files by name, or with filters such as `type:file size:>1MB
+        modified:<7d`, from the VFS mirror's indexes instead of the disk.
+        """
+        if self._mirror is None:
+            return []
+        try:
+            results = self._mirror.search(query, vfs_path)
+        except ValueError as e:
+            print(f"⚠️  Invalid search: {e}")
+            return []
+        return [
+            {
+                "name": node.name,
+                "path": path,
+                "isDirectory": node.file_type.value == "directory",
+                "size": node.size,
+                "modified": node.mtime,
+            }
+            for path, node in results
+        ]
+    
     @Slot(result=list)
     def getWallpapers(self) -> list:
         """Get list of available wallpapers."""
@@ -633,7 +757,11 @@ class StorageProvider(QObject):
         
         try:
             real_path.parent.mkdir(parents=True, exist_ok=True)
+            if self._mirror is not None and real_path.is_file():
+                # The content being replaced joins the file's version history
+                self._mirror.keep_version(vfs_path, content.encode("utf-8"))
             real_path.write_text(content, encoding="utf-8")
+            self._mirror_changed(real_path)
             # NOTE: Do NOT emit desktopUpdated here - the QML side adds the icon directly
             # to avoid race conditions causing ghost duplicates.
             return True
@@ -641,6 +769,24 @@ class StorageProvider(QObject):
             print(f"Error writing file: {e}")
             return False
     
+    @Slot(str, result=list)
+    def listVersions(self, vfs_path: str) -> list:
+        """List a file's earlier saved versions, oldest first."""
+        if self._mirror is None:
+            return []
+        return self._mirror.list_versions(vfs_path)
+    
+    @Slot(str, int, result=str)
+    def readVersion(self, vfs_path: str, version: int) -> str:
+        """Read an earlier saved version of a text file; empty if unavailable."""
+        data = self._mirror.read_version(vfs_path, version) if self._mirror is not None else None
+        if data is None:
+            return ""
+        try:
+            return data.decode("utf-8")
+        except UnicodeDecodeError:
+            return ""
+    
     @Slot(str, result=bool)
     def exists(self, vfs_path: str) -> bool:
         """Check if a path exists."""
@@ -669,6 +815,7 @@ class StorageProvider(QObject):
         
         try:
             real_path.mkdir(parents=True, exist_ok=True)
+            self._mirror_changed(real_path)
             print(f"📁 Created directory: {vfs_path}")
             # NOTE: Do NOT emit desktopUpdated here - the QML side adds the icon directly
             # to avoid race conditions causing ghost duplicates. The refresh will happen
@@ -692,6 +839,7 @@ class StorageProvider(QObject):
                 shutil.rmtree(real_path)
             else:
                 real_path.unlink()
+            self._mirror_changed(real_path)
             print(f"🗑 Permanently Deleted: {vfs_path}")
             if "/Desktop/" in vfs_path:
                 self.desktopUpdated.emit()
@@ -712,6 +860,7 @@ class StorageProvider(QObject):
             new_path = real_path.parent / new_name
             
             real_path.rename(new_path)
+            self._mirror_changed(real_path, new_path)
             print(f"✏ Renamed: {real_path.name} -> {new_name}")
             if "/Desktop/" in vfs_path:
                 self.desktopUpdated.emit()
@@ -740,6 +889,7 @@ class StorageProvider(QObject):
                 
             import shutil
             shutil.move(str(source_real), str(target_path))
+            self._mirror_changed(source_real, target_path)
             print(f"📦 Moved: {source_vfs} -> {dest_dir_vfs}")
             
             # Check if source or dest is desktop to signal update
@@ -825,7 +975,10 @@ class DesktopEnvironment(QObject):
         
         # Initialize storage provider for real file access
         storage_root = Path(__file__).parent.parent / "Storage" / "User"
-        self.storage_provider = StorageProvider(storage_root, self)
+        # Mirrored into the VFS so real files share its search indexes
+        self.storage_mirror = MirrorSync(vfs, storage_root)
+        self.storage_provider = StorageProvider(storage_root, self, self.storage_mirror)
+        self.storage_mirror.start()
         
         # Initialize system services
         from .system_services import (
@@ -3,14 +3,98 @@ GlassOS Virtual File System (VFS)
 Provides a sandboxed file system for applications.
 """
 
+import io
 import json
 import os
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Any, Callable, Iterator, Sequence, Set, Union
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from enum import Enum
+from types import MappingProxyType
+import fnmatch
+import gc
+import hashlib
+import heapq
+from itertools import islice
+import struct
 import threading
+import time
+import weakref
+
+from .vfs_backend import VFSBackend
+from .vfs_blobstore import BlobStore
+from .vfs_compression import BodyCodec, DEFAULT_LEVEL, DEFAULT_THRESHOLD
+from .vfs_format import NO_STRING, SHARD_KIND, IndexReader, StringTable, new_columns, write_index
+from .vfs_history import HISTORY_SIZE_LIMIT, DeltaWorker, apply_delta, make_delta, version_hashes
+from .vfs_journal import VFSJournal
+from .vfs_lock import RWLock
+from .vfs_persistence import FSYNC_POLICIES, PersistenceStats, PersistenceWorker, fsync_directory
+from .vfs_query import Query, parse_query
+from .vfs_snapshot import SnapshotNode, VFSSnapshot
+from .vfs_stream import VFSReadStream, VFSWriteStream
+from .vfs_watch import Watch, WatchDispatcher, WatchEvent
+from .vfs_search import (
+    NameIndex, TrigramIndex, SortedIndex, ContentIndex, ContentIndexer, score_name, recency_bonus
+)
+
+
+def parse_timestamp(value: Optional[str]) -> float:
+    """Convert an ISO 8601 string to epoch seconds; 0.0 if missing or invalid."""
+    try:
+        return datetime.fromisoformat(value).timestamp() if value else 0.0
+    except ValueError:
+        return 0.0
+
+
+# Leading bytes of common binary formats
+CONTENT_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"%PDF-", "pdf"),
+    (b"PK\x03\x04", "zip"),
+    (b"\x1f\x8b", "gzip"),
+    (b"ID3", "mp3"),
+    (b"OggS", "ogg"),
+)
+# "BM" alone starts plenty of text, so a bitmap's header must also hold
+# its file size and one of these DIB header sizes (BITMAPCOREHEADER to
+# BITMAPV5HEADER)
+BMP_DIB_HEADER_SIZES = (12, 40, 52, 56, 64, 108, 124)
+
+
+def detect_content_type(header: bytes, size: Optional[int] = None) -> str:
+    """
+    Classify a body by its first bytes.
+    
+    Args:
+        header: Leading bytes of the body
+        size: Total body size, checked against the size a header declares
+    """
+    for signature, name in CONTENT_SIGNATURES:
+        if header.startswith(signature):
+            return name
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    if header[:2] == b"BM" and len(header) >= 18:
+        declared, = struct.unpack_from("<I", header, 2)
+        dib_size, = struct.unpack_from("<I", header, 14)
+        if dib_size in BMP_DIB_HEADER_SIZES and (declared == size if size is not None
+                                                   else declared >= 14 + dib_size):
+            return "bmp"
+    if b"\0" in header:
+        return "binary"
+    try:
+        header.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the header is fine
+        if e.start < len(header) - 3:
+            return "binary"
+    return "text"
 
 
 class FileType(Enum):
@@ -20,107 +104,274 @@ class FileType(Enum):
     LINK = "link"
 
 
-@dataclass
+# File type codes used by the binary index
+FILE_TYPE_CODES = {FileType.FILE: 0, FileType.DIRECTORY: 1, FileType.LINK: 2}
+FILE_TYPES_BY_CODE = {code: file_type for file_type, code in FILE_TYPE_CODES.items()}
+
+# Shared by every node without children or metadata, so a file costs no
+# containers; both are read-only
+EMPTY_CHILDREN: Dict[str, "VFSNode"] = MappingProxyType({})
+EMPTY_METADATA: Dict[str, Any] = MappingProxyType({})
+
+
+@dataclass(eq=False, slots=True)
 class VFSNode:
-    """Represents a node (file or directory) in the VFS."""
+    """
+    Represents a node (file or directory) in the VFS.
+    Nodes carry a stable inode number and a parent pointer, and directories
+    map child names to child nodes in insertion order. The full path is
+    derived on demand, so renames and moves never touch descendants.
+    
+    Nodes are slotted, and files share one empty children mapping.
+    Metadata is replaced rather than updated in place (nodes without any
+    share EMPTY_METADATA), which also lets snapshots share it.
+    
+    `frozen` caches the node's SnapshotNode. Any change to a node clears
+    it on the node and its ancestors, so unchanged subtrees are shared
+    between snapshots.
+    """
     name: str
-    path: str
     file_type: FileType
+    inode: int = 0
+    parent: Optional["VFSNode"] = field(default=None, repr=False, compare=False)
     size: int = 0
-    created: str = ""
-    modified: str = ""
-    content: Optional[str] = None
-    children: List[str] = None
+    ctime: float = 0.0  # Creation time, epoch seconds
+    mtime: float = 0.0  # Modification time, epoch seconds
+    content_hash: Optional[str] = None  # Body lives in the blob store
+    children: Dict[str, "VFSNode"] = field(default=None, repr=False)  # Ordered name -> node
     metadata: Dict[str, Any] = None
     
+    # Subtree aggregates for directories, maintained on every mutation
+    total_size: int = 0
+    file_count: int = 0
+    dir_count: int = 0
+    
+    frozen: Optional[SnapshotNode] = field(default=None, repr=False, compare=False)
+    
     def __post_init__(self):
         if self.children is None:
-            self.children = []
-        if self.metadata is None:
-            self.metadata = {}
-        if not self.created:
-            self.created = datetime.now().isoformat()
-        if not self.modified:
-            self.modified = self.created
-    
-    def to_dict(self) -> Dict:
-        """Convert node to dictionary."""
+            self.children = {} if self.file_type == FileType.DIRECTORY else EMPTY_CHILDREN
+        if not self.metadata:
+            self.metadata = EMPTY_METADATA
+        if not self.ctime:
+            self.ctime = time.time()
+        if not self.mtime or self.mtime == self.ctime:
+            self.mtime = self.ctime  # One float object for both when unmodified
+    
+    @property
+    def created(self) -> str:
+        """Creation time as an ISO 8601 string."""
+        return datetime.fromtimestamp(self.ctime).isoformat()
+    
+    @property
+    def modified(self) -> str:
+        """Modification time as an ISO 8601 string."""
+        return datetime.fromtimestamp(self.mtime).isoformat()
+    
+    @property
+    def path(self) -> str:
+        """Full VFS path, computed by walking parent pointers."""
+        parts = []
+        node = self
+        while node.parent is not None:
+            parts.append(node.name)
+            node = node.parent
+        return "/" + "/".join(reversed(parts))
+    
+    def to_dict(self, path: Optional[str] = None) -> Dict:
+        """Convert node to dictionary (the path-keyed index format)."""
+        path = path or self.path
+        prefix = path if path != "/" else ""
         return {
             "name": self.name,
-            "path": self.path,
+            "path": path,
             "file_type": self.file_type.value,
             "size": self.size,
             "created": self.created,
             "modified": self.modified,
-            "content": self.content,
-            "children": self.children,
-            "metadata": self.metadata,
+            "content_hash": self.content_hash,
+            "children": [f"{prefix}/{name}" for name in self.children],
+            "metadata": dict(self.metadata),
         }
     
     @classmethod
     def from_dict(cls, data: Dict) -> "VFSNode":
-        """Create node from dictionary."""
+        """Create an unlinked node from dictionary."""
         return cls(
             name=data["name"],
-            path=data["path"],
             file_type=FileType(data["file_type"]),
             size=data.get("size", 0),
-            created=data.get("created", ""),
-            modified=data.get("modified", ""),
-            content=data.get("content"),
-            children=data.get("children", []),
+            ctime=parse_timestamp(data.get("created")),
+            mtime=parse_timestamp(data.get("modified")),
+            content_hash=data.get("content_hash"),
             metadata=data.get("metadata", {}),
         )
 
 
+# Sort orders for iter_directory, by sort key name
+SORT_KEYS: Dict[str, Callable[[VFSNode], Any]] = {
+    "name": lambda node: node.name.lower(),
+    "type": lambda node: (node.file_type != FileType.DIRECTORY, node.name.lower()),
+    "size": lambda node: node.size,
+    "mtime": lambda node: node.mtime,
+    "ctime": lambda node: node.ctime,
+}
+SORT_CACHE_SIZE = 32  # Directories whose sort orders are kept
+QUERY_BATCH = 256  # Candidates checked per lock acquisition while streaming query results
+
+
 class VirtualFileSystem:
     """
     Virtual File System for GlassOS.
     Provides file operations in a sandboxed environment.
     """
     
-    def __init__(self, root_path: Path):
+    def __init__(self, root_path: Path, journal: bool = True, full_text: bool = False,
+                 fsync_policy: str = "snapshot", backend: Optional[VFSBackend] = None,
+                 compression_level: int = DEFAULT_LEVEL, compression_threshold: int = DEFAULT_THRESHOLD,
+                 max_versions: int = 10, lazy_shards: bool = True):
         """
         Initialize the VFS.
         
         Args:
             root_path: Physical path on disk where VFS data is stored
+            journal: Persist mutations to an append-only journal that is
+                periodically compacted into the index, instead of
+                rewriting the whole index after every change
+            full_text: Maintain a full-text index over file contents,
+                updated on a background thread
+            fsync_policy: "never" leaves flushing to the OS, "snapshot"
+                fsyncs every index written and the bodies it references,
+                "always" also fsyncs every body stored and every journal
+                append
+            backend: Store metadata and bodies in this backend (e.g. a
+                SQLiteBackend) instead of the index, journal and blob files
+            compression_level: zlib level for file bodies, 1-9; 0 stores
+                them verbatim
+            compression_threshold: Bodies smaller than this many bytes are
+                never compressed
+            max_versions: Earlier versions kept per file when it is
+                overwritten; 0 keeps no history
+            lazy_shards: Load each top-level directory's shard of the
+                index the first time a path under it is used, instead of
+                all of them at startup
         """
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"fsync_policy must be one of {FSYNC_POLICIES}")
+        
         self.root_path = Path(root_path)
-        self.index_path = self.root_path / ".vfs_index.json"
+        self.index_path = self.root_path / ".vfs_index.bin"
+        self.legacy_index_path = self.root_path / ".vfs_index.json"  # Pre-binary format
+        self.journal_path = self.root_path / ".vfs_journal.jsonl"
+        self.shards_path = self.root_path / ".vfs_shards"
         self.data_path = self.root_path / "data"
-        self._nodes: Dict[str, VFSNode] = {}
-        self._index: Dict[str, List[str]] = {}  # Search index
-        self._lock = threading.RLock()
-        
-        # Debounced save mechanism for better performance
-        self._dirty = False
-        self._save_timer = None
-        self._save_delay = 0.3  # 300ms debounce delay
-    
-    def _schedule_save(self):
-        """Schedule a debounced save operation."""
-        self._dirty = True
-        if self._save_timer is not None:
-            self._save_timer.cancel()
-        self._save_timer = threading.Timer(self._save_delay, self._debounced_save)
-        self._save_timer.daemon = True
-        self._save_timer.start()
-    
-    def _debounced_save(self):
-        """Execute the actual save after debounce delay."""
-        if self._dirty:
-            self._save_index()
-            self._dirty = False
+        self._nodes: Dict[int, VFSNode] = {}  # Inode table
+        self._root: Optional[VFSNode] = None
+        self._next_inode = 0
+        self._index = NameIndex()  # Name words -> inodes
+        self._trigrams = TrigramIndex()  # Name trigrams -> inodes
+        self._search_ready = False  # Name indexes are built on first search
+        self._sizes = SortedIndex()  # File size -> inodes
+        self._mtimes = SortedIndex()  # Modification time -> inodes
+        self._attributes_ready = False  # Built on the first size or time query
+        self._lock = RWLock()  # Readers share, mutations are exclusive
+        self._search_build_lock = threading.Lock()
+        
+        # File bodies are stored out of line, keyed by content hash
+        self._codec = BodyCodec(compression_level, compression_threshold)
+        self._backend = backend
+        if backend is not None:
+            backend.use_codec(self._codec)
+            self._blobs = backend
+        else:
+            self._blobs = BlobStore(self.data_path, self._codec, fsync_policy)
+        self._blob_refs: Dict[str, int] = {}
+        self._blob_garbage: Dict[str, int] = {}  # Unreferenced hash -> generation it was dropped in
+        self._max_versions = max_versions
+        self._deltas = DeltaWorker(self._store_version_delta)  # Diffs earlier versions off the lock
+        
+        # Live snapshots pin the bodies they reference until closed
+        self._generation = 0
+        self._snapshots = weakref.WeakSet()
+        self._freeze_lock = threading.Lock()
+        
+        # Sorted child lists of recently listed directories, by inode and sort key
+        self._sort_cache: "OrderedDict[tuple, List[VFSNode]]" = OrderedDict()
+        self._sort_cache_lock = threading.Lock()
+        
+        # Optional full-text index, fed off the calling thread
+        self._content: Optional[ContentIndexer] = None
+        if full_text:
+            self._content = ContentIndexer(ContentIndex(), self._blobs.get)
+        
+        # Debounced saves run on a dedicated persistence thread
+        self._dirty = False  # Unsaved changes (full-index mode)
+        self._fsync_policy = fsync_policy
+        self._save_stats = PersistenceStats()
+        self._persistence = PersistenceWorker(self._persist, delay=0.3)
+        
+        # Write-ahead journal; None means full-index saves only
+        self._journal = VFSJournal(self.journal_path) if journal and backend is None else None
+        self._snapshot_seq = 0  # Last journal record folded into the index
+        self._recording = False  # Off while building or replaying state
+        self._compact_threshold = 1024 * 1024  # Minimum journal bytes before compaction
+        self._snapshot_bytes = 0  # Size of the last index written
+        self._migrated = False  # Index on disk still uses an older layout
+        
+        # Each top-level directory's subtree is saved to its own shard file;
+        # the full-text index needs every body, so it loads them all anyway
+        self._lazy_shards = lazy_shards and not full_text
+        self._pending_shards: Dict[int, str] = {}  # Unloaded top-level directory inode -> shard file
+        self._shard_load_lock = threading.Lock()
+        self._shard_files: Dict[str, tuple] = {}  # Top-level name -> (frozen subtree, shard file) as written
+        self._shard_sizes: Dict[str, int] = {}  # Shard files the index on disk references -> bytes
+        
+        # Mutations made inside transaction() are recorded together on exit
+        self._batch: Optional[List[Dict[str, Any]]] = None
+        self._listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+        self._watches = WatchDispatcher()
+        self.add_listener(self._watches.submit)
     
     def flush(self):
-        """Force immediate save if there are pending changes."""
-        if self._save_timer is not None:
-            self._save_timer.cancel()
-            self._save_timer = None
+        """
+        Force immediate save if there are pending changes, including
+        version deltas still being computed. Not to be called inside a
+        transaction.
+        """
+        self._deltas.wait()
+        self._persistence.flush()
+    
+    def _persist(self) -> bool:
+        """
+        Bring the on-disk index up to date. Runs on the persistence thread.
+        Returns False if saving failed, so the worker tries again later.
+        """
+        if self._backend is not None:
+            self._commit_backend()
+            return True
+        if self._journal is not None and (self._journal.size or self._journal.rotated_path.exists()):
+            return self._compact()
         if self._dirty:
-            self._save_index()
-            self._dirty = False
+            # Also an initial save that failed with the journal on
+            return self._save_index()
+        return True
+    
+    def get_persistence_stats(self) -> Dict[str, Any]:
+        """Get save latency and bytes-written metrics."""
+        stats = self._save_stats.to_dict()
+        stats["fsync_policy"] = self._fsync_policy
+        stats["journal_size"] = self._journal.size if self._journal is not None else 0
+        stats["index_shards"] = len(self._shard_sizes)
+        stats["shards_pending"] = len(self._pending_shards)
+        return stats
+    
+    def get_compression_stats(self) -> Dict[str, Any]:
+        """Get compression ratio, CPU time and body cache metrics."""
+        stats = self._codec.stats.to_dict()
+        stats["level"] = self._codec.level
+        stats["threshold"] = self._codec.threshold
+        stats["cache_bytes"] = self._codec.cache.nbytes
+        return stats
     
     def initialize(self) -> bool:
         """Initialize the VFS structure."""
@@ -128,13 +379,29 @@ class VirtualFileSystem:
             # Create root directories
             self.root_path.mkdir(parents=True, exist_ok=True)
             self.data_path.mkdir(parents=True, exist_ok=True)
+            if self._backend is None:
+                self._blobs.discard_incoming()
             
             # Load or create index
-            if self.index_path.exists():
+            if self._backend is not None:
+                self._backend.open(self._fsync_policy)
+                has_index = not self._backend.is_empty()
+            else:
+                has_index = self.index_path.exists() or self.legacy_index_path.exists()
+            if has_index:
                 self._load_index()
             else:
                 self._create_default_structure()
-                self._save_index()
+            
+            # Replay mutations made since the index was written
+            if self._journal is not None:
+                for record in self._journal.records(self._snapshot_seq):
+                    self._apply_record(record)
+                self._journal.open(self._snapshot_seq)
+            
+            self._recording = True
+            if (not has_index or self._migrated) and not self._save_index():
+                self._persistence.request()
             
             print(f"📁 VFS initialized at: {self.root_path}")
             return True
@@ -145,12 +412,12 @@ class VirtualFileSystem:
     def _create_default_structure(self):
         """Create the default VFS directory structure."""
         # Create root node
+        self._reset_indexes()
         root = VFSNode(
             name="root",
-            path="/",
             file_type=FileType.DIRECTORY,
         )
-        self._nodes["/"] = root
+        self._link(root, None)
         
         # Default directories
         default_dirs = [
@@ -197,48 +464,652 @@ Enjoy your GlassOS experience! 💎
         self.create_file("/Documents/Notes/Welcome.md", welcome_content)
     
     def _load_index(self):
-        """Load VFS index from disk."""
-        with self._lock:
+        """Load VFS index from disk, migrating a JSON index to the binary format."""
+        # Loading allocates only long-lived objects; collector passes over
+        # the growing tree would just add pauses
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        with self._lock.write():
             try:
-                with open(self.index_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                
-                self._nodes = {
-                    path: VFSNode.from_dict(node_data)
-                    for path, node_data in data.get("nodes", {}).items()
-                }
-                self._index = data.get("search_index", {})
+                self._reset_indexes()
+                self._blob_refs = {}
+                if self._backend is not None:
+                    self._load_backend()
+                elif self.index_path.exists():
+                    self._load_binary_index()
+                else:
+                    self._load_json_index()
+                    self._migrated = True
+                self._rebuild_aggregates()
+                if not self._lazy_shards:
+                    self._load_all_shards()
             except Exception as e:
                 print(f"⚠️  Error loading VFS index: {e}")
                 self._create_default_structure()
+            finally:
+                if gc_enabled:
+                    gc.enable()
     
-    def _save_index(self):
-        """Save VFS index to disk."""
-        with self._lock:
+    def _load_binary_index(self):
+        """
+        Rebuild the tree from the memory-mapped binary index. Top-level
+        directories stored in shards are linked as stubs, with their
+        aggregates from the index, and loaded on first use.
+        """
+        self._shard_files = {}
+        self._shard_sizes = {}
+        with IndexReader(self.index_path) as reader:
+            nodes = self._read_index_nodes(reader, None)
+            if not nodes:
+                raise ValueError("index has no root node")
+            self._snapshot_seq = reader.journal_seq
+            self._snapshot_bytes = reader.nbytes
+        
+        referenced = set(self._pending_shards.values())
+        for file_name in referenced:
             try:
-                data = {
-                    "nodes": {
-                        path: node.to_dict()
-                        for path, node in self._nodes.items()
-                    },
-                    "search_index": self._index,
-                }
-                with open(self.index_path, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=2)
+                self._shard_sizes[file_name] = (self.shards_path / file_name).stat().st_size
+            except OSError as e:
+                # Only that directory is affected: it stays pending, and
+                # read-only, like a shard that fails to load
+                print(f"⚠️  Error reading VFS shard {file_name}: {e}")
+        self._snapshot_bytes += sum(self._shard_sizes.values())
+        # Shards written by a save that never committed its index
+        if self.shards_path.exists():
+            for path in self.shards_path.iterdir():
+                if path.name not in referenced:
+                    path.unlink(missing_ok=True)
+    
+    def _read_index_nodes(self, reader: IndexReader, root: Optional[VFSNode]) -> List[VFSNode]:
+        """
+        Link the records of an index file into the tree. With a root
+        given, the file is a shard and its first record is that node.
+        """
+        columns = reader.columns
+        strings = reader.strings
+        nodes: List[VFSNode] = []
+        rows = zip(columns["parent"], columns["kind"], columns["size"], columns["ctime"],
+                   columns["mtime"], columns["name"], columns["hash"], columns["meta"])
+        for index, (parent_index, kind, size, ctime, mtime, name_id, hash_id, meta_id) in enumerate(rows):
+            if (parent_index < 0) != (index == 0) or parent_index >= index:
+                raise ValueError(f"index record {index} has an invalid parent")
+            if index == 0 and root is not None:
+                nodes.append(root)
+                continue
+            if kind == SHARD_KIND:
+                if root is not None or parent_index != 0:
+                    raise ValueError(f"index record {index} is a misplaced shard")
+                stub = json.loads(strings[meta_id])
+                node = VFSNode(
+                    name=strings[name_id],
+                    file_type=FileType.DIRECTORY,
+                    ctime=ctime,
+                    mtime=mtime,
+                    metadata=stub.get("metadata"),
+                )
+                node.total_size = size
+                node.file_count = stub["files"]
+                node.dir_count = stub["dirs"]
+                self._link(node, nodes[0])
+                self._pending_shards[node.inode] = strings[hash_id]
+                nodes.append(node)
+                continue
+            node = VFSNode(
+                name=strings[name_id],
+                file_type=FILE_TYPES_BY_CODE[kind],
+                size=size,
+                ctime=ctime,
+                mtime=mtime,
+                content_hash=strings[hash_id] if hash_id != NO_STRING else None,
+                metadata=json.loads(strings[meta_id]) if meta_id != NO_STRING else None,
+            )
+            self._ref_node_blobs(node)
+            self._link(node, nodes[parent_index] if parent_index >= 0 else None)
+            nodes.append(node)
+            if self._content is not None and node.content_hash:
+                self._content.submit(node.inode, node.content_hash, node.size)
+        return nodes
+    
+    def _load_shard(self, node: VFSNode):
+        """
+        Read an unloaded top-level directory's subtree from its shard.
+        Safe under the read side of the lock: concurrent loads are
+        serialized, and the node stays pending until it is complete.
+        """
+        with self._shard_load_lock:
+            file_name = self._pending_shards.get(node.inode)
+            if file_name is None:
+                return
+            usage = self._usage_of(node)
+            try:
+                with IndexReader(self.shards_path / file_name) as reader:
+                    if reader.strings[reader.columns["name"][0]] != node.name:
+                        raise ValueError("shard belongs to another directory")
+                    self._read_index_nodes(reader, node)
+            except Exception as e:
+                # Undo the partial load; the node stays pending, so the next
+                # access retries and saves keep pointing at the shard file
+                print(f"⚠️  Error loading VFS shard for /{node.name}: {e}")
+                for child in list(node.children.values()):
+                    self._forget(child)
+                node.children = {}
+                return
+            self._rebuild_aggregates(node)
+            size, files, dirs = self._usage_of(node)
+            self._adjust_usage(node.parent, size - usage[0], files - usage[1], dirs - usage[2])
+            del self._pending_shards[node.inode]
+            # Loading is not a change, so the shard on disk is still current
+            self._freeze()
+            self._shard_files[node.name] = (node.frozen, file_name)
+    
+    def _load_all_shards(self):
+        """Load every pending shard, before work that covers the whole tree."""
+        for inode in list(self._pending_shards):
+            node = self._nodes.get(inode)
+            if node is not None:
+                self._load_shard(node)
+    
+    def _is_writable(self, path: str, mirror: bool = False) -> bool:
+        """
+        Check that a normalized path may be changed. Nothing at or under a
+        mirrored entry (see mirror_entry) changes except on the mirror's
+        behalf, as its next pass would undo it; nothing in a top-level
+        directory whose shard cannot be loaded changes at all, as it would
+        be saved against a stub and dropped. Call with the write lock held.
+        
+        Args:
+            path: Normalized path to change
+            mirror: The change is made by the mirror itself
+        """
+        node = self._root
+        for part in path.split("/"):
+            if not part:
+                continue
+            node = node.children.get(part)
+            if node is None:
+                return True
+            if node.inode in self._pending_shards:
+                self._load_shard(node)
+                if node.inode in self._pending_shards:
+                    return False
+            if not mirror and "mirror" in node.metadata:
+                return False
+        return True
+    
+    def _load_backend(self):
+        """Rebuild the tree from the backend's node rows, keeping their inodes."""
+        nodes: Dict[int, VFSNode] = {}
+        for inode, parent, name, file_type, size, ctime, mtime, content_hash, metadata in self._backend.load():
+            node = VFSNode(
+                name=name,
+                file_type=FileType(file_type),
+                size=size,
+                ctime=ctime,
+                mtime=mtime,
+                content_hash=content_hash,
+                metadata=metadata,
+            )
+            self._ref_node_blobs(node)
+            self._link(node, nodes[parent] if parent is not None else None, inode)
+            nodes[inode] = node
+            if self._content is not None and content_hash:
+                self._content.submit(inode, content_hash, size)
+        if self._root is None or self._root.parent is not None:
+            raise ValueError("backend has no root node")
+    
+    def _load_json_index(self):
+        """Rebuild the tree from a path-keyed JSON index (the pre-binary format)."""
+        with open(self.legacy_index_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+            self._snapshot_bytes = f.tell()
+        
+        entries = data.get("nodes", {})
+        if "/" not in entries:
+            raise ValueError("index has no root node")
+        
+        # Rebuild the tree depth-first from the root's children lists
+        stack = [("/", None)]
+        while stack:
+            path, parent = stack.pop()
+            node_data = entries.get(path)
+            if node_data is None:
+                continue
+            node = VFSNode.from_dict(node_data)
+            if node_data.get("content") is not None:
+                # Older indexes kept bodies inline; move them to the blob store
+                node.content_hash = self._blobs.put(node_data["content"].encode("utf-8"))
+            self._ref_node_blobs(node)
+            self._link(node, parent)
+            if self._content is not None and node.content_hash:
+                self._content.submit(node.inode, node.content_hash, node.size)
+            for child_path in reversed(node_data.get("children", [])):
+                stack.append((child_path, node))
+        
+        self._snapshot_seq = data.get("journal_seq", 0)
+    
+    def _flatten(self, root: SnapshotNode, shards: Optional[Dict[str, str]] = None) -> List[tuple]:
+        """
+        Turn a frozen tree into flat records, parents before children.
+        Top-level directories named in `shards` become stub records
+        pointing at their shard file (with file_type None).
+        """
+        records = []
+        stack = [(-1, root)]
+        while stack:
+            parent_index, node = stack.pop()
+            index = len(records)
+            if shards and parent_index == 0 and node.name in shards:
+                stub = {"files": node.file_count, "dirs": node.dir_count}
+                if node.metadata:
+                    stub["metadata"] = node.metadata
+                records.append((
+                    parent_index, node.name, None, node.total_size, node.ctime,
+                    node.mtime, shards[node.name], stub,
+                ))
+                continue
+            records.append((
+                parent_index, node.name, node.file_type, node.size, node.ctime,
+                node.mtime, node.content_hash, node.metadata,
+            ))
+            if node.children:
+                stack.extend((index, child) for child in reversed(node.children.values()))
+        return records
+    
+    def _encode_index(self, records: List[tuple]) -> tuple:
+        """Turn captured records into binary index columns and a string table."""
+        columns = new_columns()
+        strings = StringTable()
+        parents, kinds, sizes = columns["parent"], columns["kind"], columns["size"]
+        ctimes, mtimes = columns["ctime"], columns["mtime"]
+        names, hashes, metas = columns["name"], columns["hash"], columns["meta"]
+        intern = strings.intern
+        for parent_index, name, file_type, size, ctime, mtime, content_hash, metadata in records:
+            parents.append(parent_index)
+            kinds.append(FILE_TYPE_CODES[file_type] if file_type is not None else SHARD_KIND)
+            sizes.append(size)
+            ctimes.append(ctime)
+            mtimes.append(mtime)
+            names.append(intern(name))
+            hashes.append(intern(content_hash) if content_hash else NO_STRING)
+            metas.append(intern(json.dumps(metadata, separators=(",", ":"))) if metadata else NO_STRING)
+        return columns, strings.strings
+    
+    def _write_snapshot(self, root: SnapshotNode, pending: Dict[int, str], journal_seq: int) -> int:
+        """
+        Write a frozen tree as a root index plus one shard per top-level
+        directory, rewriting only the shards whose subtree changed since
+        they were last written (unloaded ones are unchanged by definition).
+        Shard files are never overwritten: new ones are written under new
+        names, the root index that points at them is swapped in
+        atomically, and only then are the old ones deleted, so a crash
+        leaves the previous index whole. Returns the number of bytes written.
+        """
+        durable = self._fsync_policy != "never"
+        if durable:
+            self._blobs.sync()  # Bodies before the index that references them
+        written = dict(self._shard_files)
+        shards: Dict[str, tuple] = {}
+        files: Dict[str, str] = {}
+        nbytes = 0
+        for name, child in root.children.items():
+            if child.children is None:
+                continue  # Top-level files stay in the root index
+            if child.inode in pending:
+                files[name] = pending[child.inode]
+                continue
+            previous = written.get(name)
+            if previous is None or previous[0] is not child:
+                self.shards_path.mkdir(exist_ok=True)
+                digest = hashlib.sha1(name.encode("utf-8")).hexdigest()[:16]
+                file_name = f"{digest}-{os.urandom(4).hex()}.bin"
+                size = self._write_index_file(self.shards_path / file_name, self._flatten(child), journal_seq)
+                self._shard_sizes[file_name] = size
+                nbytes += size
+                previous = (child, file_name)
+            shards[name] = previous
+            files[name] = previous[1]
+        if nbytes and durable:
+            fsync_directory(self.shards_path)
+        
+        root_bytes = self._write_index_file(self.index_path, self._flatten(root, files), journal_seq)
+        if durable:
+            fsync_directory(self.root_path)
+        
+        referenced = set(files.values())
+        for file_name in [name for name in self._shard_sizes if name not in referenced]:
+            (self.shards_path / file_name).unlink(missing_ok=True)
+            del self._shard_sizes[file_name]
+        # Shards loaded meanwhile keep the entries their loads recorded
+        for name in files:
+            if name not in shards and name in self._shard_files:
+                shards[name] = self._shard_files[name]
+        self._shard_files = shards
+        self._snapshot_bytes = root_bytes + sum(self._shard_sizes.values())
+        return nbytes + root_bytes
+    
+    def _write_index_file(self, path: Path, records: List[tuple], journal_seq: int) -> int:
+        """Write records to a temp file and atomically swap it in; returns its size."""
+        columns, strings = self._encode_index(records)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            nbytes = write_index(f, columns, strings, journal_seq)
+            if self._fsync_policy != "never":
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return nbytes
+    
+    def _save_index(self) -> bool:
+        """Save VFS index to disk. Returns False if that failed; the changes stay unsaved."""
+        start = time.perf_counter()
+        if self._backend is not None:
+            with self._lock.write():
+                root = self._freeze()
+            rows = []
+            stack = [(None, root)]
+            while stack:
+                parent_inode, node = stack.pop()
+                rows.append((node.inode, parent_inode, node.name, node.file_type.value, node.size,
+                             node.ctime, node.mtime, node.content_hash, node.metadata))
+                if node.children:
+                    stack.extend((node.inode, child) for child in reversed(node.children.values()))
+            self._backend.save(rows)
+            self._save_stats.record_save(time.perf_counter() - start, 0)
+            return True
+        with self._lock.write():
+            root = self._freeze()
+            pending = dict(self._pending_shards)
+            garbage = self._take_blob_garbage()
+            journal_seq = self._journal.seq if self._journal is not None else 0
+            self._dirty = False
+        try:
+            nbytes = self._write_snapshot(root, pending, journal_seq)
+            self._sweep_blobs(garbage)
+            if self._migrated and self.legacy_index_path.exists():
+                # Keep the old index around, but out of the way of future loads
+                os.replace(self.legacy_index_path,
+                           self.legacy_index_path.with_name(self.legacy_index_path.name + ".bak"))
+            self._migrated = False
+            self._save_stats.record_save(time.perf_counter() - start, nbytes)
+            return True
+        except Exception as e:
+            print(f"⚠️  Error saving VFS index: {e}")
+            with self._lock.write():
+                self._dirty = True
+                self._return_blob_garbage(garbage)
+            return False
+    
+    def _record(self, record: Dict[str, Any], notify: bool = True):
+        """
+        Persist a mutation: append it to the journal or request a full save.
+        
+        Args:
+            record: Mutation record
+            notify: Tell listeners; False for changes to how stored data
+                is encoded, which nobody can observe
+        """
+        if not self._recording:
+            return
+        if self._batch is not None:
+            self._batch.append(record)
+            return
+        if notify:
+            self._notify(record["records"] if record["op"] == "batch" else [record])
+        if self._backend is not None:
+            self._backend.record(record)
+            self._persistence.request()
+            return
+        if self._journal is None:
+            self._dirty = True
+            self._persistence.request()
+            return
+        nbytes = self._journal.append(record, fsync=self._fsync_policy == "always")
+        self._save_stats.record_journal(nbytes)
+        # Compacting only once the journal rivals the index keeps the
+        # amortized cost per mutation constant as the tree grows
+        if self._journal.size >= max(self._compact_threshold, self._snapshot_bytes):
+            self._persistence.request()
+    
+    def _notify(self, records: List[Dict[str, Any]]):
+        """Tell listeners about applied mutations. Called with the lock held."""
+        for listener in self._listeners:
+            try:
+                listener(records)
             except Exception as e:
-                print(f"⚠️  Error saving VFS index: {e}")
+                print(f"⚠️  Error in VFS change listener: {e}")
+    
+    def add_listener(self, callback: Callable[[List[Dict[str, Any]]], None]):
+        """
+        Register a callback for changes. It receives the mutation records
+        of each change, once per transaction, with the VFS lock held, so
+        it should return quickly.
+        """
+        self._listeners.append(callback)
+    
+    def remove_listener(self, callback: Callable[[List[Dict[str, Any]]], None]):
+        """Unregister a change callback."""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def watch(self, path: str, recursive: bool,
+              callback: Callable[[List[WatchEvent]], None]) -> Watch:
+        """
+        Subscribe to changes to a path and the entries below it.
+        
+        The callback receives lists of WatchEvents (created, modified,
+        deleted or renamed, with old_path for renames and moves) on a
+        background thread, outside the VFS lock. Changes made close
+        together arrive as one batch with repeated changes to a path
+        coalesced. Pass the returned watch to unwatch() to stop.
+        
+        Args:
+            path: Directory (or file) to watch
+            recursive: Report changes anywhere below path, not just to
+                its direct children
+            callback: Called with each batch of events
+        """
+        watch = Watch(self._normalize_path(path), recursive, callback)
+        self._watches.add(watch)
+        return watch
+    
+    def unwatch(self, watch: Watch):
+        """Cancel a watch; no callbacks are made for it afterwards."""
+        self._watches.remove(watch)
+    
+    @contextmanager
+    def transaction(self) -> Iterator["VirtualFileSystem"]:
+        """
+        Group mutations under one lock acquisition.
+        
+        Everything done inside the block is journaled as a single record
+        (so replay applies all of it or none of it), with one persistence
+        request and one change notification on exit. Changes are not
+        rolled back if the block raises; those already applied are still
+        recorded. Transactions nest; only the outermost one records.
+        """
+        with self._lock.write():
+            if self._batch is not None:
+                yield self
+                return
+            self._batch = []
+            try:
+                yield self
+            finally:
+                records, self._batch = self._batch, None
+                if len(records) == 1:
+                    self._record(records[0])
+                elif records:
+                    self._record({"op": "batch", "records": records})
     
-    def _update_search_index(self, node: VFSNode):
-        """Update search index with node information."""
-        # Index by name parts
-        name_lower = node.name.lower()
-        words = name_lower.replace("_", " ").replace("-", " ").split()
+    def apply_batch(self, ops: Sequence[tuple]) -> List[bool]:
+        """
+        Apply many mutations in one transaction.
+        
+        Args:
+            ops: Tuples of an operation name and its arguments:
+                ("mkdir", path), ("write", path, content), ("delete", path),
+                ("rename", path, new_name) or ("move", path, dest_dir)
+        
+        Returns:
+            Whether each operation succeeded, in order
         
-        for word in words:
-            if word not in self._index:
-                self._index[word] = []
-            if node.path not in self._index[word]:
-                self._index[word].append(node.path)
+        Raises:
+            ValueError: If any operation is unknown or malformed; nothing
+                is applied then
+        """
+        content = (str, bytes, bytearray, memoryview)
+        signatures = {
+            "mkdir": (self.create_directory, (str,)),
+            "write": (self.create_file, (str, content)),
+            "delete": (self.delete, (str,)),
+            "rename": (self.rename, (str, str)),
+            "move": (self.move, (str, str)),
+        }
+        for op in ops:
+            if not op or op[0] not in signatures:
+                raise ValueError(f"Unknown VFS batch operation: {op!r}")
+            args, types = op[1:], signatures[op[0]][1]
+            if len(args) != len(types) or not all(isinstance(arg, kind) for arg, kind in zip(args, types)):
+                raise ValueError(f"Malformed VFS batch operation: {op!r}")
+        
+        with self.transaction():
+            return [signatures[op[0]][0](*op[1:]) for op in ops]
+    
+    def _compact(self) -> bool:
+        """
+        Fold journaled mutations into a fresh index snapshot.
+        Only freezing the tree runs under the lock, and that only copies
+        nodes changed since the last save; serialization and disk I/O
+        happen outside it, while new mutations append to a fresh journal.
+        Returns False if that failed; the records stay in the journal.
+        """
+        start = time.perf_counter()
+        with self._lock.write():
+            root = self._freeze()
+            pending = dict(self._pending_shards)
+            garbage = self._take_blob_garbage()
+            journal_seq = self._journal.seq
+            self._journal.rotate()
+            self._dirty = False
+        try:
+            nbytes = self._write_snapshot(root, pending, journal_seq)
+            self._journal.discard_rotated()
+            self._sweep_blobs(garbage)
+            self._save_stats.record_save(time.perf_counter() - start, nbytes)
+            return True
+        except Exception as e:
+            print(f"⚠️  Error compacting VFS journal: {e}")
+            with self._lock.write():
+                self._return_blob_garbage(garbage)
+            return False
+    
+    def _commit_backend(self):
+        """Drop unreferenced bodies and commit the backend's pending batch."""
+        start = time.perf_counter()
+        with self._lock.write():
+            garbage = self._take_blob_garbage()
+        self._sweep_blobs(garbage)
+        self._backend.commit()
+        self._save_stats.record_save(time.perf_counter() - start, 0)
+    
+    def _ref_blob(self, content_hash: str):
+        """Count a reference to a blob."""
+        self._blob_refs[content_hash] = self._blob_refs.get(content_hash, 0) + 1
+        self._blob_garbage.pop(content_hash, None)
+    
+    def _ref_node_blobs(self, node: VFSNode):
+        """Count a loaded node's references to its body and history."""
+        if node.content_hash:
+            self._ref_blob(node.content_hash)
+        for version_hash in version_hashes(node.metadata.get("versions", ())):
+            self._ref_blob(version_hash)
+    
+    def _unref_blob(self, content_hash: str):
+        """Drop a reference to a blob; unreferenced blobs wait for the next sweep."""
+        count = self._blob_refs.get(content_hash, 0) - 1
+        if count > 0:
+            self._blob_refs[content_hash] = count
+        else:
+            self._blob_refs.pop(content_hash, None)
+            self._blob_garbage[content_hash] = self._generation
+    
+    def _take_blob_garbage(self) -> Dict[str, int]:
+        """Claim the blobs that became unreferenced. Call with the lock held."""
+        garbage = self._blob_garbage
+        self._blob_garbage = {}
+        return garbage
+    
+    def _return_blob_garbage(self, garbage: Dict[str, int]):
+        """Put claimed blobs back for a later sweep. Call with the lock held."""
+        for content_hash, generation in garbage.items():
+            if content_hash not in self._blob_refs:
+                self._blob_garbage[content_hash] = max(generation, self._blob_garbage.get(content_hash, 0))
+    
+    def _sweep_blobs(self, garbage: Dict[str, int]):
+        """
+        Delete claimed blobs once the index no longer needs them.
+        Blobs referenced again in the meantime are kept, and so are blobs
+        an open snapshot taken before they were dropped may still read.
+        """
+        with self._lock.write():
+            if garbage and self._pending_shards:
+                # Unloaded shards may still reference these bodies
+                self._load_all_shards()
+                if self._pending_shards:
+                    self._return_blob_garbage(garbage)
+                    return
+            oldest = min((snapshot.generation for snapshot in list(self._snapshots)
+                          if not snapshot.closed), default=None)
+            pinned = {}
+            for content_hash, generation in garbage.items():
+                if content_hash in self._blob_refs:
+                    continue
+                if oldest is not None and oldest <= generation:
+                    pinned[content_hash] = generation
+                else:
+                    self._blobs.delete(content_hash)
+            self._return_blob_garbage(pinned)
+    
+    def _apply_record(self, record: Dict[str, Any]):
+        """Re-apply a journaled mutation during replay."""
+        op = record.get("op")
+        path = record.get("path", "")
+        if op == "batch":
+            for inner in record["records"]:
+                self._apply_record(inner)
+        elif op == "mkdir":
+            if self._resolve(path) is None:
+                self._apply_mkdir(path, self._record_time(record, "ctime", "created"))
+        elif op == "write":
+            content_hash, size = record.get("hash"), record.get("size", 0)
+            if content_hash is None:
+                # Records from before the blob store carried the body inline
+                data = record["content"].encode("utf-8")
+                content_hash, size = self._blobs.put(data), len(data)
+            self._apply_write(path, content_hash, size, self._record_time(record, "ctime", "created"),
+                              self._record_time(record, "mtime", "modified"), record.get("versions"))
+        elif op == "delete":
+            if self._resolve(path) is not None:
+                self._apply_delete(path)
+        elif op == "rename":
+            if self._resolve(path) is not None:
+                self._apply_rename(path, record["name"], self._record_time(record, "mtime", "modified"))
+        elif op == "metadata":
+            if self._resolve(path) is not None:
+                self._apply_metadata(path, record["key"], record["value"])
+        elif op == "move":
+            if self._resolve(path) is not None:
+                self._apply_move(path, record["dest"])
+        elif op == "mirror":
+            if self._resolve(self._get_parent_path(path)) is not None:
+                self._apply_mirror(path, record["directory"], record["size"], record["ctime"],
+                                   record["mtime"], record["source"])
+    
+    def _record_time(self, record: Dict[str, Any], key: str, legacy_key: str) -> float:
+        """Read a journal timestamp, accepting the ISO strings older records used."""
+        if key in record:
+            return record[key]
+        return parse_timestamp(record.get(legacy_key)) or time.time()
     
     def _normalize_path(self, path: str) -> str:
         """Normalize a VFS path."""
@@ -256,148 +1127,745 @@ Enjoy your GlassOS experience! 💎
         """Get the parent directory path."""
         if path == "/":
             return "/"
-        return str(Path(path).parent).replace("\\", "/")
+        return path.rpartition("/")[0] or "/"
+    
+    @staticmethod
+    def _is_valid_name(name: str) -> bool:
+        """
+        Check a single name for a new or renamed node: not empty, with no
+        separator and no NUL, which delimits names in the binary index.
+        """
+        return bool(name) and "/" not in name and "\0" not in name
+    
+    def _join_path(self, parent_path: str, name: str) -> str:
+        """Join a directory path and a child name."""
+        return f"{parent_path}/{name}" if parent_path != "/" else f"/{name}"
+    
+    def _reset_indexes(self):
+        """Empty the inode table and every index built over it."""
+        self._nodes = {}
+        self._pending_shards = {}
+        self._sort_cache.clear()
+        self._index.clear()
+        self._trigrams.clear()
+        self._search_ready = False
+        self._sizes.clear()
+        self._mtimes.clear()
+        self._attributes_ready = False
+        if self._content is not None:
+            self._content.index.clear()
+    
+    def _link(self, node: VFSNode, parent: Optional[VFSNode], inode: Optional[int] = None):
+        """Assign an inode (or reuse a stored one) to a node and attach it under its parent."""
+        if inode is None:
+            inode = self._next_inode
+        node.inode = inode
+        self._next_inode = max(self._next_inode, inode + 1)
+        node.parent = parent
+        self._nodes[node.inode] = node
+        if self._search_ready:
+            self._index.add(node.inode, node.name)
+            self._trigrams.add(node.inode, node.name)
+        if self._attributes_ready:
+            self._index_attributes(node)
+        if parent is None:
+            self._root = node
+        else:
+            self._touch(parent)
+            parent.children[node.name] = node
+    
+    def _touch(self, node: Optional[VFSNode]):
+        """Drop the frozen copies of a changed node and its ancestors, and stale sort orders."""
+        if self._sort_cache and node is not None:
+            # A change reorders the node's own listing and its parent's
+            inodes = {node.inode, node.parent.inode if node.parent is not None else None}
+            with self._sort_cache_lock:
+                for key in [key for key in self._sort_cache if key[0] in inodes]:
+                    del self._sort_cache[key]
+        # Frozen nodes only ever have frozen children, so stop at the first thawed one
+        while node is not None and node.frozen is not None:
+            node.frozen = None
+            node = node.parent
+    
+    def _freeze(self) -> SnapshotNode:
+        """
+        Get an immutable copy of the whole tree, copying only the nodes
+        changed since the last call. Call with the lock held.
+        """
+        with self._freeze_lock:
+            stack = [(self._root, False)]
+            while stack:
+                node, expanded = stack.pop()
+                if expanded:
+                    children = None
+                    if node.file_type == FileType.DIRECTORY:
+                        children = {name: child.frozen for name, child in node.children.items()}
+                    node.frozen = SnapshotNode(node, children)
+                elif node.frozen is None:
+                    stack.append((node, True))
+                    stack.extend((child, False) for child in node.children.values()
+                                 if child.frozen is None)
+            return self._root.frozen
+    
+    def _ensure_search_index(self):
+        """
+        Build the name indexes on first use.
+        Loading skips them so startup does not pay for indexing every name.
+        """
+        if self._search_ready:
+            return
+        self._load_all_shards()
+        # Runs under the read side, so concurrent searches build it only once
+        with self._search_build_lock:
+            if self._search_ready:
+                return
+            # A copy: a retried shard load on another reader may add nodes meanwhile
+            for inode, node in list(self._nodes.items()):
+                self._index.add(inode, node.name)
+                self._trigrams.add(inode, node.name)
+            self._search_ready = True
+    
+    def _ensure_attribute_index(self):
+        """Build the size and modification time indexes on first use."""
+        if self._attributes_ready:
+            return
+        self._load_all_shards()
+        with self._search_build_lock:
+            if self._attributes_ready:
+                return
+            nodes = list(self._nodes.values())
+            self._sizes.build([(node.size, node.inode) for node in nodes if node.file_type == FileType.FILE])
+            self._mtimes.build([(node.mtime, node.inode) for node in nodes])
+            self._attributes_ready = True
+    
+    def _index_attributes(self, node: VFSNode):
+        """(Re-)index a node's size and modification time."""
+        if node.file_type == FileType.FILE:
+            self._sizes.add(node.inode, node.size)
+        self._mtimes.add(node.inode, node.mtime)
+    
+    def _resolve(self, path: str) -> Optional[VFSNode]:
+        """
+        Walk a normalized path from the root, one name lookup per
+        component, loading the shard of the top-level directory it enters.
+        """
+        node = self._root
+        for part in path.split("/"):
+            if not part:
+                continue
+            if node is None:
+                return None
+            node = node.children.get(part)
+            if self._pending_shards and node is not None and node.inode in self._pending_shards:
+                self._load_shard(node)
+        return node
+    
+    def _usage_of(self, node: VFSNode) -> tuple:
+        """(bytes, files, directories) a node contributes to its ancestors."""
+        if node.file_type == FileType.DIRECTORY:
+            return node.total_size, node.file_count, node.dir_count + 1
+        return node.size, 1, 0
+    
+    def _adjust_usage(self, directory: Optional[VFSNode], size: int, files: int, dirs: int):
+        """Apply a usage delta to a directory and every ancestor above it."""
+        while directory is not None:
+            directory.total_size += size
+            directory.file_count += files
+            directory.dir_count += dirs
+            directory = directory.parent
+    
+    def _rebuild_aggregates(self, top: Optional[VFSNode] = None):
+        """
+        Recompute the aggregates of every directory (or those under `top`)
+        in one post-order pass. Unloaded shards keep the totals their stubs
+        were saved with.
+        """
+        order = []
+        stack = [top or self._root]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(node.children.values())
+        for node in reversed(order):
+            if node.file_type != FileType.DIRECTORY:
+                continue
+            if node is not top and node.inode in self._pending_shards:
+                continue
+            node.total_size = node.file_count = node.dir_count = 0
+            for child in node.children.values():
+                size, files, dirs = self._usage_of(child)
+                node.total_size += size
+                node.file_count += files
+                node.dir_count += dirs
     
     def exists(self, path: str) -> bool:
         """Check if a path exists in the VFS."""
         path = self._normalize_path(path)
-        return path in self._nodes
+        with self._lock.read():
+            return self._resolve(path) is not None
     
     def is_directory(self, path: str) -> bool:
         """Check if path is a directory."""
         path = self._normalize_path(path)
-        node = self._nodes.get(path)
-        return node is not None and node.file_type == FileType.DIRECTORY
+        with self._lock.read():
+            node = self._resolve(path)
+            return node is not None and node.file_type == FileType.DIRECTORY
     
     def is_file(self, path: str) -> bool:
         """Check if path is a file."""
         path = self._normalize_path(path)
-        node = self._nodes.get(path)
-        return node is not None and node.file_type == FileType.FILE
+        with self._lock.read():
+            node = self._resolve(path)
+            return node is not None and node.file_type == FileType.FILE
     
     def create_directory(self, path: str) -> bool:
         """Create a directory at the specified path."""
         path = self._normalize_path(path)
-        
-        if self.exists(path):
+        if not self._is_valid_name(path.rpartition("/")[2]):
             return False
         
-        with self._lock:
+        with self._lock.write():
+            if self.exists(path) or not self._is_writable(path):
+                return False
+            
             # Create parent directories if needed
             parent_path = self._get_parent_path(path)
             if parent_path != "/" and not self.exists(parent_path):
                 self.create_directory(parent_path)
+            if not self.is_directory(parent_path):
+                return False
             
-            # Create the directory node
-            name = Path(path).name
-            node = VFSNode(
-                name=name,
-                path=path,
-                file_type=FileType.DIRECTORY,
-            )
-            self._nodes[path] = node
-            
-            # Add to parent's children
-            if parent_path in self._nodes:
-                parent = self._nodes[parent_path]
-                if path not in parent.children:
-                    parent.children.append(path)
-            
-            self._update_search_index(node)
-            self._schedule_save()
+            node = self._apply_mkdir(path, time.time())
+            self._record({"op": "mkdir", "path": path, "inode": node.inode, "ctime": node.ctime})
             return True
     
-    def create_file(self, path: str, content: str = "") -> bool:
-        """Create a file at the specified path with optional content."""
+    def _apply_mkdir(self, path: str, ctime: float) -> VFSNode:
+        """Insert a directory node under its (existing) parent."""
+        parent = self._resolve(self._get_parent_path(path))
+        node = VFSNode(
+            name=path.rpartition("/")[2],
+            file_type=FileType.DIRECTORY,
+            ctime=ctime,
+        )
+        self._link(node, parent)
+        self._adjust_usage(parent, 0, 0, 1)
+        return node
+    
+    def create_file(self, path: str, content: Union[str, bytes] = "") -> bool:
+        """Create a file at the specified path with optional text or binary content."""
         path = self._normalize_path(path)
+        data = content.encode("utf-8") if isinstance(content, str) else bytes(content)
         
-        with self._lock:
-            # Ensure parent directory exists
-            parent_path = self._get_parent_path(path)
-            if not self.exists(parent_path):
-                self.create_directory(parent_path)
-            
-            # Create or update the file node
-            name = Path(path).name
-            now = datetime.now().isoformat()
-            
+        with self._lock.write():
+            if not self._check_quota(path, len(data)) or not self._prepare_file_path(path):
+                return False
+            self._commit_file(path, self._blobs.put(data), len(data))
+            return True
+    
+    def _prepare_file_path(self, path: str) -> bool:
+        """Create a file's missing parents; False if it cannot be written. Call with the write lock held."""
+        if not self._is_valid_name(path.rpartition("/")[2]) or not self._is_writable(path):
+            return False
+        parent_path = self._get_parent_path(path)
+        if not self.exists(parent_path):
+            self.create_directory(parent_path)
+        return self.is_directory(parent_path) and not self.is_directory(path)
+    
+    def _check_quota(self, path: str, size: int) -> bool:
+        """
+        Check that writing `size` bytes to a file keeps every quota above
+        it, from the nearest existing directory up. Call with the write
+        lock held.
+        """
+        directory = self._root
+        parts = path.split("/")
+        for part in parts[1:-1]:
+            child = directory.children.get(part)
+            if child is None:
+                # Parents still to be created hold nothing yet
+                return self._fits_quotas(directory, size, 1)
+            if self._pending_shards and child.inode in self._pending_shards:
+                self._load_shard(child)
+            directory = child
+        existing = directory.children.get(parts[-1])
+        if existing is None:
+            return self._fits_quotas(directory, size, 1)
+        return self._fits_quotas(directory, size - existing.size, 0)
+    
+    def _fits_quotas(self, directory: Optional[VFSNode], size: int, files: int, stop: Set[int] = frozenset()) -> bool:
+        """
+        Check a usage increase against the quotas of a directory and its
+        ancestors, up to (not including) any inode in `stop`. O(depth),
+        from the maintained aggregates. Decreases always fit, so a quota
+        set below current usage still lets files shrink.
+        """
+        while directory is not None and directory.inode not in stop:
+            quota = directory.metadata.get("quota")
+            if quota is not None:
+                max_bytes, max_files = quota.get("bytes"), quota.get("files")
+                if size > 0 and max_bytes is not None and directory.total_size + size > max_bytes:
+                    print(f"⚠️  VFS quota exceeded on {directory.path}: {max_bytes} bytes")
+                    return False
+                if files > 0 and max_files is not None and directory.file_count + files > max_files:
+                    print(f"⚠️  VFS quota exceeded on {directory.path}: {max_files} files")
+                    return False
+            directory = directory.parent
+        return True
+    
+    def _commit_file(self, path: str, content_hash: str, size: int):
+        """Point a file at a stored body and record it. Call with the write lock held."""
+        now = time.time()
+        existing = self._resolve(path)
+        ctime = existing.ctime if existing is not None else now
+        versions = None
+        if existing is not None and existing.content_hash != content_hash:
+            versions = self._next_versions(existing, content_hash, size)
+        node = self._apply_write(path, content_hash, size, ctime, now, versions)
+        record = {
+            "op": "write",
+            "path": path,
+            "inode": node.inode,
+            "hash": content_hash,
+            "size": size,
+            "ctime": ctime,
+            "mtime": now,
+        }
+        if versions is not None:
+            record["versions"] = versions
+        self._record(record)
+        if versions and size <= HISTORY_SIZE_LIMIT and versions[-1]["size"]:
+            self._deltas.submit((node.inode, versions[-1], content_hash))
+    
+    def _next_versions(self, node: VFSNode, content_hash: str, size: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Extend a file's history with its current body before it is replaced,
+        as a full copy; _commit_file then queues text for conversion to a
+        delta from the new body. Returns None if there is no history to change.
+        """
+        versions = list(node.metadata.get("versions", ()))
+        if not self._max_versions or node.size > HISTORY_SIZE_LIMIT:
+            # The chain of deltas cannot bridge a body that is not kept
+            return [] if versions else None
+        
+        old_hash = node.content_hash or self._blobs.put(b"")
+        versions.append({"mtime": node.mtime, "size": node.size, "hash": old_hash})
+        return versions[-self._max_versions:]
+    
+    def _store_version_delta(self, job: tuple):
+        """
+        Replace the full copy of an earlier text version with a delta from
+        the body that replaced it, if that is smaller. Runs on the delta
+        worker: only swapping the entry in takes the lock, and an entry
+        dropped from the history meanwhile is left alone.
+        """
+        inode, entry, newer_hash = job
+        older, newer = self._blobs.get(entry["hash"]), self._blobs.get(newer_hash)
+        if older is None or newer is None:
+            return
+        try:
+            delta = make_delta(newer.decode("utf-8"), older.decode("utf-8"))
+        except UnicodeDecodeError:
+            return  # Binary versions stay full copies
+        if delta is None or len(delta) >= entry["size"]:
+            return
+        
+        with self._lock.write():
+            node = self._nodes.get(inode)
+            versions = list(node.metadata.get("versions", ())) if node is not None else []
+            index = next((i for i, item in enumerate(versions) if item is entry), None)
+            if index is None:
+                return
+            versions[index] = {"mtime": entry["mtime"], "size": entry["size"], "delta": self._blobs.put(delta)}
+            path = node.path
+            self._apply_metadata(path, "versions", versions)
+            self._record({"op": "metadata", "path": path, "key": "versions", "value": versions}, notify=False)
+    
+    def _apply_write(self, path: str, content_hash: str, size: int, ctime: float, mtime: float,
+                     versions: Optional[List[Dict[str, Any]]] = None) -> VFSNode:
+        """
+        Create a file node under its (existing) parent, or update it in
+        place. A versions list, if given, replaces the file's history.
+        """
+        parent = self._resolve(self._get_parent_path(path))
+        name = path.rpartition("/")[2]
+        
+        self._ref_blob(content_hash)
+        node = parent.children.get(name)
+        if node is not None:
+            self._touch(node)
+            if node.content_hash:
+                self._unref_blob(node.content_hash)
+            self._adjust_usage(parent, size - node.size, 0, 0)
+            node.size = size
+            node.content_hash = content_hash
+            node.ctime = ctime
+            node.mtime = mtime
+            if self._attributes_ready:
+                self._index_attributes(node)
+        else:
             node = VFSNode(
                 name=name,
-                path=path,
                 file_type=FileType.FILE,
-                size=len(content.encode("utf-8")),
-                content=content,
-                created=self._nodes[path].created if path in self._nodes else now,
-                modified=now,
+                size=size,
+                content_hash=content_hash,
+                ctime=ctime,
+                mtime=mtime,
             )
-            
-            is_new = path not in self._nodes
-            self._nodes[path] = node
-            
-            # Add to parent's children if new
-            if is_new and parent_path in self._nodes:
-                parent = self._nodes[parent_path]
-                if path not in parent.children:
-                    parent.children.append(path)
-            
-            self._update_search_index(node)
-            self._schedule_save()
-            return True
+            self._link(node, parent)
+            self._adjust_usage(parent, size, 1, 0)
+        
+        if versions is not None:
+            for version_hash in version_hashes(versions):
+                self._ref_blob(version_hash)
+            for version_hash in version_hashes(node.metadata.get("versions", ())):
+                self._unref_blob(version_hash)
+            metadata = {key: value for key, value in node.metadata.items() if key != "versions"}
+            if versions:
+                metadata["versions"] = versions
+            node.metadata = metadata or EMPTY_METADATA
+        
+        if self._content is not None:
+            self._content.submit(node.inode, content_hash, size)
+        return node
     
     def read_file(self, path: str) -> Optional[str]:
-        """Read the content of a file."""
+        """Read the content of a file as text; None if it is missing or not UTF-8."""
+        data = self.read_bytes(path)
+        if data is None:
+            return None
+        try:
+            return data.decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+    
+    def read_bytes(self, path: str) -> Optional[bytes]:
+        """Read the raw content of a file; None for a mirrored file, whose content is elsewhere."""
         path = self._normalize_path(path)
-        node = self._nodes.get(path)
         
-        if node and node.file_type == FileType.FILE:
-            return node.content
-        return None
+        # Held across the body read so the blob cannot be swept meanwhile
+        with self._lock.read():
+            node = self._resolve(path)
+            if node and node.file_type == FileType.FILE and "mirror" not in node.metadata:
+                if not node.content_hash:
+                    return b""
+                return self._blobs.get(node.content_hash)
+            return None
+    
+    def read_range(self, path: str, offset: int, length: int) -> Optional[bytes]:
+        """
+        Read part of a file, e.g. an image header, without loading the
+        rest. Use open_read(path).memoryview() for zero-copy access.
+        """
+        stream = self.open_read(path)
+        if stream is None:
+            return None
+        with stream:
+            stream.seek(max(offset, 0))
+            return stream.read(max(length, 0))
+    
+    def content_type(self, path: str) -> Optional[str]:
+        """
+        Guess a file's format from its first bytes: a CONTENT_SIGNATURES
+        name, "webp", "bmp", "text" or "binary".
+        """
+        stream = self.open_read(path)
+        if stream is None:
+            return None
+        with stream:
+            return detect_content_type(stream.read(512), stream.size)
     
-    def write_file(self, path: str, content: str) -> bool:
-        """Write content to a file."""
+    def write_file(self, path: str, content: Union[str, bytes]) -> bool:
+        """Write text or binary content to a file."""
         return self.create_file(path, content)
     
-    def delete(self, path: str) -> bool:
-        """Delete a file or directory."""
+    def write_bytes(self, path: str, data: bytes) -> bool:
+        """Write binary content to a file."""
+        return self.create_file(path, bytes(data))
+    
+    def open_read(self, path: str) -> Optional[VFSReadStream]:
+        """
+        Open a file for streaming reads, or None if it is not a file (or
+        is mirrored). The handle supports read, seek, chunked iteration
+        and a zero-copy memoryview; close it when done.
+        """
         path = self._normalize_path(path)
         
-        if not self.exists(path) or path == "/":
-            return False
-        
-        with self._lock:
-            node = self._nodes[path]
-            
-            # If directory, recursively delete children
-            if node.file_type == FileType.DIRECTORY:
-                for child_path in list(node.children):
-                    self.delete(child_path)
-            
-            # Remove from parent's children
-            parent_path = self._get_parent_path(path)
-            if parent_path in self._nodes:
-                parent = self._nodes[parent_path]
-                if path in parent.children:
-                    parent.children.remove(path)
+        # Opened under the lock so the body cannot be swept first
+        with self._lock.read():
+            node = self._resolve(path)
+            if node is None or node.file_type != FileType.FILE or "mirror" in node.metadata:
+                return None
+            if not node.content_hash:
+                return VFSReadStream(io.BytesIO(b""), 0)
+            raw = self._blobs.open_reader(node.content_hash)
+            return VFSReadStream(raw, node.size) if raw is not None else None
+    
+    def open_write(self, path: str) -> Optional[VFSWriteStream]:
+        """
+        Open a file for streaming writes, or None if path is a directory
+        or cannot be written.
+        Bytes go straight to disk as they are written; the file's content
+        is replaced when the handle is closed.
+        """
+        path = self._normalize_path(path)
+        if not self._is_valid_name(path.rpartition("/")[2]) or self.is_directory(path):
+            return None
+        with self._lock.write():
+            if not self._is_writable(path):
+                return None
+        return VFSWriteStream(self._blobs.open_writer(), lambda writer: self._commit_stream(path, writer))
+    
+    def _commit_stream(self, path: str, writer) -> bool:
+        """Install a streamed body at path."""
+        with self._lock.write():
+            if not self._check_quota(path, writer.size) or not self._prepare_file_path(path):
+                writer.abort()
+                return False
+            self._commit_file(path, writer.commit(), writer.size)
+            return True
+    
+    def list_versions(self, path: str) -> List[Dict[str, Any]]:
+        """List a file's earlier versions, oldest first, excluding the current one."""
+        path = self._normalize_path(path)
+        with self._lock.read():
+            node = self._resolve(path)
+            if node is None or node.file_type != FileType.FILE:
+                return []
+            return [
+                {
+                    "version": index,
+                    "size": entry["size"],
+                    "modified": datetime.fromtimestamp(entry["mtime"]).isoformat(),
+                }
+                for index, entry in enumerate(node.metadata.get("versions", ()))
+            ]
+    
+    def read_version(self, path: str, version: int) -> Optional[bytes]:
+        """Read an earlier version of a file by its list_versions() number."""
+        path = self._normalize_path(path)
+        with self._lock.read():
+            node = self._resolve(path)
+            if node is None or node.file_type != FileType.FILE:
+                return None
+            versions = node.metadata.get("versions", [])
+            if not 0 <= version < len(versions):
+                return None
             
-            # Delete the node
-            del self._nodes[path]
+            # Walk the chain back from the current body, newest first; a
+            # mirrored file has none here, but its newest version is full
+            data = self._blobs.get(node.content_hash) if node.content_hash else b""
+            for entry in reversed(versions[version:]):
+                if data is None:
+                    return None
+                if "hash" in entry:
+                    data = self._blobs.get(entry["hash"])
+                else:
+                    delta = self._blobs.get(entry["delta"])
+                    if delta is None:
+                        return None
+                    data = apply_delta(data.decode("utf-8"), delta).encode("utf-8")
+            return data
+    
+    def restore_version(self, path: str, version: int) -> bool:
+        """Make an earlier version current again; the replaced body joins the history."""
+        with self._lock.write():
+            data = self.read_version(path, version)
+            if data is None:
+                return False
+            return self.create_file(path, data)
+    
+    def delete(self, path: str) -> bool:
+        """Delete a file or directory."""
+        return self._delete(self._normalize_path(path), mirror=False)
+    
+    def remove_mirror_entry(self, path: str) -> bool:
+        """Delete an entry at or under a mirrored one, with everything below it; for the mirror only."""
+        return self._delete(self._normalize_path(path), mirror=True)
+    
+    def _delete(self, path: str, mirror: bool) -> bool:
+        """Delete a normalized path, allowing mirrored ones only for the mirror."""
+        with self._lock.write():
+            if not self.exists(path) or path == "/" or not self._is_writable(path, mirror):
+                return False
             
-            self._schedule_save()
+            self._apply_delete(path)
+            self._record({"op": "delete", "path": path})
             return True
     
+    def _apply_delete(self, path: str):
+        """Detach a node and drop it, and everything below it, from the inode table."""
+        node = self._resolve(path)
+        self._touch(node.parent)
+        del node.parent.children[node.name]
+        size, files, dirs = self._usage_of(node)
+        self._adjust_usage(node.parent, -size, -files, -dirs)
+        self._forget(node)
+    
+    def _forget(self, node: VFSNode):
+        """Drop a detached node and everything below it from the inode table, indexes and blob counts."""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            stack.extend(current.children.values())
+            del self._nodes[current.inode]
+            if self._search_ready:
+                self._index.remove(current.inode)
+                self._trigrams.remove(current.inode, current.name)
+            if self._attributes_ready:
+                self._sizes.remove(current.inode)
+                self._mtimes.remove(current.inode)
+            if current.content_hash:
+                self._unref_blob(current.content_hash)
+                if self._content is not None:
+                    self._content.discard(current.inode)
+            for version_hash in version_hashes(current.metadata.get("versions", ())):
+                self._unref_blob(version_hash)
+    
     def list_directory(self, path: str) -> List[VFSNode]:
         """List contents of a directory."""
         path = self._normalize_path(path)
-        node = self._nodes.get(path)
+        with self._lock.read():
+            node = self._resolve(path)
+            
+            if not node or node.file_type != FileType.DIRECTORY:
+                return []
+            
+            return list(node.children.values())
+    
+    def _sorted_children(self, directory: VFSNode, sort_key: str) -> List[VFSNode]:
+        """
+        Get a directory's children in a SORT_KEYS order ("-" prefix for
+        descending), cached until the directory changes. Call with the lock held.
+        """
+        key = (directory.inode, sort_key)
+        with self._sort_cache_lock:
+            order = self._sort_cache.get(key)
+            if order is not None:
+                self._sort_cache.move_to_end(key)
+                return order
         
-        if not node or node.file_type != FileType.DIRECTORY:
-            return []
+        descending = sort_key.startswith("-")
+        field_name = sort_key.lstrip("-")
+        if field_name not in SORT_KEYS:
+            raise ValueError(f"sort_key must be one of {tuple(SORT_KEYS)}, optionally prefixed with '-'")
+        order = sorted(directory.children.values(), key=SORT_KEYS[field_name], reverse=descending)
+        with self._sort_cache_lock:
+            self._sort_cache[key] = order
+            while len(self._sort_cache) > SORT_CACHE_SIZE:
+                self._sort_cache.popitem(last=False)
+        return order
+    
+    def iter_directory(self, path: str, offset: int = 0, limit: Optional[int] = None,
+                       sort_key: Optional[str] = None) -> Iterator[VFSNode]:
+        """
+        Stream one page of a directory's children.
         
-        return [
-            self._nodes[child_path]
-            for child_path in node.children
-            if child_path in self._nodes
-        ]
+        Args:
+            path: Directory to list
+            offset: Number of entries to skip
+            limit: Maximum number of entries; None for all the rest
+            sort_key: One of SORT_KEYS ("name", "type", "size", "mtime",
+                "ctime"), prefixed with "-" for descending; None keeps
+                insertion order. Sort orders are cached per directory.
+        """
+        path = self._normalize_path(path)
+        offset = max(offset, 0)
+        end = offset + limit if limit is not None else None
+        with self._lock.read():
+            node = self._resolve(path)
+            if not node or node.file_type != FileType.DIRECTORY:
+                return
+            if sort_key:
+                # Cached orders are never mutated, only replaced, so the
+                # full listing can be read after the lock is released
+                order = self._sorted_children(node, sort_key)
+                page = order[offset:end] if limit is not None else None
+            else:
+                order = None
+                page = list(islice(node.children.values(), offset, end))
+        if page is None:
+            yield from islice(order, offset, None)
+        else:
+            yield from page
+    
+    def walk(self, path: str = "/") -> Iterator[tuple]:
+        """
+        Walk a directory tree top-down like os.walk, yielding
+        (dir_path, dir_names, file_names). Each directory is read under
+        the lock separately; dir_names may be pruned in place to skip
+        subtrees.
+        """
+        stack = [self._normalize_path(path)]
+        while stack:
+            dir_path = stack.pop()
+            with self._lock.read():
+                node = self._resolve(dir_path)
+                if node is None or node.file_type != FileType.DIRECTORY:
+                    continue
+                dir_names, file_names = [], []
+                for name, child in node.children.items():
+                    (dir_names if child.file_type == FileType.DIRECTORY else file_names).append(name)
+            yield dir_path, dir_names, file_names
+            stack.extend(self._join_path(dir_path, name) for name in reversed(dir_names))
+    
+    def glob(self, pattern: str) -> Iterator[str]:
+        """
+        Stream the paths matching a glob pattern. Components may use
+        *, ? and [...] (fnmatch syntax); a "**" component matches any
+        number of directories.
+        """
+        parts = [part for part in self._normalize_path(pattern).split("/") if part]
+        if not parts:
+            yield "/"
+            return
+        
+        seen = set()
+        stack = [("/", 0)]
+        while stack:
+            dir_path, index = stack.pop()
+            part = parts[index]
+            last = index == len(parts) - 1
+            if part == "**":
+                # One more directory staying on "**", or zero and move on
+                for name in reversed(self._child_names(dir_path, directories_only=True)):
+                    stack.append((self._join_path(dir_path, name), index))
+                if not last:
+                    stack.append((dir_path, index + 1))
+                    continue
+                # A trailing "**" matches the directory and every file in it
+                for child_path in [dir_path] + [self._join_path(dir_path, name)
+                                                for name in self._child_names(dir_path, files_only=True)]:
+                    if child_path not in seen:
+                        seen.add(child_path)
+                        yield child_path
+                continue
+            
+            if not any(char in part for char in "*?["):
+                # No wildcards: a direct lookup instead of a listing
+                names = [part] if self.exists(self._join_path(dir_path, part)) else []
+            else:
+                names = [name for name in self._child_names(dir_path, directories_only=not last)
+                         if fnmatch.fnmatchcase(name, part)]
+            if not last:
+                stack.extend((self._join_path(dir_path, name), index + 1) for name in reversed(names))
+                continue
+            for name in names:
+                child_path = self._join_path(dir_path, name)
+                if child_path not in seen:
+                    seen.add(child_path)
+                    yield child_path
+    
+    def _child_names(self, path: str, directories_only: bool = False,
+                     files_only: bool = False) -> List[str]:
+        """Names in a directory, read under the lock."""
+        with self._lock.read():
+            node = self._resolve(path)
+            if node is None or node.file_type != FileType.DIRECTORY:
+                return []
+            return [
+                name for name, child in node.children.items()
+                if (child.file_type == FileType.DIRECTORY) != files_only or not (directories_only or files_only)
+            ]
     
     def search(self, query: str, path: str = "/") -> List[VFSNode]:
         """
@@ -405,114 +1873,579 @@ Enjoy your GlassOS experience! 💎
         Uses the search index for fast lookups.
         """
         query_lower = query.lower()
-        results = set()
-        
-        # Search in index
-        for word in query_lower.split():
-            if word in self._index:
-                for node_path in self._index[word]:
-                    if node_path.startswith(path):
-                        results.add(node_path)
-        
-        # Also do substring matching
-        for node_path, node in self._nodes.items():
-            if node_path.startswith(path) and query_lower in node.name.lower():
-                results.add(node_path)
-        
-        return [
-            self._nodes[path]
-            for path in results
-            if path in self._nodes
-        ]
+        with self._lock.read():
+            scope = self._resolve(self._normalize_path(path))
+            if scope is None:
+                return []
+            results = set()
+            
+            # Search in index
+            for word in query_lower.split():
+                results.update(self._word_matches(word))
+            
+            # Also do substring matching, verifying trigram candidates
+            for inode in self._name_candidates(query_lower):
+                node = self._nodes.get(inode)
+                if node is not None and query_lower in node.name.lower():
+                    results.add(inode)
+            
+            nodes = (self._nodes.get(inode) for inode in results)
+            return [
+                node for node in nodes
+                if node is not None and self._is_within(node, scope)
+            ]
+    
+    def search_ranked(self, query: str, path: str = "/", limit: int = 50,
+                      time_budget: float = 0.05) -> List[VFSNode]:
+        """
+        Search for the best matches to a query, best first.
+        
+        Names are scored for exact, prefix, word-boundary, substring and
+        fuzzy subsequence matches (every query word must match), plus a
+        recency boost. Only the top `limit` are kept, in a bounded heap.
+        
+        Args:
+            query: Space-separated search words
+            path: Directory to search under
+            limit: Maximum number of results
+            time_budget: Seconds after which matching stops and the best
+                results found so far are returned
+        """
+        terms = query.lower().split()
+        if not terms or limit <= 0:
+            return []
+        
+        deadline = time.perf_counter() + time_budget
+        now = time.time()
+        heap = []
+        
+        def consider(node: VFSNode):
+            score = 0.0
+            for term in terms:
+                term_score = score_name(term, node.name)
+                if not term_score:
+                    return
+                score += term_score
+            if not self._is_within(node, scope):
+                return
+            entry = (score + recency_bonus(node.mtime, now), -node.inode, node)
+            if len(heap) < limit:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+        
+        with self._lock.read():
+            scope = self._resolve(self._normalize_path(path))
+            if scope is None:
+                return []
+            
+            # Substring matches straight from the trigram index. Terms under
+            # three characters would expand to most of the tree, so they are
+            # left to the scan below.
+            candidates = None
+            for term in terms:
+                if len(term) < 3:
+                    continue
+                term_candidates = self._name_candidates(term)
+                candidates = term_candidates if candidates is None else candidates & term_candidates
+            candidates = candidates or set()
+            expired = False
+            for count, inode in enumerate(candidates):
+                if count % 512 == 0 and time.perf_counter() > deadline:
+                    expired = True
+                    break
+                node = self._nodes.get(inode)
+                if node is not None:
+                    consider(node)
+            
+            # Fuzzy matches need a scan, bounded by the latency budget, of
+            # every shard (short terms skipped the index build that loads
+            # them). A copy, as a shard load on another reader may add nodes.
+            self._load_all_shards()
+            for count, node in enumerate(list(self._nodes.values())):
+                if expired or (count % 512 == 0 and time.perf_counter() > deadline):
+                    break
+                if node.inode not in candidates:
+                    consider(node)
+        
+        return [entry[2] for entry in sorted(heap, reverse=True)]
+    
+    def _word_matches(self, word: str) -> set:
+        """Inodes whose names contain a lowercase word as a whole index word."""
+        if self._backend is not None:
+            candidates = self._backend.match_names(word)
+            if candidates is not None:
+                nodes = (self._nodes.get(inode) for inode in candidates)
+                return {
+                    node.inode for node in nodes
+                    if node is not None and word in NameIndex.tokenize(node.name)
+                }
+        self._ensure_search_index()
+        return self._index.lookup(word)
+    
+    def _name_candidates(self, term: str) -> set:
+        """Inodes whose names may contain a lowercase term; callers verify."""
+        if self._backend is not None:
+            candidates = self._backend.match_names(term)
+            if candidates is not None:
+                return candidates
+        self._ensure_search_index()
+        return self._trigrams.candidates(term)
+    
+    def search_content(self, query: str, path: str = "/") -> List[VFSNode]:
+        """
+        Search file contents with the full-text index.
+        Plain words must all appear; "quoted phrases" must appear in order;
+        a trailing * matches any word with that prefix. Recent writes may
+        take a moment to become searchable.
+        """
+        if self._content is None:
+            return []
+        
+        with self._lock.read():
+            self._load_all_shards()
+            scope = self._resolve(self._normalize_path(path))
+            if scope is None:
+                return []
+            nodes = (self._nodes.get(inode) for inode in self._content.index.search(query))
+            return [
+                node for node in nodes
+                if node is not None and self._is_within(node, scope)
+            ]
+    
+    def query(self, text: Union[str, Query], path: str = "/") -> Iterator[VFSNode]:
+        """
+        Stream the nodes matching a structured query such as
+        `report type:file size:>1MB modified:<7d in:/Documents` (see
+        core/vfs_query.py for the syntax).
+        
+        Candidates come from whichever index yields the fewest: name
+        trigrams, file sizes, modification times or the scope's subtree.
+        They are checked against the other filters a batch at a time, with
+        the lock released in between, so the first hits arrive before the
+        rest are found. Results are in index order, not ranked.
+        
+        Args:
+            text: Query string, or an already parsed Query
+            path: Directory to search under, unless the query has an in: filter
+        
+        Raises:
+            ValueError: If a filter value cannot be parsed
+        """
+        return self._run_query(parse_query(text) if isinstance(text, str) else text, path)
+    
+    @staticmethod
+    def is_structured_query(text: str) -> bool:
+        """Check whether a search string uses key:value filters (and parses)."""
+        try:
+            return parse_query(text).is_structured
+        except ValueError:
+            return False
+    
+    def explain_query(self, text: str, path: str = "/") -> Dict[str, Any]:
+        """Get the index a query would be answered from and its candidate count."""
+        query = parse_query(text)
+        with self._lock.read():
+            scope = self._resolve(self._normalize_path(query.scope or path))
+            if scope is None:
+                return {"index": None, "candidates": 0}
+            index, candidates = self._plan_query(query, scope)
+            return {"index": index, "candidates": len(candidates)}
+    
+    def _run_query(self, query: Query, path: str) -> Iterator[VFSNode]:
+        with self._lock.read():
+            scope = self._resolve(self._normalize_path(query.scope or path))
+            if scope is None:
+                return
+            _, candidates = self._plan_query(query, scope)
+        
+        for start in range(0, len(candidates), QUERY_BATCH):
+            with self._lock.read():
+                nodes = (self._nodes.get(inode) for inode in candidates[start:start + QUERY_BATCH])
+                matches = [
+                    node for node in nodes
+                    if node is not None and query.matches(node) and self._is_within(node, scope)
+                ]
+            yield from matches
+    
+    def _plan_query(self, query: Query, scope: VFSNode) -> tuple:
+        """
+        Pick the smallest candidate set for a query: (index name, inodes).
+        Call with the read lock held.
+        """
+        _, files, dirs = self._usage_of(scope)
+        best = ("scope", files + dirs)
+        if query.size is not None or query.mtime is not None:
+            self._ensure_attribute_index()
+        if query.size is not None:
+            count = self._sizes.count(*query.size)
+            if count < best[1]:
+                best = ("size", count)
+        if query.mtime is not None:
+            count = self._mtimes.count(*query.mtime)
+            if count < best[1]:
+                best = ("modified", count)
+        
+        names = None
+        terms = query.terms + ([query.extension] if query.extension else [])
+        if terms and best[1]:
+            for term in terms:
+                term_candidates = self._name_candidates(term)
+                names = term_candidates if names is None else names & term_candidates
+            if len(names) < best[1]:
+                best = ("name", len(names))
+        
+        index = best[0]
+        if index == "name":
+            return index, list(names)
+        if index == "size":
+            return index, self._sizes.range(*query.size)
+        if index == "modified":
+            return index, self._mtimes.range(*query.mtime)
+        if scope is self._root:
+            self._load_all_shards()
+            return index, list(self._nodes)
+        inodes = []
+        stack = [scope]
+        while stack:
+            node = stack.pop()
+            inodes.append(node.inode)
+            stack.extend(node.children.values())
+        return index, inodes
+    
+    def compact_search_index(self):
+        """Shrink the search index after large deletions."""
+        with self._lock.write():
+            self._index.compact()
+    
+    def _is_within(self, node: VFSNode, scope: VFSNode) -> bool:
+        """Check whether scope is the node itself or one of its ancestors."""
+        while node is not None:
+            if node is scope:
+                return True
+            node = node.parent
+        return False
     
     def get_node(self, path: str) -> Optional[VFSNode]:
         """Get a node by path."""
         path = self._normalize_path(path)
-        return self._nodes.get(path)
+        with self._lock.read():
+            return self._resolve(path)
+    
+    def snapshot(self) -> VFSSnapshot:
+        """
+        Take a read-only view of the whole tree as it is now.
+        
+        Cheap after the first call: unchanged subtrees are shared with
+        earlier snapshots and the saved index, so the cost is proportional
+        to what changed since. Reading the snapshot takes no lock. Close it
+        when done so bodies it alone references can be reclaimed.
+        """
+        with self._lock.read():
+            self._load_all_shards()
+            root = self._freeze()
+            with self._freeze_lock:
+                self._generation += 1
+                snapshot = VFSSnapshot(root, self._generation, time.time(), self._blobs.get)
+                self._snapshots.add(snapshot)
+            return snapshot
     
     def rename(self, old_path: str, new_name: str) -> bool:
         """Rename a file or directory."""
-        old_path = self._normalize_path(old_path)
-        
-        if not self.exists(old_path):
+        return self._rename(self._normalize_path(old_path), new_name, mirror=False)
+    
+    def rename_mirror_entry(self, old_path: str, new_name: str) -> bool:
+        """Rename an entry at or under a mirrored one; for the mirror only."""
+        return self._rename(self._normalize_path(old_path), new_name, mirror=True)
+    
+    def _rename(self, old_path: str, new_name: str, mirror: bool) -> bool:
+        """Rename a normalized path, allowing mirrored ones only for the mirror."""
+        if old_path == "/" or not self._is_valid_name(new_name):
             return False
         
         parent_path = self._get_parent_path(old_path)
-        new_path = f"{parent_path}/{new_name}" if parent_path != "/" else f"/{new_name}"
-        
-        if self.exists(new_path):
-            return False
+        new_path = self._join_path(parent_path, new_name)
         
-        with self._lock:
-            node = self._nodes[old_path]
-            node.name = new_name
-            node.path = new_path
-            node.modified = datetime.now().isoformat()
+        with self._lock.write():
+            if (not self.exists(old_path) or self.exists(new_path)
+                    or not self._is_writable(old_path, mirror)):
+                return False
             
-            # Update parent's children
-            if parent_path in self._nodes:
-                parent = self._nodes[parent_path]
-                if old_path in parent.children:
-                    parent.children.remove(old_path)
-                    parent.children.append(new_path)
+            now = time.time()
+            self._apply_rename(old_path, new_name, now)
+            self._record({"op": "rename", "path": old_path, "name": new_name, "mtime": now})
+            return True
+    
+    def _apply_rename(self, old_path: str, new_name: str, mtime: float):
+        """Re-key a node in its parent; descendants follow via parent pointers."""
+        node = self._resolve(old_path)
+        self._touch(node)
+        parent = node.parent
+        del parent.children[node.name]
+        if self._search_ready:
+            self._trigrams.remove(node.inode, node.name)
+        node.name = new_name
+        node.mtime = mtime
+        parent.children[new_name] = node
+        if self._search_ready:
+            self._index.add(node.inode, new_name)
+            self._trigrams.add(node.inode, new_name)
+        if self._attributes_ready:
+            self._mtimes.add(node.inode, mtime)
+    
+    def move(self, path: str, dest_dir: str) -> bool:
+        """Move a file or directory into another directory."""
+        return self._move(self._normalize_path(path), self._normalize_path(dest_dir), mirror=False)
+    
+    def move_mirror_entry(self, path: str, dest_dir: str) -> bool:
+        """Move an entry at or under a mirrored one, or into one; for the mirror only."""
+        return self._move(self._normalize_path(path), self._normalize_path(dest_dir), mirror=True)
+    
+    def _move(self, path: str, dest_dir: str, mirror: bool) -> bool:
+        """Move a normalized path, allowing mirrored ones only for the mirror."""
+        with self._lock.write():
+            node = self._resolve(path)
+            dest = self._resolve(dest_dir)
+            if node is None or node is self._root or dest is None:
+                return False
+            if not self._is_writable(path, mirror) or not self._is_writable(dest_dir, mirror):
+                return False
+            if dest.file_type != FileType.DIRECTORY or node.name in dest.children:
+                return False
             
-            # Move node to new path
-            del self._nodes[old_path]
-            self._nodes[new_path] = node
+            # Refuse to move a directory into its own subtree
+            ancestor = dest
+            while ancestor is not None:
+                if ancestor is node:
+                    return False
+                ancestor = ancestor.parent
             
-            # Update children paths if directory
-            if node.file_type == FileType.DIRECTORY:
-                self._update_children_paths(node, old_path, new_path)
+            # Usage only changes below the closest common ancestor
+            size, files, _ = self._usage_of(node)
+            ancestors = set()
+            ancestor = node.parent
+            while ancestor is not None:
+                ancestors.add(ancestor.inode)
+                ancestor = ancestor.parent
+            if not self._fits_quotas(dest, size, files, stop=ancestors):
+                return False
             
-            self._update_search_index(node)
-            self._schedule_save()
+            self._apply_move(path, dest_dir)
+            self._record({"op": "move", "path": path, "dest": dest_dir})
             return True
     
-    def _update_children_paths(self, node: VFSNode, old_base: str, new_base: str):
-        """Recursively update children paths after rename."""
-        new_children = []
-        for child_path in node.children:
-            new_child_path = child_path.replace(old_base, new_base, 1)
+    def _apply_move(self, path: str, dest_dir: str):
+        """Re-parent a node; descendants follow via parent pointers."""
+        node = self._resolve(path)
+        dest = self._resolve(dest_dir)
+        size, files, dirs = self._usage_of(node)
+        self._touch(node.parent)
+        self._touch(dest)
+        self._adjust_usage(node.parent, -size, -files, -dirs)
+        del node.parent.children[node.name]
+        node.parent = dest
+        dest.children[node.name] = node
+        self._adjust_usage(dest, size, files, dirs)
+    
+    def get_size(self, path: str) -> int:
+        """Get the size of a file or total size of a directory."""
+        path = self._normalize_path(path)
+        with self._lock.read():
+            node = self._resolve(path)
             
-            if child_path in self._nodes:
-                child_node = self._nodes[child_path]
-                child_node.path = new_child_path
-                
-                del self._nodes[child_path]
-                self._nodes[new_child_path] = child_node
-                
-                if child_node.file_type == FileType.DIRECTORY:
-                    self._update_children_paths(child_node, old_base, new_base)
+            if not node:
+                return 0
             
-            new_children.append(new_child_path)
+            return self._usage_of(node)[0]
+    
+    def set_quota(self, path: str, max_bytes: Optional[int] = None, max_files: Optional[int] = None) -> bool:
+        """
+        Limit what a directory's subtree may hold. New writes, streams and
+        moves that would take it over a limit fail; existing content is
+        left alone. Earlier file versions do not count.
+        
+        Args:
+            path: Directory to limit
+            max_bytes: Total file size limit, or None for no limit
+            max_files: File count limit, or None for no limit
+        """
+        path = self._normalize_path(path)
+        quota = {}
+        if max_bytes is not None:
+            quota["bytes"] = max_bytes
+        if max_files is not None:
+            quota["files"] = max_files
         
-        node.children = new_children
+        with self._lock.write():
+            node = self._resolve(path)
+            if node is None or node.file_type != FileType.DIRECTORY or not self._is_writable(path):
+                return False
+            self._apply_metadata(path, "quota", quota or None)
+            self._record({"op": "metadata", "path": path, "key": "quota", "value": quota or None})
+            return True
     
-    def get_size(self, path: str) -> int:
-        """Get the size of a file or total size of a directory."""
+    def _apply_metadata(self, path: str, key: str, value: Any):
+        """Set (or, if None, remove) one metadata key, replacing the node's metadata."""
+        node = self._resolve(path)
+        self._touch(node)
+        if key == "versions":
+            for version_hash in version_hashes(value or ()):
+                self._ref_blob(version_hash)
+            for version_hash in version_hashes(node.metadata.get("versions", ())):
+                self._unref_blob(version_hash)
+        metadata = {name: item for name, item in node.metadata.items() if name != key}
+        if value is not None:
+            metadata[key] = value
+        node.metadata = metadata or EMPTY_METADATA
+    
+    def mirror_entry(self, path: str, is_directory: bool, size: int, mtime: float,
+                     source: Dict[str, Any]) -> bool:
+        """
+        Create or update an entry standing for something outside the VFS,
+        such as a real file (see core/vfs_sync.py). Mirrored files have no
+        body: only their size and modification time, with `source` kept
+        in metadata["mirror"], so they are searched and queried like any
+        other node, but read as None. Nothing at or under a mirrored
+        entry is created, written, deleted, renamed or moved except
+        through the mirror methods. The parent must exist, and a file
+        with a body here is not replaced.
+        
+        Args:
+            path: Entry path
+            is_directory: Mirror a directory rather than a file
+            size: File size in bytes (ignored for directories)
+            mtime: Modification time, epoch seconds
+            source: Identity of the original, e.g. {"inode": ...}
+        """
         path = self._normalize_path(path)
-        node = self._nodes.get(path)
+        if not self._is_valid_name(path.rpartition("/")[2]):
+            return False
+        size = 0 if is_directory else size
         
-        if not node:
-            return 0
+        with self._lock.write():
+            parent = self._resolve(self._get_parent_path(path))
+            if (parent is None or parent.file_type != FileType.DIRECTORY
+                    or not self._is_writable(path, mirror=True)):
+                return False
+            node = self._resolve(path)
+            if node is not None and ((node.file_type == FileType.DIRECTORY) != is_directory
+                                     or node.content_hash):
+                return False
+            ctime = node.ctime if node is not None else mtime
+            node = self._apply_mirror(path, is_directory, size, ctime, mtime, source)
+            self._record({"op": "mirror", "path": path, "inode": node.inode, "directory": is_directory,
+                          "size": size, "ctime": ctime, "mtime": mtime, "source": source})
+            return True
+    
+    def _apply_mirror(self, path: str, is_directory: bool, size: int, ctime: float, mtime: float,
+                      source: Dict[str, Any]) -> VFSNode:
+        """Create a mirrored entry under its (existing) parent, or update it in place."""
+        node = self._resolve(path)
+        if node is None:
+            if is_directory:
+                node = self._apply_mkdir(path, ctime)
+            else:
+                parent = self._resolve(self._get_parent_path(path))
+                node = VFSNode(name=path.rpartition("/")[2], file_type=FileType.FILE, size=size,
+                               ctime=ctime, mtime=mtime)
+                self._link(node, parent)
+                self._adjust_usage(parent, size, 1, 0)
+        else:
+            self._touch(node)
+            if not is_directory:
+                self._adjust_usage(node.parent, size - node.size, 0, 0)
+                node.size = size
+        node.mtime = mtime
+        metadata = dict(node.metadata)
+        metadata["mirror"] = source
+        node.metadata = metadata
+        if self._attributes_ready:
+            self._index_attributes(node)
+        return node
+    
+    def add_mirror_version(self, path: str, data: bytes, mtime: float) -> bool:
+        """
+        Add the body a mirrored file is about to be overwritten with on
+        disk to its history; for the mirror only (see MirrorSync.keep_version).
+        The current body is not in the VFS, so the newest version stays a
+        full copy and the one before it is queued for conversion to a delta.
         
-        if node.file_type == FileType.FILE:
-            return node.size
+        Args:
+            path: Mirrored file path
+            data: Body being replaced
+            mtime: When that body was written, epoch seconds
+        """
+        path = self._normalize_path(path)
+        if not self._max_versions or len(data) > HISTORY_SIZE_LIMIT:
+            return False
         
-        total = 0
-        for child_path in node.children:
-            total += self.get_size(child_path)
-        return total
+        with self._lock.write():
+            node = self._resolve(path)
+            if (node is None or node.file_type != FileType.FILE or "mirror" not in node.metadata
+                    or not self._is_writable(path, mirror=True)):
+                return False
+            versions = list(node.metadata.get("versions", ()))
+            versions.append({"mtime": mtime, "size": len(data), "hash": self._blobs.put(data)})
+            versions = versions[-self._max_versions:]
+            self._apply_metadata(path, "versions", versions)
+            self._record({"op": "metadata", "path": path, "key": "versions", "value": versions}, notify=False)
+            if len(versions) > 1 and "hash" in versions[-2] and versions[-2]["size"]:
+                self._deltas.submit((node.inode, versions[-2], versions[-1]["hash"]))
+            return True
+    
+    def get_usage(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a directory's usage, its own quota and the room left under
+        every quota above it, from the maintained aggregates in O(depth).
+        Returns None if path is not a directory.
+        """
+        path = self._normalize_path(path)
+        with self._lock.read():
+            node = self._resolve(path)
+            if node is None or node.file_type != FileType.DIRECTORY:
+                return None
+            quota = node.metadata.get("quota", {})
+            available_bytes = available_files = None
+            directory = node
+            while directory is not None:
+                limits = directory.metadata.get("quota")
+                if limits is not None:
+                    if "bytes" in limits:
+                        room = max(limits["bytes"] - directory.total_size, 0)
+                        available_bytes = room if available_bytes is None else min(available_bytes, room)
+                    if "files" in limits:
+                        room = max(limits["files"] - directory.file_count, 0)
+                        available_files = room if available_files is None else min(available_files, room)
+                directory = directory.parent
+            return {
+                "bytes": node.total_size,
+                "files": node.file_count,
+                "directories": node.dir_count,
+                "quota_bytes": quota.get("bytes"),
+                "quota_files": quota.get("files"),
+                "available_bytes": available_bytes,
+                "available_files": available_files,
+            }
     
     def get_stats(self) -> Dict[str, Any]:
         """Get VFS statistics."""
-        files = sum(1 for n in self._nodes.values() if n.file_type == FileType.FILE)
-        dirs = sum(1 for n in self._nodes.values() if n.file_type == FileType.DIRECTORY)
-        total_size = sum(n.size for n in self._nodes.values() if n.file_type == FileType.FILE)
-        
-        return {
-            "total_files": files,
-            "total_directories": dirs,
-            "total_size": total_size,
-            "total_nodes": len(self._nodes),
-        }
+        with self._lock.read():
+            root = self._root
+            index = self._index.stats()
+            trigrams = self._trigrams.stats()
+            stats = {
+                "total_files": root.file_count,
+                "total_directories": root.dir_count + 1,
+                "total_size": root.total_size,
+                "total_nodes": root.file_count + root.dir_count + 1,
+                "index_terms": index["terms"],
+                "index_postings": index["postings"],
+                "index_bytes": index["bytes"],
+                "trigram_grams": trigrams["grams"],
+                "trigram_postings": trigrams["postings"],
+            }
+        if self._content is not None:
+            content = self._content.index.stats()
+            stats["content_documents"] = content["documents"]
+            stats["content_terms"] = content["terms"]
+        return stats
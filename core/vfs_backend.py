@@ -0,0 +1,549 @@
+"""
+GlassOS VFS Storage Backends
+Pluggable persistence for Virtual File System metadata and file bodies.
+"""
+
+import hashlib
+import io
+import json
+import shutil
+import sqlite3
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Any, Set
+
+from .vfs_blobstore import BlobStore
+from .vfs_compression import BodyCodec
+
+
+class VFSBackend:
+    """
+    Interface for storing a VFS somewhere other than the built-in index,
+    journal and blob files (which remain the default when no backend is
+    given).
+    
+    The VFS keeps its tree in memory and passes every mutation to the
+    backend as a journal-style record; `commit` makes everything recorded
+    so far durable and runs on the persistence thread. Node rows are tuples
+    of (inode, parent inode or None, name, file type value, size, ctime,
+    mtime, content hash, metadata), with parents before children.
+    """
+    
+    def open(self, fsync_policy: str):
+        """Open the store, creating it if needed."""
+        raise NotImplementedError
+    
+    def is_empty(self) -> bool:
+        """Check whether the store holds no tree yet."""
+        raise NotImplementedError
+    
+    def load(self) -> List[tuple]:
+        """Get every node row, parents before children."""
+        raise NotImplementedError
+    
+    def save(self, rows: List[tuple]):
+        """Replace the stored tree with the given node rows."""
+        raise NotImplementedError
+    
+    def record(self, record: Dict[str, Any]):
+        """Apply one mutation record to the pending batch."""
+        raise NotImplementedError
+    
+    def commit(self):
+        """Make every recorded mutation durable."""
+        raise NotImplementedError
+    
+    def put(self, data: bytes) -> str:
+        """Store a body and return its content hash."""
+        raise NotImplementedError
+    
+    def get(self, content_hash: str) -> Optional[bytes]:
+        """Load a body by hash, or None if it is missing."""
+        raise NotImplementedError
+    
+    def delete(self, content_hash: str):
+        """Remove a body that is no longer referenced."""
+        raise NotImplementedError
+    
+    def use_codec(self, codec: BodyCodec):
+        """Compress bodies with this codec; backends that cannot may ignore it."""
+        pass
+    
+    def open_reader(self, content_hash: str) -> Optional[BinaryIO]:
+        """Open a body for streaming reads, or None if it is missing."""
+        data = self.get(content_hash)
+        return io.BytesIO(data) if data is not None else None
+    
+    def open_writer(self):
+        """
+        Start streaming a new body. The writer has write(data), a size
+        attribute, commit() returning the content hash, and abort().
+        """
+        raise NotImplementedError
+    
+    def match_names(self, term: str) -> Optional[Set[int]]:
+        """
+        Get the inodes whose names contain a lowercase term, or None if
+        the backend does not index names (the VFS then uses its own).
+        """
+        return None
+    
+    def close(self):
+        """Commit and release the store."""
+        raise NotImplementedError
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    inode INTEGER PRIMARY KEY,
+    parent INTEGER,
+    name TEXT NOT NULL,
+    file_type TEXT NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,
+    ctime REAL NOT NULL,
+    mtime REAL NOT NULL,
+    content_hash TEXT,
+    metadata TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS nodes_parent_name ON nodes(parent, name);
+CREATE TABLE IF NOT EXISTS content (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    data BLOB NOT NULL,
+    compressed INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# Trigram full-text index over names, kept in sync with nodes by triggers
+NAME_INDEX_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS node_names USING fts5(
+    name, content='nodes', content_rowid='inode', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS nodes_insert AFTER INSERT ON nodes BEGIN
+    INSERT INTO node_names(rowid, name) VALUES (new.inode, new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS nodes_delete AFTER DELETE ON nodes BEGIN
+    INSERT INTO node_names(node_names, rowid, name) VALUES ('delete', old.inode, old.name);
+END;
+CREATE TRIGGER IF NOT EXISTS nodes_rename AFTER UPDATE OF name ON nodes BEGIN
+    INSERT INTO node_names(node_names, rowid, name) VALUES ('delete', old.inode, old.name);
+    INSERT INTO node_names(rowid, name) VALUES (new.inode, new.name);
+END;
+"""
+
+SYNCHRONOUS = {"never": "OFF", "snapshot": "NORMAL", "always": "FULL"}
+
+CHUNK_SIZE = 1024 * 1024
+
+# Incremental blob I/O (Connection.blobopen) needs Python 3.11
+HAS_BLOBOPEN = hasattr(sqlite3.Connection, "blobopen")
+
+
+class _SQLiteBlobWriter:
+    """Spools a streamed body to a temp file, then copies it into the content table."""
+    
+    def __init__(self, backend: "SQLiteBackend"):
+        self._backend = backend
+        self._file = tempfile.TemporaryFile()
+        self._hash = hashlib.sha256()
+        self.size = 0
+    
+    def write(self, data: bytes) -> int:
+        self._file.write(data)
+        self._hash.update(data)
+        self.size += len(data)
+        return len(data)
+    
+    def commit(self) -> str:
+        content_hash = self._hash.hexdigest()
+        self._file.seek(0)
+        try:
+            self._backend._insert_stream(content_hash, self.size, self._file)
+        finally:
+            self._file.close()
+        return content_hash
+    
+    def abort(self):
+        self._file.close()
+
+
+class _SQLiteRowBlob:
+    """
+    Read-only stand-in for sqlite3.Blob where blobopen is missing: each
+    read selects just the requested range with substr(). Callers hold
+    the backend lock, as they do for a real blob.
+    """
+    
+    def __init__(self, conn: sqlite3.Connection, rowid: int, length: int):
+        self._conn = conn
+        self._rowid = rowid
+        self._length = length
+        self._offset = 0
+    
+    def read(self, length: int = -1) -> bytes:
+        remaining = self._length - self._offset
+        length = remaining if length < 0 else min(length, remaining)
+        if length <= 0:
+            return b""
+        row = self._conn.execute(
+            "SELECT substr(data, ?, ?) FROM content WHERE id = ?", (self._offset + 1, length, self._rowid)
+        ).fetchone()
+        data = bytes(row[0]) if row is not None else b""
+        self._offset += len(data)
+        return data
+    
+    def seek(self, offset: int, origin: int = io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._offset, io.SEEK_END: self._length}[origin]
+        if not 0 <= base + offset <= self._length:
+            raise ValueError("offset out of blob range")
+        self._offset = base + offset
+    
+    def tell(self) -> int:
+        return self._offset
+    
+    def close(self):
+        pass
+
+
+class _SQLiteBlobReader(io.RawIOBase):
+    """Incremental reads from a content row, holding the backend lock per call."""
+    
+    def __init__(self, backend: "SQLiteBackend", blob):
+        self._backend = backend
+        self._blob = blob
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        with self._backend._lock:
+            data = self._blob.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        with self._backend._lock:
+            self._blob.seek(offset, whence)
+            return self._blob.tell()
+    
+    def tell(self) -> int:
+        with self._backend._lock:
+            return self._blob.tell()
+    
+    def close(self):
+        if not self.closed:
+            with self._backend._lock:
+                self._blob.close()
+        super().close()
+
+
+class SQLiteBackend(VFSBackend):
+    """
+    Stores the VFS in one SQLite database: a nodes table indexed on
+    (parent, name), a content table keyed by hash, and an FTS5 trigram
+    index over names. Runs in WAL mode; recorded mutations accumulate in
+    one open transaction until the next commit. Bodies stored with put()
+    may be compressed by the codec; streamed bodies are stored verbatim.
+    """
+    
+    def __init__(self, db_path: Path):
+        """
+        Initialize the backend.
+        
+        Args:
+            db_path: Database file to use
+        """
+        self.db_path = Path(db_path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()  # The VFS and its worker threads share one connection
+        self._names_indexed = False
+        self._codec: Optional[BodyCodec] = None
+    
+    def open(self, fsync_policy: str):
+        """Open the database and create the schema."""
+        with self._lock:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # Transactions are managed explicitly, one per commit batch
+            self._conn = sqlite3.connect(str(self.db_path), isolation_level=None,
+                                         check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"PRAGMA synchronous={SYNCHRONOUS[fsync_policy]}")
+            self._conn.executescript(SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(content)")}
+            if "compressed" not in columns:
+                # Databases from before compression
+                self._conn.execute("ALTER TABLE content ADD COLUMN compressed INTEGER NOT NULL DEFAULT 0")
+            try:
+                self._conn.executescript(NAME_INDEX_SCHEMA)
+                self._names_indexed = True
+            except sqlite3.OperationalError as e:
+                # SQLite builds without FTS5 or the trigram tokenizer
+                print(f"⚠️  SQLite name index unavailable: {e}")
+    
+    def _begin(self):
+        if not self._conn.in_transaction:
+            self._conn.execute("BEGIN")
+    
+    def is_empty(self) -> bool:
+        """Check whether the database holds no tree yet."""
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM nodes LIMIT 1").fetchone() is None
+    
+    def load(self) -> List[tuple]:
+        """Get every node row, parents before children, and drop orphaned bodies."""
+        with self._lock:
+            # A commit can land between a body's insert and its node's;
+            # bodies are referenced by nodes and by their version history
+            self._begin()
+            self._conn.execute(
+                "DELETE FROM content WHERE hash NOT IN ("
+                "SELECT content_hash FROM nodes WHERE content_hash IS NOT NULL "
+                "UNION SELECT coalesce(json_extract(version.value, '$.delta'), "
+                "json_extract(version.value, '$.hash')) "
+                "FROM nodes, json_each(nodes.metadata, '$.versions') AS version "
+                "WHERE nodes.metadata IS NOT NULL)"
+            )
+            self._conn.execute("COMMIT")
+            
+            children: Dict[Optional[int], List[tuple]] = {}
+            for row in self._conn.execute(
+                "SELECT inode, parent, name, file_type, size, ctime, mtime, content_hash, metadata "
+                "FROM nodes ORDER BY inode"
+            ):
+                children.setdefault(row[1], []).append(row)
+        
+        rows = []
+        stack = list(reversed(children.get(None, [])))
+        while stack:
+            row = stack.pop()
+            metadata = json.loads(row[8]) if row[8] else {}
+            rows.append(row[:8] + (metadata,))
+            stack.extend(reversed(children.get(row[0], [])))
+        return rows
+    
+    def save(self, rows: List[tuple]):
+        """Replace the stored tree in one transaction."""
+        with self._lock:
+            self._begin()
+            self._conn.execute("DELETE FROM nodes")
+            self._conn.executemany(
+                "INSERT INTO nodes (inode, parent, name, file_type, size, ctime, mtime, "
+                "content_hash, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (row[:8] + (json.dumps(row[8]) if row[8] else None,) for row in rows),
+            )
+            self._conn.execute("COMMIT")
+    
+    def _lookup(self, path: str) -> Optional[int]:
+        """Resolve a path to an inode, one indexed (parent, name) lookup per component."""
+        row = self._conn.execute("SELECT inode FROM nodes WHERE parent IS NULL").fetchone()
+        for part in path.split("/"):
+            if not part or row is None:
+                continue
+            row = self._conn.execute(
+                "SELECT inode FROM nodes WHERE parent = ? AND name = ?", (row[0], part)
+            ).fetchone()
+        return row[0] if row is not None else None
+    
+    def _set_metadata(self, inode: int, key: str, value: Any):
+        """Set (or, if empty, remove) one key of a node's metadata."""
+        row = self._conn.execute("SELECT metadata FROM nodes WHERE inode = ?", (inode,)).fetchone()
+        metadata = json.loads(row[0]) if row is not None and row[0] else {}
+        if value:
+            metadata[key] = value
+        else:
+            metadata.pop(key, None)
+        self._conn.execute(
+            "UPDATE nodes SET metadata = ? WHERE inode = ?",
+            (json.dumps(metadata) if metadata else None, inode),
+        )
+    
+    def record(self, record: Dict[str, Any]):
+        """Apply one mutation record inside the open transaction."""
+        op = record.get("op")
+        path = record.get("path", "")
+        parent_path, _, name = path.rpartition("/")
+        with self._lock:
+            self._begin()
+            if op == "batch":
+                for inner in record["records"]:
+                    self.record(inner)
+            elif op == "mkdir":
+                self._conn.execute(
+                    "INSERT INTO nodes (inode, parent, name, file_type, ctime, mtime) "
+                    "VALUES (?, ?, ?, 'directory', ?, ?)",
+                    (record["inode"], self._lookup(parent_path), name, record["ctime"], record["ctime"]),
+                )
+            elif op == "write":
+                self._conn.execute(
+                    "INSERT INTO nodes (inode, parent, name, file_type, size, ctime, mtime, content_hash) "
+                    "VALUES (?, ?, ?, 'file', ?, ?, ?, ?) "
+                    "ON CONFLICT(inode) DO UPDATE SET size = excluded.size, ctime = excluded.ctime, "
+                    "mtime = excluded.mtime, content_hash = excluded.content_hash",
+                    (record["inode"], self._lookup(parent_path), name, record["size"],
+                     record["ctime"], record["mtime"], record["hash"]),
+                )
+                if "versions" in record:
+                    self._set_metadata(record["inode"], "versions", record["versions"])
+            elif op == "delete":
+                self._conn.execute(
+                    "WITH RECURSIVE subtree(inode) AS ("
+                    "SELECT ? UNION ALL SELECT nodes.inode FROM nodes "
+                    "JOIN subtree ON nodes.parent = subtree.inode) "
+                    "DELETE FROM nodes WHERE inode IN subtree",
+                    (self._lookup(path),),
+                )
+            elif op == "rename":
+                self._conn.execute(
+                    "UPDATE nodes SET name = ?, mtime = ? WHERE inode = ?",
+                    (record["name"], record["mtime"], self._lookup(path)),
+                )
+            elif op == "move":
+                self._conn.execute(
+                    "UPDATE nodes SET parent = ? WHERE inode = ?",
+                    (self._lookup(record["dest"]), self._lookup(path)),
+                )
+            elif op == "metadata":
+                self._set_metadata(self._lookup(path), record["key"], record["value"])
+            elif op == "mirror":
+                if record["directory"]:
+                    self._conn.execute(
+                        "INSERT INTO nodes (inode, parent, name, file_type, ctime, mtime) "
+                        "VALUES (?, ?, ?, 'directory', ?, ?) "
+                        "ON CONFLICT(inode) DO UPDATE SET mtime = excluded.mtime",
+                        (record["inode"], self._lookup(parent_path), name, record["ctime"], record["mtime"]),
+                    )
+                else:
+                    self._conn.execute(
+                        "INSERT INTO nodes (inode, parent, name, file_type, size, ctime, mtime) "
+                        "VALUES (?, ?, ?, 'file', ?, ?, ?) "
+                        "ON CONFLICT(inode) DO UPDATE SET size = excluded.size, mtime = excluded.mtime",
+                        (record["inode"], self._lookup(parent_path), name, record["size"],
+                         record["ctime"], record["mtime"]),
+                    )
+                self._set_metadata(record["inode"], "mirror", record["source"])
+    
+    def commit(self):
+        """Commit the open transaction, if any."""
+        with self._lock:
+            if self._conn.in_transaction:
+                self._conn.execute("COMMIT")
+    
+    def use_codec(self, codec: BodyCodec):
+        """Compress bodies stored with put() from now on."""
+        self._codec = codec
+    
+    def put(self, data: bytes) -> str:
+        """Store a body and return its content hash."""
+        content_hash = BlobStore.hash_bytes(data)
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM content WHERE hash = ?", (content_hash,)).fetchone():
+                return content_hash
+        packed = self._codec.compress(data) if self._codec is not None else None
+        if packed is not None:
+            self._codec.cache.put(content_hash, data)
+        with self._lock:
+            self._begin()
+            self._conn.execute(
+                "INSERT OR IGNORE INTO content (hash, data, compressed) VALUES (?, ?, ?)",
+                (content_hash, packed if packed is not None else data, packed is not None),
+            )
+        return content_hash
+    
+    def get(self, content_hash: str) -> Optional[bytes]:
+        """Load a body by hash, or None if it is missing."""
+        if self._codec is not None:
+            data = self._codec.cache.get(content_hash)
+            if data is not None:
+                self._codec.stats.record_cache(True)
+                return data
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, compressed FROM content WHERE hash = ?", (content_hash,)
+            ).fetchone()
+        if row is None:
+            return None
+        if not row[1]:
+            return bytes(row[0])
+        if self._codec is None:
+            return zlib.decompress(row[0])
+        self._codec.stats.record_cache(False)
+        return self._codec.decompress(content_hash, row[0])
+    
+    def delete(self, content_hash: str):
+        """Remove a body inside the open transaction."""
+        if self._codec is not None:
+            self._codec.cache.discard(content_hash)
+        with self._lock:
+            self._begin()
+            self._conn.execute("DELETE FROM content WHERE hash = ?", (content_hash,))
+    
+    def open_reader(self, content_hash: str) -> Optional[BinaryIO]:
+        """Open a body for incremental reads straight from the database."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, compressed, length(data) FROM content WHERE hash = ?", (content_hash,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1]:
+                # Compressed bodies are inflated up front; they are never streamed in
+                return io.BytesIO(self.get(content_hash))
+            if HAS_BLOBOPEN:
+                blob = self._conn.blobopen("content", "data", row[0], readonly=True)
+            else:
+                blob = _SQLiteRowBlob(self._conn, row[0], row[2])
+        return io.BufferedReader(_SQLiteBlobReader(self, blob), CHUNK_SIZE)
+    
+    def open_writer(self) -> _SQLiteBlobWriter:
+        """Start streaming a new body."""
+        return _SQLiteBlobWriter(self)
+    
+    def _insert_stream(self, content_hash: str, size: int, source: BinaryIO):
+        """Store a body of known size from a file, chunk by chunk."""
+        with self._lock:
+            self._begin()
+            if not HAS_BLOBOPEN:
+                # No incremental blob I/O: the body is inserted in one piece
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO content (hash, data) VALUES (?, ?)",
+                    (content_hash, source.read()),
+                )
+                return
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO content (hash, data) VALUES (?, zeroblob(?))",
+                (content_hash, size),
+            )
+            if cursor.rowcount and size:
+                with self._conn.blobopen("content", "data", cursor.lastrowid) as blob:
+                    shutil.copyfileobj(source, blob, CHUNK_SIZE)
+    
+    def match_names(self, term: str) -> Optional[Set[int]]:
+        """Get the inodes whose names contain a lowercase term."""
+        if not self._names_indexed:
+            return None
+        with self._lock:
+            if len(term) >= 3:
+                # A quoted trigram query matches the term as a substring
+                cursor = self._conn.execute(
+                    "SELECT rowid FROM node_names WHERE node_names MATCH ?",
+                    ('"' + term.replace('"', '""') + '"',),
+                )
+            else:
+                escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                cursor = self._conn.execute(
+                    "SELECT inode FROM nodes WHERE name LIKE ? ESCAPE '\\'", (f"%{escaped}%",)
+                )
+            return {row[0] for row in cursor}
+    
+    def close(self):
+        """Commit and close the database."""
+        with self._lock:
+            if self._conn is not None:
+                self.commit()
+                self._conn.close()
+                self._conn = None
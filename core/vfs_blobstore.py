@@ -0,0 +1,224 @@
+"""
+GlassOS VFS Blob Store
+Content-addressed storage for Virtual File System file bodies.
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Optional, Set
+
+from .vfs_compression import BodyCodec
+from .vfs_persistence import fsync_directory, fsync_file
+
+INCOMING_PREFIX = ".incoming-"  # Streamed bodies before they are committed
+COMPRESSED_SUFFIX = ".z"  # Blob files holding a zlib-compressed body
+
+
+class BlobWriter:
+    """
+    Streams a new body into the store, hashing it as it is written.
+    Nothing is visible under a hash until commit().
+    """
+    
+    def __init__(self, store: "BlobStore"):
+        """
+        Start a new body.
+        
+        Args:
+            store: Store the body will be committed to
+        """
+        self._store = store
+        store.root_path.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=INCOMING_PREFIX, dir=store.root_path)
+        self._tmp_path = Path(tmp_path)
+        self._file = os.fdopen(fd, "wb")
+        self._hash = hashlib.sha256()
+        self.size = 0
+    
+    def write(self, data: bytes) -> int:
+        """Append bytes to the body."""
+        self._file.write(data)
+        self._hash.update(data)
+        self.size += len(data)
+        return len(data)
+    
+    def commit(self) -> str:
+        """Move the body into place and return its content hash."""
+        self._file.close()
+        content_hash = self._hash.hexdigest()
+        if self._store._exists(content_hash):
+            os.remove(self._tmp_path)
+        else:
+            self._store._install(self._tmp_path, self._store._blob_path(content_hash))
+        return content_hash
+    
+    def abort(self):
+        """Throw the body away."""
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class BlobStore:
+    """
+    Stores file bodies as individual files keyed by their SHA-256 hash.
+    Identical bodies share one blob; callers keep reference counts.
+    
+    With a codec, bodies passed to put() may be stored compressed, under
+    the same name plus COMPRESSED_SUFFIX. Streamed bodies are always stored
+    verbatim so they can still be read in chunks and memory-mapped.
+    """
+    
+    def __init__(self, root_path: Path, codec: Optional[BodyCodec] = None,
+                 fsync_policy: str = "never"):
+        """
+        Initialize the blob store.
+        
+        Args:
+            root_path: Directory that holds the blob files
+            codec: Compresses bodies on put(); None stores everything verbatim
+            fsync_policy: "always" fsyncs every blob as it is stored,
+                "snapshot" leaves that to sync(), "never" to the OS
+        """
+        self.root_path = Path(root_path)
+        self.codec = codec
+        self.fsync_policy = fsync_policy
+        self._unsynced: Set[Path] = set()  # Blob files stored since the last sync()
+        self._unsynced_lock = threading.Lock()
+    
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """Compute the content key for a body."""
+        return hashlib.sha256(data).hexdigest()
+    
+    def _blob_path(self, content_hash: str) -> Path:
+        """Get the on-disk path of a blob (fanned out by hash prefix)."""
+        return self.root_path / content_hash[:2] / content_hash[2:]
+    
+    def _compressed_path(self, content_hash: str) -> Path:
+        """Get the on-disk path of a compressed blob."""
+        blob_path = self._blob_path(content_hash)
+        return blob_path.with_name(blob_path.name + COMPRESSED_SUFFIX)
+    
+    def _exists(self, content_hash: str) -> bool:
+        """Check whether a body is stored in either form."""
+        return self._blob_path(content_hash).exists() or self._compressed_path(content_hash).exists()
+    
+    def put(self, data: bytes) -> str:
+        """Store a body and return its content hash."""
+        content_hash = self.hash_bytes(data)
+        if self._exists(content_hash):
+            return content_hash
+        packed = self.codec.compress(data) if self.codec is not None else None
+        if packed is not None:
+            blob_path = self._compressed_path(content_hash)
+            self.codec.cache.put(content_hash, data)
+        else:
+            blob_path = self._blob_path(content_hash)
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = blob_path.with_name(blob_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(packed if packed is not None else data)
+        self._install(tmp_path, blob_path)
+        return content_hash
+    
+    def _install(self, tmp_path: Path, blob_path: Path):
+        """Move a finished body file into place and queue it for sync()."""
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, blob_path)
+        if self.fsync_policy == "never":
+            return
+        with self._unsynced_lock:
+            self._unsynced.add(blob_path)
+        if self.fsync_policy == "always":
+            self.sync()
+    
+    def sync(self):
+        """
+        Flush the blobs stored since the last call, and their directory
+        entries, to disk. The VFS calls this before writing an index or
+        journal record that references them.
+        """
+        with self._unsynced_lock:
+            paths, self._unsynced = self._unsynced, set()
+        try:
+            directories = set()
+            for path in paths:
+                try:
+                    fsync_file(path)
+                except FileNotFoundError:
+                    continue  # Deleted since
+                directories.add(path.parent)
+            for directory in directories:
+                fsync_directory(directory)
+            if directories:
+                fsync_directory(self.root_path)  # New fan-out directories
+        except OSError:
+            with self._unsynced_lock:
+                self._unsynced |= paths
+            raise
+    
+    def get(self, content_hash: str) -> Optional[bytes]:
+        """Load a body by hash, or None if the blob is missing."""
+        try:
+            with open(self._blob_path(content_hash), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+        if self.codec is not None:
+            data = self.codec.cached(content_hash)
+            if data is not None:
+                return data
+        try:
+            with open(self._compressed_path(content_hash), "rb") as f:
+                packed = f.read()
+        except FileNotFoundError:
+            return None
+        if self.codec is None:
+            return zlib.decompress(packed)
+        return self.codec.decompress(content_hash, packed)
+    
+    def open_reader(self, content_hash: str) -> Optional[BinaryIO]:
+        """Open a body for streaming reads, or None if the blob is missing."""
+        try:
+            return open(self._blob_path(content_hash), "rb")
+        except FileNotFoundError:
+            pass
+        # Compressed bodies are inflated up front; they are never streamed in
+        data = self.get(content_hash)
+        return io.BytesIO(data) if data is not None else None
+    
+    def open_writer(self) -> BlobWriter:
+        """Start streaming a new body into the store."""
+        return BlobWriter(self)
+    
+    def discard_incoming(self):
+        """Remove bodies left half-written by a crash."""
+        if not self.root_path.exists():
+            return
+        for path in self.root_path.glob(INCOMING_PREFIX + "*"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def delete(self, content_hash: str):
+        """Remove a blob from disk."""
+        if self.codec is not None:
+            self.codec.cache.discard(content_hash)
+        for blob_path in (self._blob_path(content_hash), self._compressed_path(content_hash)):
+            try:
+                os.remove(blob_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # e.g. still open for streaming on Windows; it becomes dead weight
+                print(f"⚠️  Could not delete VFS blob {content_hash[:12]}: {e}")
+
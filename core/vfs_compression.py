@@ -0,0 +1,167 @@
+"""
+GlassOS VFS Compression
+Transparent zlib compression of Virtual File System file bodies.
+"""
+
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+DEFAULT_LEVEL = 6
+DEFAULT_THRESHOLD = 1024  # Smaller bodies rarely shrink enough to pay off
+DEFAULT_CACHE_BYTES = 8 * 1024 * 1024
+
+
+class CompressionStats:
+    """Compression ratio, CPU time and cache counters."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.compressed = 0  # Bodies stored compressed
+        self.skipped = 0  # Bodies over the threshold that did not shrink
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.compress_time = 0.0
+        self.decompressed = 0
+        self.decompress_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+    
+    def record_compress(self, raw: int, stored: Optional[int], cpu: float):
+        """Account for one compression attempt (stored is None if it was not kept)."""
+        with self._lock:
+            self.compress_time += cpu
+            if stored is None:
+                self.skipped += 1
+            else:
+                self.compressed += 1
+                self.raw_bytes += raw
+                self.stored_bytes += stored
+    
+    def record_decompress(self, cpu: float):
+        """Account for one decompression."""
+        with self._lock:
+            self.decompressed += 1
+            self.decompress_time += cpu
+    
+    def record_cache(self, hit: bool):
+        """Account for one cache lookup."""
+        with self._lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert counters to a dictionary."""
+        with self._lock:
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                "compressed_bodies": self.compressed,
+                "incompressible_bodies": self.skipped,
+                "raw_bytes": self.raw_bytes,
+                "stored_bytes": self.stored_bytes,
+                "ratio": self.raw_bytes / self.stored_bytes if self.stored_bytes else 1.0,
+                "compress_cpu_ms": self.compress_time * 1000,
+                "decompressions": self.decompressed,
+                "decompress_cpu_ms": self.decompress_time * 1000,
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            }
+
+
+class BodyCache:
+    """Least-recently-used cache of decompressed bodies, bounded in bytes."""
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._lock = threading.Lock()
+        self._bodies: "OrderedDict[str, bytes]" = OrderedDict()
+    
+    def get(self, content_hash: str) -> Optional[bytes]:
+        """Look up a body, marking it most recently used."""
+        with self._lock:
+            data = self._bodies.get(content_hash)
+            if data is not None:
+                self._bodies.move_to_end(content_hash)
+            return data
+    
+    def put(self, content_hash: str, data: bytes):
+        """Cache a body, evicting the least recently used ones to make room."""
+        if len(data) > self.max_bytes // 4:
+            return  # One huge body would flush everything else
+        with self._lock:
+            if content_hash in self._bodies:
+                self._bodies.move_to_end(content_hash)
+                return
+            self._bodies[content_hash] = data
+            self.nbytes += len(data)
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._bodies.popitem(last=False)
+                self.nbytes -= len(evicted)
+    
+    def discard(self, content_hash: str):
+        """Drop a body from the cache."""
+        with self._lock:
+            data = self._bodies.pop(content_hash, None)
+            if data is not None:
+                self.nbytes -= len(data)
+
+
+class BodyCodec:
+    """
+    Decides which bodies to compress and compresses them.
+    
+    Bodies of at least `threshold` bytes are deflated at the configured
+    level and kept compressed only if that makes them smaller. Decompressed
+    bodies go through a small LRU cache, since bodies never change once
+    stored. Level 0 turns compression off.
+    """
+    
+    def __init__(self, level: int = DEFAULT_LEVEL, threshold: int = DEFAULT_THRESHOLD,
+                 cache_bytes: int = DEFAULT_CACHE_BYTES):
+        """
+        Initialize the codec.
+        
+        Args:
+            level: zlib level, 1 (fastest) to 9 (smallest); 0 disables
+            threshold: Smallest body size worth compressing, in bytes
+            cache_bytes: Budget for the decompressed-body cache
+        """
+        if not 0 <= level <= 9:
+            raise ValueError("compression level must be between 0 and 9")
+        self.level = level
+        self.threshold = threshold
+        self.cache = BodyCache(cache_bytes)
+        self.stats = CompressionStats()
+    
+    def compress(self, data: bytes) -> Optional[bytes]:
+        """Get the compressed form of a body, or None if it should be stored verbatim."""
+        if not self.level or len(data) < self.threshold:
+            return None
+        start = time.thread_time()
+        packed = zlib.compress(data, self.level)
+        cpu = time.thread_time() - start
+        if len(packed) >= len(data):
+            self.stats.record_compress(len(data), None, cpu)
+            return None
+        self.stats.record_compress(len(data), len(packed), cpu)
+        return packed
+    
+    def decompress(self, content_hash: str, packed: bytes) -> bytes:
+        """Inflate a stored body, caching the result under its hash."""
+        start = time.thread_time()
+        data = zlib.decompress(packed)
+        self.stats.record_decompress(time.thread_time() - start)
+        self.cache.put(content_hash, data)
+        return data
+    
+    def cached(self, content_hash: str) -> Optional[bytes]:
+        """Get a decompressed body from the cache, or None."""
+        data = self.cache.get(content_hash)
+        self.stats.record_cache(data is not None)
+        return data
@@ -0,0 +1,184 @@
+"""
+GlassOS VFS Index Format
+Versioned binary layout for the Virtual File System index snapshot.
+
+The file is a fixed header followed by one fixed-width column per node
+field and a string table. Columns are 8-byte aligned and stored in the
+writer's native byte order, so a reader on the same machine can use them
+straight out of a memory map.
+    
+    header    magic, version, byte order, node count, string count,
+              journal sequence
+    parent    int32    index of the parent record, -1 for the root
+    kind      uint8    file type code
+    size      int64    file size in bytes
+    ctime     float64  creation time, epoch seconds
+    mtime     float64  modification time, epoch seconds
+    name      uint32   string id of the node name
+    hash      uint32   string id of the content hash, or NO_STRING
+    meta      uint32   string id of the JSON metadata, or NO_STRING
+    strings   NUL-separated UTF-8, each distinct string stored once
+
+Records are in depth-first order, so every parent precedes its children.
+
+Version 2 adds sharding. The root index may hold stub records (kind
+SHARD_KIND) for top-level directories whose subtrees live in separate
+shard files, written in this same layout with the directory as record 0.
+A stub's `hash` names its shard file, `size` is the subtree's total size
+and `meta` is JSON {"files", "dirs", "metadata"} with the subtree's
+counts and the directory's own metadata.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, List, Any
+
+MAGIC = b"GVFSIDX\0"
+VERSION = 2
+READABLE_VERSIONS = (1, 2)
+NO_STRING = 0xFFFFFFFF
+SHARD_KIND = 3  # Stub for a directory stored in a shard file
+
+HEADER = struct.Struct("<8sHHIIQ")  # magic, version, byte order, nodes, strings, journal seq
+
+# (name, array typecode) in file order
+COLUMNS = (
+    ("parent", "i"),
+    ("kind", "B"),
+    ("size", "q"),
+    ("ctime", "d"),
+    ("mtime", "d"),
+    ("name", "I"),
+    ("hash", "I"),
+    ("meta", "I"),
+)
+
+BYTE_ORDERS = {"little": 0, "big": 1}
+
+
+def _padding(offset: int) -> int:
+    """Bytes needed to bring an offset up to 8-byte alignment."""
+    return -offset % 8
+
+
+def write_index(f, columns: Dict[str, array], strings: List[str], journal_seq: int) -> int:
+    """
+    Write an index to an open binary file.
+    Returns the number of bytes written.
+    """
+    table = "\0".join(strings)
+    if table.count("\0") != max(len(strings) - 1, 0):
+        raise ValueError("index strings may not contain NUL characters")
+    count = len(columns["parent"])
+    f.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDERS[sys.byteorder], count,
+                        len(strings), journal_seq))
+    offset = HEADER.size
+    for name, _ in COLUMNS:
+        data = columns[name].tobytes()
+        pad = _padding(offset + len(data))
+        f.write(data + b"\0" * pad)
+        offset += len(data) + pad
+    table = table.encode("utf-8")
+    f.write(table)
+    return offset + len(table)
+
+
+class IndexReader:
+    """
+    Memory-mapped view of a binary index file.
+    Columns are zero-copy memoryviews while the reader is open; close it
+    (or use it as a context manager) before replacing the file.
+    """
+    
+    def __init__(self, path: Path):
+        """
+        Open and validate an index file.
+        
+        Args:
+            path: Index file to map
+        """
+        self._file = open(path, "rb")
+        self.nbytes = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views: List[memoryview] = []
+        try:
+            self._parse()
+        except Exception:
+            self.close()
+            raise
+    
+    def _parse(self):
+        if self.nbytes < HEADER.size:
+            raise ValueError("index file is truncated")
+        magic, version, byte_order, count, string_count, journal_seq = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError("not a VFS index file")
+        if version not in READABLE_VERSIONS:
+            raise ValueError(f"unsupported index version {version}")
+        self.count = count
+        self.journal_seq = journal_seq
+        
+        native = byte_order == BYTE_ORDERS[sys.byteorder]
+        view = memoryview(self._map)
+        self._views.append(view)
+        self.columns: Dict[str, Any] = {}
+        offset = HEADER.size
+        for name, typecode in COLUMNS:
+            width = array(typecode).itemsize * count
+            if offset + width > self.nbytes:
+                raise ValueError("index file is truncated")
+            raw = view[offset:offset + width]
+            self._views.append(raw)
+            if native:
+                column = raw.cast(typecode)
+                self._views.append(column)
+            else:
+                column = array(typecode, raw.tobytes())
+                column.byteswap()
+            self.columns[name] = column
+            offset += width + _padding(offset + width)
+        
+        table = self._map[offset:].decode("utf-8")
+        self.strings = table.split("\0") if string_count else []
+        if len(self.strings) != string_count:
+            raise ValueError("index string table is corrupt")
+    
+    def close(self):
+        """Release the mapping and the file."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._map.close()
+        self._file.close()
+    
+    def __enter__(self) -> "IndexReader":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class StringTable:
+    """Interns strings to dense ids for the index string table."""
+    
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+    
+    def intern(self, value: str) -> int:
+        """Get the id of a string, adding it on first use."""
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+
+def new_columns() -> Dict[str, array]:
+    """Empty column arrays, ready to be filled by a writer."""
+    return {name: array(typecode) for name, typecode in COLUMNS}
+
@@ -0,0 +1,111 @@
+"""
+GlassOS VFS History
+Line deltas for keeping earlier versions of Virtual File System files.
+
+History is a chain of reverse deltas: the newest version is the file's
+current body, and each older version is stored as the edit that turns the
+version after it back into it. Deltas live in the blob store like any
+other body.
+
+A version is first kept as a full copy of the old body, and a DeltaWorker
+swaps in the delta later, so diffing never holds up writers.
+"""
+
+import difflib
+import json
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+HISTORY_SIZE_LIMIT = 1024 * 1024  # Larger bodies are not versioned
+DELTA_LINE_LIMIT = 2000  # Differing lines diffed at most; diffing is quadratic in them
+
+
+def make_delta(newer: str, older: str) -> Optional[bytes]:
+    """
+    Encode how to rebuild `older` from `newer`: a JSON list whose items
+    are either [start, end] line ranges copied from `newer` or literal text.
+    Returns None if more than DELTA_LINE_LIMIT lines on either side lie
+    between the lines the two share at their start and end.
+    """
+    newer_lines = newer.splitlines(keepends=True)
+    older_lines = older.splitlines(keepends=True)
+    
+    # Shared leading and trailing lines are copied without diffing, so a
+    # small edit to a large file costs only its own size
+    shortest = min(len(newer_lines), len(older_lines))
+    prefix = 0
+    while prefix < shortest and newer_lines[prefix] == older_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < shortest - prefix and newer_lines[-1 - suffix] == older_lines[-1 - suffix]:
+        suffix += 1
+    newer_end, older_end = len(newer_lines) - suffix, len(older_lines) - suffix
+    if max(newer_end, older_end) - prefix > DELTA_LINE_LIMIT:
+        return None
+    
+    ops: List[Any] = [[0, prefix]] if prefix else []
+    matcher = difflib.SequenceMatcher(None, newer_lines[prefix:newer_end],
+                                      older_lines[prefix:older_end], autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([prefix + i1, prefix + i2])
+        elif j2 > j1:
+            ops.append("".join(older_lines[prefix + j1:prefix + j2]))
+    if suffix:
+        ops.append([newer_end, len(newer_lines)])
+    return json.dumps(ops, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def apply_delta(newer: str, delta: bytes) -> str:
+    """Rebuild the older text from the newer one and a delta."""
+    newer_lines = newer.splitlines(keepends=True)
+    parts = []
+    for op in json.loads(delta):
+        parts.append("".join(newer_lines[op[0]:op[1]]) if isinstance(op, list) else op)
+    return "".join(parts)
+
+
+def version_hashes(versions: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """Blob hashes a version list references (deltas and full copies)."""
+    for entry in versions:
+        content_hash = entry.get("delta") or entry.get("hash")
+        if content_hash:
+            yield content_hash
+
+
+class DeltaWorker:
+    """
+    Runs delta jobs on a background thread, in submission order, so the
+    diffing behind version history never runs under the VFS lock.
+    """
+    
+    def __init__(self, convert: Callable[[Any], None]):
+        """
+        Initialize the worker.
+        
+        Args:
+            convert: Called with each submitted job
+        """
+        self._convert = convert
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="vfs-history", daemon=True)
+        self._thread.start()
+    
+    def submit(self, job: Any):
+        """Queue a job."""
+        self._queue.put(job)
+    
+    def wait(self):
+        """Block until every queued job has run."""
+        self._queue.join()
+    
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._convert(job)
+            except Exception as e:
+                print(f"⚠️  Error storing VFS version delta: {e}")
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,128 @@
+"""
+GlassOS VFS Journal
+Append-only write-ahead log for Virtual File System mutations.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Any, Iterator
+
+
+class VFSJournal:
+    """
+    Append-only mutation log for the VFS.
+    
+    Every record is a single JSON line tagged with a monotonically
+    increasing sequence number. Snapshots remember the last sequence
+    number they contain, so replay can skip records already folded in.
+    """
+    
+    def __init__(self, path: Path):
+        """
+        Initialize the journal.
+        
+        Args:
+            path: Physical path of the active journal file
+        """
+        self.path = Path(path)
+        self.rotated_path = self.path.with_name(self.path.name + ".1")
+        self._file = None
+        self._seq = 0
+        self._size = 0
+        self._valid_sizes: Dict[Path, int] = {}  # File -> bytes up to its last complete record
+    
+    @property
+    def seq(self) -> int:
+        """Sequence number of the last appended record."""
+        return self._seq
+    
+    @property
+    def size(self) -> int:
+        """Size in bytes of the active journal file."""
+        return self._size
+    
+    def records(self, after_seq: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        Yield journal records newer than after_seq, oldest first.
+        A record counts only once its whole line, newline included, is on
+        disk. Reading a file stops at the first torn or corrupt line, and
+        open() cuts the file back to the last complete record before it.
+        """
+        for path in (self.rotated_path, self.path):
+            if not path.exists():
+                continue
+            end = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("incomplete line")
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn tail from a crash mid-append; nothing after it is valid
+                        break
+                    end += len(line)
+                    seq = record.get("seq", 0)
+                    self._seq = max(self._seq, seq)
+                    if seq > after_seq:
+                        yield record
+            self._valid_sizes[path] = end
+    
+    def open(self, start_seq: int = 0):
+        """
+        Open the active journal for appending. Torn tails found by
+        records() are truncated first, so new records never land on the
+        end of a broken line.
+        """
+        self._seq = max(self._seq, start_seq)
+        for path, size in self._valid_sizes.items():
+            if path.exists() and path.stat().st_size > size:
+                print(f"⚠️  Truncating torn VFS journal {path.name} to {size} bytes")
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+        self._valid_sizes = {}
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+    
+    def append(self, record: Dict[str, Any], fsync: bool = False) -> int:
+        """Append a record and return the number of bytes written."""
+        self._seq += 1
+        record["seq"] = self._seq
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        self._file.write(line)
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+        self._size += len(line)
+        return len(line)
+    
+    def rotate(self):
+        """
+        Move the active journal aside so a snapshot can be written.
+        Records appended afterwards land in a fresh file.
+        """
+        self._file.close()
+        if self.rotated_path.exists():
+            # A previous compaction never finished; keep its records too
+            with open(self.rotated_path, "a", encoding="utf-8") as dst, \
+                 open(self.path, "r", encoding="utf-8") as src:
+                dst.write(src.read())
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self.rotated_path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = 0
+    
+    def discard_rotated(self):
+        """Remove the rotated journal once its records are in a snapshot."""
+        try:
+            os.remove(self.rotated_path)
+        except FileNotFoundError:
+            pass
+    
+    def close(self):
+        """Close the active journal file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,121 @@
+"""
+GlassOS VFS Locking
+Reader-writer lock guarding the Virtual File System tree.
+"""
+
+import threading
+from typing import Callable
+
+
+class _Guard:
+    """Reusable context manager around an acquire/release pair."""
+    
+    __slots__ = ("_acquire", "_release")
+    
+    def __init__(self, acquire: Callable[[], None], release: Callable[[], None]):
+        self._acquire = acquire
+        self._release = release
+    
+    def __enter__(self):
+        self._acquire()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._release()
+
+
+class RWLock:
+    """
+    Many readers or one writer.
+    
+    The write side is re-entrant, and a thread holding it may also take
+    the read side. A thread already reading may read again even while a
+    writer waits, but cannot upgrade to writing.
+    
+    Waiting writers hold back new readers, so a steady stream of reads
+    cannot starve them; in turn, readers already waiting when a writer
+    releases are let in before the next writer, so a busy writer cannot
+    starve readers either.
+    """
+    
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None  # Ident of the thread holding the write side
+        self._write_depth = 0
+        self._writers_waiting = 0
+        self._readers_waiting = 0
+        self._admit = 0  # Waiting readers to let in before the next writer
+        self._local = threading.local()  # Per-thread read depth
+        self._read_guard = _Guard(self.acquire_read, self.release_read)
+        self._write_guard = _Guard(self.acquire_write, self.release_write)
+    
+    def read(self) -> _Guard:
+        """Context manager for the shared side."""
+        return self._read_guard
+    
+    def write(self) -> _Guard:
+        """Context manager for the exclusive side."""
+        return self._write_guard
+    
+    def acquire_read(self):
+        """Take the shared side."""
+        local = self._local
+        depth = getattr(local, "depth", 0)
+        if depth or self._writer == threading.get_ident():
+            # Nested read, or a read inside our own write: nothing to wait for
+            local.depth = depth + 1
+            local.counted = getattr(local, "counted", False) if depth else False
+            return
+        with self._cond:
+            self._readers_waiting += 1
+            try:
+                while self._writer is not None or (self._writers_waiting and not self._admit):
+                    self._cond.wait()
+            finally:
+                self._readers_waiting -= 1
+            if self._admit:
+                self._admit -= 1
+            self._readers += 1
+        local.depth = 1
+        local.counted = True
+    
+    def release_read(self):
+        """Release the shared side."""
+        local = self._local
+        local.depth -= 1
+        if local.depth or not local.counted:
+            return
+        local.counted = False
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+    
+    def acquire_write(self):
+        """Take the exclusive side."""
+        me = threading.get_ident()
+        if self._writer == me:
+            self._write_depth += 1
+            return
+        if getattr(self._local, "depth", 0):
+            raise RuntimeError("Cannot upgrade a VFS read lock to a write lock")
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers or self._admit:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._write_depth = 1
+    
+    def release_write(self):
+        """Release the exclusive side."""
+        self._write_depth -= 1
+        if self._write_depth:
+            return
+        with self._cond:
+            self._writer = None
+            self._admit = self._readers_waiting
+            self._cond.notify_all()
@@ -0,0 +1,171 @@
+"""
+GlassOS VFS Persistence
+Background saving and durable file writes for the Virtual File System.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Any
+
+
+FSYNC_POLICIES = ("never", "snapshot", "always")
+RETRY_DELAY = 1.0  # Seconds before retrying a failed save, doubled after each further failure
+MAX_RETRY_DELAY = 60.0
+
+
+def fsync_directory(path: Path):
+    """Flush a directory entry (e.g. after a rename) to disk where supported."""
+    if os.name != "posix":
+        return
+    fd = os.open(str(path), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_file(path: Path):
+    """Flush a file's contents to disk."""
+    with open(path, "rb+") as f:
+        os.fsync(f.fileno())
+
+
+class PersistenceStats:
+    """Save latency and write volume counters."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.saves = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+        self.snapshot_bytes = 0
+        self.journal_bytes = 0
+    
+    def record_save(self, latency: float, nbytes: int):
+        """Account for one snapshot write."""
+        with self._lock:
+            self.saves += 1
+            self.last_latency = latency
+            self.max_latency = max(self.max_latency, latency)
+            self.total_latency += latency
+            self.snapshot_bytes += nbytes
+    
+    def record_journal(self, nbytes: int):
+        """Account for one journal append."""
+        with self._lock:
+            self.journal_bytes += nbytes
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert counters to a dictionary."""
+        with self._lock:
+            return {
+                "saves": self.saves,
+                "last_save_ms": self.last_latency * 1000,
+                "max_save_ms": self.max_latency * 1000,
+                "avg_save_ms": self.total_latency * 1000 / self.saves if self.saves else 0.0,
+                "snapshot_bytes_written": self.snapshot_bytes,
+                "journal_bytes_written": self.journal_bytes,
+                "bytes_written": self.snapshot_bytes + self.journal_bytes,
+            }
+
+
+class PersistenceWorker:
+    """
+    Dedicated thread that runs debounced saves.
+    
+    Requests within `delay` seconds of each other are coalesced into one
+    save, but a steady stream of requests never postpones a save by more
+    than `max_delay` seconds. A failed save is retried on its own, after
+    a delay that doubles while failures repeat; new requests do not
+    bring the retry forward.
+    """
+    
+    def __init__(self, save: Callable[[], bool], delay: float = 0.3, max_delay: float = 2.0):
+        """
+        Initialize the worker.
+        
+        Args:
+            save: Callable that performs one save; returns False (or
+                raises) if it failed and should be retried
+            delay: Quiet period to wait for before saving
+            max_delay: Longest a request may wait while requests keep coming
+        """
+        self._save = save
+        self._delay = delay
+        self._max_delay = max_delay
+        self._cond = threading.Condition()
+        self._pending = False
+        self._first_request = 0.0
+        self._due = 0.0
+        self._busy = False
+        self._failures = 0  # Consecutive failed saves
+        self._retry_at = 0.0  # No save before this while failures repeat
+        self._thread = threading.Thread(target=self._run, name="vfs-persistence", daemon=True)
+        self._thread.start()
+    
+    def request(self):
+        """Ask for a save soon."""
+        with self._cond:
+            now = time.monotonic()
+            if not self._pending:
+                self._pending = True
+                self._first_request = now
+            self._due = max(min(now + self._delay, self._first_request + self._max_delay), self._retry_at)
+            self._cond.notify_all()
+    
+    def flush(self):
+        """Run a save now on the calling thread, after any save in flight."""
+        with self._cond:
+            while self._busy:
+                self._cond.wait()
+            self._pending = False
+            self._busy = True
+        saved = False
+        try:
+            saved = self._save() is not False
+        finally:
+            with self._cond:
+                self._busy = False
+                self._finish(saved)
+                self._cond.notify_all()
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending or self._busy:
+                    self._cond.wait()
+                while self._pending and time.monotonic() < self._due:
+                    self._cond.wait(self._due - time.monotonic())
+                if not self._pending or self._busy:
+                    continue
+                self._pending = False
+                self._busy = True
+            saved = False
+            try:
+                saved = self._save() is not False
+            except Exception as e:
+                print(f"⚠️  Error saving VFS: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._finish(saved)
+                    self._cond.notify_all()
+    
+    def _finish(self, saved: bool):
+        """Reset the backoff after a save, or schedule a retry after a failed one. Call with the condition held."""
+        if saved:
+            self._failures = 0
+            self._retry_at = 0.0
+            return
+        now = time.monotonic()
+        self._retry_at = now + min(RETRY_DELAY * 2 ** self._failures, MAX_RETRY_DELAY)
+        self._failures += 1
+        if self._pending:
+            self._due = max(self._due, self._retry_at)
+        else:
+            self._pending = True
+            self._first_request = now
+            self._due = self._retry_at
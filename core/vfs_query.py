@@ -0,0 +1,183 @@
+"""
+GlassOS VFS Queries
+Parser for structured Virtual File System search queries.
+
+A query is a list of space-separated terms. Plain words (or "quoted
+phrases") must all appear in a node's name; `key:value` terms filter:
+
+    type:file | type:dir           Files or directories only
+    ext:pdf                        Name ends with .pdf
+    size:>1MB  size:<=10k          File size, with K/M/G/T (1024-based) units
+    size:1MB..5MB                  Inclusive size range
+    modified:<7d                   Changed within the last 7 days (h, d, w, mo, y)
+    modified:>2w                   Not changed for over 2 weeks
+    modified:>=2024-01-01          Changed on or after a date
+    modified:2024-01-01..2024-02-01
+    modified:today
+    in:/Documents                  Only under a directory
+
+For example: `report type:file size:>1MB modified:<7d in:/Documents`.
+"""
+
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+DAY = 86400.0
+
+# Half-open [low, high) bounds; None leaves that end open
+Range = Tuple[Optional[float], Optional[float]]
+
+SIZE_UNITS = {"": 1, "b": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+AGE_UNITS = {"h": 3600.0, "d": DAY, "w": 7 * DAY, "mo": 30 * DAY, "y": 365 * DAY}
+FILE_TYPES = {"file": "file", "dir": "directory", "directory": "directory", "folder": "directory"}
+
+_TOKEN_RE = re.compile(r'(?:\w+:)?"[^"]*"|\S+')
+_COMPARISON_RE = re.compile(r"(<=|>=|<|>|=)?(.+)")
+_SIZE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?")
+_AGE_RE = re.compile(r"(\d+(?:\.\d+)?)(h|d|w|mo|y)")
+
+
+@dataclass
+class Query:
+    """A parsed query. Text fields are lowercase."""
+    terms: List[str] = field(default_factory=list)  # Substrings the name must contain
+    file_type: Optional[str] = None  # FileType value
+    extension: Optional[str] = None  # Including the dot
+    size: Optional[Range] = None
+    mtime: Optional[Range] = None
+    scope: Optional[str] = None  # Path to search under
+    
+    @property
+    def is_structured(self) -> bool:
+        """Check whether the query uses any key:value filter."""
+        return (self.file_type is not None or self.extension is not None or self.size is not None
+                or self.mtime is not None or self.scope is not None)
+    
+    def matches(self, node) -> bool:
+        """Check a node against every filter except the scope."""
+        if self.file_type is not None and node.file_type.value != self.file_type:
+            return False
+        if self.size is not None and (node.file_type.value != "file" or not _within(node.size, self.size)):
+            return False
+        if self.mtime is not None and not _within(node.mtime, self.mtime):
+            return False
+        if self.terms or self.extension:
+            name = node.name.lower()
+            if self.extension is not None and not name.endswith(self.extension):
+                return False
+            return all(term in name for term in self.terms)
+        return True
+
+
+def _within(value: float, bounds: Range) -> bool:
+    low, high = bounds
+    return (low is None or value >= low) and (high is None or value < high)
+
+
+def _unquote(value: str) -> str:
+    return value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+
+
+def _parse_size(text: str) -> int:
+    match = _SIZE_RE.fullmatch(text)
+    if match is None:
+        raise ValueError(f"invalid size: {text!r}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def _size_range(value: str) -> Range:
+    if ".." in value:
+        low, _, high = value.partition("..")
+        return (_parse_size(low) if low else None,
+                _parse_size(high) + 1 if high else None)
+    operator, text = _COMPARISON_RE.fullmatch(value).groups()
+    size = _parse_size(text)
+    return {
+        ">": (size + 1, None),
+        ">=": (size, None),
+        "<": (None, size),
+        "<=": (None, size + 1),
+    }.get(operator, (size, size + 1))
+
+
+def _parse_moment(text: str, now: float) -> Tuple[float, float]:
+    """Start and length of the span of time a date, or an age ago, names."""
+    if text == "today":
+        midnight = datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        return midnight.timestamp(), DAY
+    match = _AGE_RE.fullmatch(text)
+    if match is not None:
+        return now - float(match.group(1)) * AGE_UNITS[match.group(2)], 0.0
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"invalid date or age: {text!r}") from None
+    return moment.timestamp(), DAY if len(text) == 10 else 1.0
+
+
+def _time_range(value: str, now: float) -> Range:
+    if ".." in value:
+        low, _, high = value.partition("..")
+        low_bound = _parse_moment(low, now)[0] if low else None
+        high_bound = sum(_parse_moment(high, now)) if high else None
+        return low_bound, high_bound
+    operator, text = _COMPARISON_RE.fullmatch(value).groups()
+    start, span = _parse_moment(text, now)
+    if not span:
+        # Ages compare the other way round: modified:<7d is newer than 7 days ago
+        return (None, start) if operator in (">", ">=") else (start, None)
+    return {
+        ">": (start + span, None),
+        ">=": (start, None),
+        "<": (None, start),
+        "<=": (None, start + span),
+    }.get(operator, (start, start + span))
+
+
+def _intersect(current: Optional[Range], bounds: Range) -> Range:
+    if current is None:
+        return bounds
+    lows = [low for low in (current[0], bounds[0]) if low is not None]
+    highs = [high for high in (current[1], bounds[1]) if high is not None]
+    return (max(lows) if lows else None, min(highs) if highs else None)
+
+
+def parse_query(text: str, now: Optional[float] = None) -> Query:
+    """
+    Parse a query string. Terms with an unknown key are treated as plain
+    name text, since names may contain colons.
+    
+    Args:
+        text: Query string
+        now: Reference time for relative ages, epoch seconds
+    
+    Raises:
+        ValueError: If a filter value cannot be parsed
+    """
+    if now is None:
+        now = time.time()
+    query = Query()
+    for token in _TOKEN_RE.findall(text):
+        key, colon, value = token.partition(":")
+        key = key.lower()
+        value = _unquote(value).strip()
+        if not colon or not value or key not in ("type", "ext", "size", "modified", "in"):
+            term = _unquote(token).lower()
+            if term:
+                query.terms.append(term)
+        elif key == "type":
+            if value.lower() not in FILE_TYPES:
+                raise ValueError(f"invalid type: {value!r}")
+            query.file_type = FILE_TYPES[value.lower()]
+        elif key == "ext":
+            query.extension = "." + value.lower().lstrip(".")
+        elif key == "size":
+            query.size = _intersect(query.size, _size_range(value.lower()))
+        elif key == "modified":
+            query.mtime = _intersect(query.mtime, _time_range(value.lower(), now))
+        else:
+            query.scope = value
+    return query
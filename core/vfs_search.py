@@ -0,0 +1,508 @@
+"""
+GlassOS VFS Search Indexes
+In-memory indexes that answer Virtual File System search queries.
+"""
+
+import bisect
+import queue
+import re
+import sys
+import threading
+from typing import Dict, List, Set, Tuple, Any, Callable, Optional
+
+
+class NameIndex:
+    """
+    Inverted index from name words to the inodes whose names contain them.
+    A forward map remembers each inode's words, so entries can be removed
+    or re-indexed on delete and rename without scanning the postings.
+    """
+    
+    def __init__(self):
+        self._postings: Dict[str, Set[int]] = {}
+        self._words: Dict[int, Tuple[str, ...]] = {}
+        self._removed = 0  # Removals since the last compaction
+        self._entries = 0  # Total inodes across all postings
+        self._bytes = 0  # Running size of the postings sets, words and tuples
+    
+    @staticmethod
+    def tokenize(name: str) -> Tuple[str, ...]:
+        """Split a name into lowercase index words."""
+        name_lower = name.lower()
+        return tuple(set(name_lower.replace("_", " ").replace("-", " ").split()))
+    
+    def add(self, inode: int, name: str):
+        """Index (or re-index) an inode under the words of its name."""
+        if inode in self._words:
+            self.remove(inode)
+        words = self.tokenize(name)
+        self._words[inode] = words
+        self._bytes += sys.getsizeof(words)
+        for word in words:
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = set()
+                self._bytes += sys.getsizeof(word) + sys.getsizeof(postings)
+            before = sys.getsizeof(postings)
+            postings.add(inode)
+            self._bytes += sys.getsizeof(postings) - before
+        self._entries += len(words)
+    
+    def remove(self, inode: int):
+        """Drop an inode from every posting it appears in."""
+        words = self._words.pop(inode, None)
+        if words is None:
+            return
+        self._bytes -= sys.getsizeof(words)
+        for word in words:
+            postings = self._postings.get(word)
+            if postings is not None:
+                postings.discard(inode)
+                if not postings:
+                    del self._postings[word]
+                    self._bytes -= sys.getsizeof(word) + sys.getsizeof(postings)
+        self._entries -= len(words)
+        self._removed += 1
+        if self._removed > 1024 and self._removed > len(self._words):
+            self.compact()
+    
+    def lookup(self, word: str) -> Set[int]:
+        """Get the inodes indexed under a word."""
+        return self._postings.get(word, set())
+    
+    def clear(self):
+        """Drop every entry."""
+        self._postings = {}
+        self._words = {}
+        self._removed = 0
+        self._entries = 0
+        self._bytes = 0
+    
+    def compact(self):
+        """
+        Rebuild the containers after heavy deletion.
+        Python dicts and sets never shrink on their own.
+        """
+        self._postings = {word: set(postings) for word, postings in self._postings.items()}
+        self._words = dict(self._words)
+        self._removed = 0
+        self._bytes = sum(sys.getsizeof(words) for words in self._words.values())
+        for word, postings in self._postings.items():
+            self._bytes += sys.getsizeof(word) + sys.getsizeof(postings)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get entry counts and an estimate of the memory held by the index."""
+        return {
+            "terms": len(self._postings),
+            "postings": self._entries,
+            "bytes": self._bytes + sys.getsizeof(self._postings) + sys.getsizeof(self._words),
+        }
+
+
+class TrigramIndex:
+    """
+    Trigram index over lowercase node names for substring search.
+    A query's trigram postings are intersected to get candidates, which
+    the caller verifies; names shorter than three characters are indexed
+    whole so every name is reachable.
+    """
+    
+    def __init__(self):
+        self._postings: Dict[str, Set[int]] = {}
+        self._entries = 0  # Total inodes across all postings
+    
+    @staticmethod
+    def grams(text: str) -> Set[str]:
+        """Get the trigrams of a lowercase string."""
+        if len(text) < 3:
+            return {text} if text else set()
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+    
+    def add(self, inode: int, name: str):
+        """Index an inode under the trigrams of its name."""
+        for gram in self.grams(name.lower()):
+            postings = self._postings.get(gram)
+            if postings is None:
+                postings = self._postings[gram] = set()
+            if inode not in postings:
+                postings.add(inode)
+                self._entries += 1
+    
+    def remove(self, inode: int, name: str):
+        """Drop an inode that was indexed under the given name."""
+        for gram in self.grams(name.lower()):
+            postings = self._postings.get(gram)
+            if postings is not None and inode in postings:
+                postings.remove(inode)
+                self._entries -= 1
+                if not postings:
+                    del self._postings[gram]
+    
+    def clear(self):
+        """Drop every entry."""
+        self._postings = {}
+        self._entries = 0
+    
+    def candidates(self, query: str) -> Set[int]:
+        """
+        Get inodes whose names may contain the lowercase query.
+        Every true match is included; callers verify the rest.
+        """
+        if len(query) < 3:
+            # Any name containing a short query has a key that contains it
+            result = set()
+            for gram, postings in self._postings.items():
+                if query in gram:
+                    result |= postings
+            return result
+        
+        # Intersect smallest postings first so the working set stays small
+        postings = []
+        for gram in self.grams(query):
+            gram_postings = self._postings.get(gram)
+            if gram_postings is None:
+                return set()
+            postings.append(gram_postings)
+        postings.sort(key=len)
+        return postings[0].intersection(*postings[1:])
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get gram and posting counts."""
+        return {
+            "grams": len(self._postings),
+            "postings": self._entries,
+        }
+
+
+class SortedIndex:
+    """
+    Inodes ordered by a numeric key (size, modification time), for range
+    queries. Entries are kept in sorted chunks of bounded length, so an
+    update shifts one short list rather than the whole index. A forward
+    map remembers each inode's key, so entries can be re-keyed or removed
+    without the caller knowing the old value.
+    """
+    
+    CHUNK = 512  # Target chunk length; chunks split at twice this
+    
+    def __init__(self):
+        self._keys: List[List[float]] = []
+        self._inodes: List[List[int]] = []
+        self._maxes: List[float] = []  # Last key of each chunk
+        self._entries: Dict[int, float] = {}
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def build(self, items: List[Tuple[float, int]]):
+        """Replace the contents with (key, inode) pairs in one sort."""
+        items.sort()
+        self._keys = [[key for key, _ in items[i:i + self.CHUNK]] for i in range(0, len(items), self.CHUNK)]
+        self._inodes = [[inode for _, inode in items[i:i + self.CHUNK]] for i in range(0, len(items), self.CHUNK)]
+        self._maxes = [keys[-1] for keys in self._keys]
+        self._entries = {inode: key for key, inode in items}
+    
+    def add(self, inode: int, key: float):
+        """Index (or re-key) an inode."""
+        if inode in self._entries:
+            if self._entries[inode] == key:
+                return
+            self.remove(inode)
+        self._entries[inode] = key
+        if not self._maxes:
+            self._keys.append([key])
+            self._inodes.append([inode])
+            self._maxes.append(key)
+            return
+        
+        chunk = min(bisect.bisect_left(self._maxes, key), len(self._maxes) - 1)
+        keys = self._keys[chunk]
+        position = bisect.bisect_right(keys, key)
+        keys.insert(position, key)
+        self._inodes[chunk].insert(position, inode)
+        self._maxes[chunk] = keys[-1]
+        if len(keys) > 2 * self.CHUNK:
+            inodes = self._inodes[chunk]
+            self._keys[chunk:chunk + 1] = [keys[:self.CHUNK], keys[self.CHUNK:]]
+            self._inodes[chunk:chunk + 1] = [inodes[:self.CHUNK], inodes[self.CHUNK:]]
+            self._maxes[chunk:chunk + 1] = [keys[self.CHUNK - 1], keys[-1]]
+    
+    def remove(self, inode: int):
+        """Drop an inode from the index."""
+        key = self._entries.pop(inode, None)
+        if key is None:
+            return
+        # Equal keys may run across several chunks
+        chunk = bisect.bisect_left(self._maxes, key)
+        while chunk < len(self._maxes):
+            keys = self._keys[chunk]
+            inodes = self._inodes[chunk]
+            position = bisect.bisect_left(keys, key)
+            while position < len(keys) and keys[position] == key:
+                if inodes[position] == inode:
+                    del keys[position]
+                    del inodes[position]
+                    if keys:
+                        self._maxes[chunk] = keys[-1]
+                    else:
+                        del self._keys[chunk], self._inodes[chunk], self._maxes[chunk]
+                    return
+                position += 1
+            chunk += 1
+    
+    def _rank(self, key: Optional[float]) -> Tuple[int, int]:
+        """(chunk, position) of the first entry whose key is at least `key`."""
+        if key is None:
+            return 0, 0
+        chunk = bisect.bisect_left(self._maxes, key)
+        if chunk == len(self._maxes):
+            return chunk, 0
+        return chunk, bisect.bisect_left(self._keys[chunk], key)
+    
+    def count(self, low: Optional[float], high: Optional[float]) -> int:
+        """Count entries with low <= key < high; None leaves that end open."""
+        start_chunk, start = self._rank(low)
+        end_chunk, end = self._rank(high) if high is not None else (len(self._maxes), 0)
+        if (end_chunk, end) <= (start_chunk, start):
+            return 0
+        total = end - start
+        for chunk in range(start_chunk, end_chunk):
+            total += len(self._keys[chunk])
+        return total
+    
+    def range(self, low: Optional[float], high: Optional[float]) -> List[int]:
+        """Get the inodes with low <= key < high, in key order."""
+        start_chunk, start = self._rank(low)
+        end_chunk, end = self._rank(high) if high is not None else (len(self._maxes), 0)
+        if (end_chunk, end) <= (start_chunk, start):
+            return []
+        if start_chunk == end_chunk:
+            return self._inodes[start_chunk][start:end]
+        result = self._inodes[start_chunk][start:]
+        for chunk in range(start_chunk + 1, end_chunk):
+            result.extend(self._inodes[chunk])
+        if end:
+            result.extend(self._inodes[end_chunk][:end])
+        return result
+    
+    def clear(self):
+        """Drop every entry."""
+        self._keys = []
+        self._inodes = []
+        self._maxes = []
+        self._entries = {}
+
+
+WORD_BOUNDARIES = " _-."
+
+
+def score_name(query: str, name: str) -> float:
+    """
+    Score how well a lowercase query term matches a name; 0 means no match.
+    Exact > extension-less exact > prefix > word boundary > substring >
+    fuzzy subsequence, with shorter and earlier matches ranked higher.
+    """
+    name = name.lower()
+    if name == query:
+        return 1000.0
+    if name.rsplit(".", 1)[0] == query:
+        return 900.0
+    if name.startswith(query):
+        return 800.0 - min(len(name) - len(query), 100)
+    
+    pos = name.find(query)
+    if pos >= 0:
+        first = pos
+        while pos >= 0:
+            if name[pos - 1] in WORD_BOUNDARIES:
+                return 600.0 - min(pos, 100)
+            pos = name.find(query, pos + 1)
+        return 400.0 - min(first, 100)
+    
+    # Fuzzy: every query character appears in order
+    first = last = -1
+    for char in query:
+        last = name.find(char, last + 1)
+        if last < 0:
+            return 0.0
+        if first < 0:
+            first = last
+    gaps = (last - first + 1) - len(query)
+    return 200.0 * len(query) / (len(query) + gaps)
+
+
+def recency_bonus(mtime: float, now: float) -> float:
+    """Small boost for recently modified nodes, halving every week."""
+    age_days = max(now - mtime, 0) / 86400
+    return 50.0 * 0.5 ** (age_days / 7)
+
+
+class ContentIndex:
+    """
+    Positional full-text index over file contents.
+    Supports plain words (all must appear), "quoted phrases" and
+    prefix* terms. Thread-safe, since it is fed from a background thread.
+    """
+    
+    TOKEN_RE = re.compile(r"\w+")
+    
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, List[int]]] = {}
+        self._docs: Dict[int, Tuple[str, ...]] = {}
+        self._vocabulary: List[str] = []  # Sorted terms, rebuilt lazily for prefix queries
+        self._vocabulary_dirty = False
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        """Split text into lowercase word tokens."""
+        return cls.TOKEN_RE.findall(text.lower())
+    
+    def add(self, inode: int, text: str):
+        """Index (or re-index) a document."""
+        positions: Dict[str, List[int]] = {}
+        for position, token in enumerate(self.tokenize(text)):
+            positions.setdefault(token, []).append(position)
+        
+        with self._lock:
+            self._remove_locked(inode)
+            for token, token_positions in positions.items():
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = {}
+                    self._vocabulary_dirty = True
+                postings[inode] = token_positions
+            self._docs[inode] = tuple(positions)
+    
+    def remove(self, inode: int):
+        """Drop a document from the index."""
+        with self._lock:
+            self._remove_locked(inode)
+    
+    def _remove_locked(self, inode: int):
+        tokens = self._docs.pop(inode, None)
+        if tokens is None:
+            return
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(inode, None)
+                if not postings:
+                    del self._postings[token]
+                    self._vocabulary_dirty = True
+    
+    def clear(self):
+        """Drop every document."""
+        with self._lock:
+            self._postings = {}
+            self._docs = {}
+            self._vocabulary = []
+            self._vocabulary_dirty = False
+    
+    def search(self, query: str) -> Set[int]:
+        """Get the inodes of documents matching every clause of the query."""
+        phrases = [self.tokenize(phrase) for phrase in re.findall(r'"([^"]*)"', query)]
+        rest = re.sub(r'"[^"]*"', " ", query).lower().split()
+        
+        with self._lock:
+            clauses = []
+            for term in rest:
+                if term.endswith("*"):
+                    clauses.append(self._prefix_docs(term.rstrip("*")))
+                else:
+                    for token in self.tokenize(term):
+                        clauses.append(set(self._postings.get(token, ())))
+            for tokens in phrases:
+                if tokens:
+                    clauses.append(self._phrase_docs(tokens))
+            
+            if not clauses:
+                return set()
+            clauses.sort(key=len)
+            return clauses[0].intersection(*clauses[1:])
+    
+    def _prefix_docs(self, prefix: str) -> Set[int]:
+        """Documents containing any token that starts with prefix."""
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        docs = set()
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        for token in self._vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            docs.update(self._postings[token])
+        return docs
+    
+    def _phrase_docs(self, tokens: List[str]) -> Set[int]:
+        """Documents containing the tokens consecutively."""
+        postings = [self._postings.get(token) for token in tokens]
+        if not all(postings):
+            return set()
+        candidates = set(postings[0]).intersection(*postings[1:])
+        docs = set()
+        for inode in candidates:
+            following = [set(p[inode]) for p in postings[1:]]
+            for start in postings[0][inode]:
+                if all(start + offset + 1 in positions for offset, positions in enumerate(following)):
+                    docs.add(inode)
+                    break
+        return docs
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get document and term counts."""
+        return {
+            "documents": len(self._docs),
+            "terms": len(self._postings),
+        }
+
+
+class ContentIndexer:
+    """
+    Feeds a ContentIndex from a background thread, so indexing large
+    bodies never stalls the writer. Jobs are applied in submission order.
+    """
+    
+    def __init__(self, index: ContentIndex, load: Callable[[str], Optional[bytes]],
+                 max_bytes: int = 4 * 1024 * 1024):
+        """
+        Initialize the indexer.
+        
+        Args:
+            index: Index to keep up to date
+            load: Callable returning a body's bytes for a content hash
+            max_bytes: Bodies larger than this are not indexed
+        """
+        self.index = index
+        self._load = load
+        self._max_bytes = max_bytes
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="vfs-content-indexer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, inode: int, content_hash: str, size: int):
+        """Queue a file body for (re-)indexing."""
+        self._queue.put((inode, content_hash if size <= self._max_bytes else None))
+    
+    def discard(self, inode: int):
+        """Queue a file's removal from the index."""
+        self._queue.put((inode, None))
+    
+    def wait(self):
+        """Block until every queued job has been applied."""
+        self._queue.join()
+    
+    def _run(self):
+        while True:
+            inode, content_hash = self._queue.get()
+            try:
+                data = self._load(content_hash) if content_hash else None
+                if data is None or b"\0" in data[:8192]:
+                    # Missing, too large, or binary
+                    self.index.remove(inode)
+                else:
+                    self.index.add(inode, data.decode("utf-8", errors="ignore"))
+            except Exception as e:
+                print(f"⚠️  Error indexing VFS content: {e}")
+            finally:
+                self._queue.task_done()
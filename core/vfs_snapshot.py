@@ -0,0 +1,147 @@
+"""
+GlassOS VFS Snapshots
+Read-only, point-in-time views of the Virtual File System tree.
+"""
+
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class SnapshotNode:
+    """
+    Immutable copy of a node as of some snapshot.
+    Unchanged subtrees are the same objects in every snapshot that saw
+    them, so nodes carry no parent pointer or path. `children` is None
+    for files.
+    """
+    
+    __slots__ = ("inode", "name", "file_type", "size", "ctime", "mtime", "content_hash",
+                 "metadata", "children", "total_size", "file_count", "dir_count")
+    
+    def __init__(self, node, children: Optional[Dict[str, "SnapshotNode"]]):
+        self.inode = node.inode
+        self.name = node.name
+        self.file_type = node.file_type
+        self.size = node.size
+        self.ctime = node.ctime
+        self.mtime = node.mtime
+        self.content_hash = node.content_hash
+        self.metadata = node.metadata  # Never mutated in place, so shared
+        self.children = children
+        self.total_size = node.total_size
+        self.file_count = node.file_count
+        self.dir_count = node.dir_count
+    
+    def __repr__(self) -> str:
+        return f"SnapshotNode(name={self.name!r}, file_type={self.file_type}, inode={self.inode})"
+
+
+class VFSSnapshot:
+    """
+    Consistent read-only view of the tree at the moment it was taken.
+    
+    Reads take no lock: the view is built from immutable nodes, and the
+    bodies it references are kept on disk until it is closed or garbage
+    collected. Close it (or use it as a context manager) when done so
+    those bodies can be reclaimed.
+    """
+    
+    def __init__(self, root: SnapshotNode, generation: int, timestamp: float,
+                 read_body: Callable[[str], Optional[bytes]]):
+        """
+        Wrap a frozen tree.
+        
+        Args:
+            root: Frozen root directory
+            generation: Snapshot counter value, increasing per snapshot
+            timestamp: When the snapshot was taken, epoch seconds
+            read_body: Loads a body by content hash
+        """
+        self.root = root
+        self.generation = generation
+        self.timestamp = timestamp
+        self._read_body = read_body
+        self.closed = False
+    
+    def _resolve(self, path: str) -> Optional[SnapshotNode]:
+        node = self.root
+        for part in path.replace("\\", "/").split("/"):
+            if not part:
+                continue
+            if node.children is None:
+                return None
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+    
+    def get_node(self, path: str) -> Optional[SnapshotNode]:
+        """Get a node by path."""
+        return self._resolve(path)
+    
+    def exists(self, path: str) -> bool:
+        """Check if a path existed when the snapshot was taken."""
+        return self._resolve(path) is not None
+    
+    def is_directory(self, path: str) -> bool:
+        """Check if path is a directory."""
+        node = self._resolve(path)
+        return node is not None and node.children is not None
+    
+    def list_directory(self, path: str) -> List[SnapshotNode]:
+        """List contents of a directory."""
+        node = self._resolve(path)
+        if node is None or node.children is None:
+            return []
+        return list(node.children.values())
+    
+    def walk(self, path: str = "/") -> Iterator[Tuple[str, SnapshotNode]]:
+        """Yield (path, node) for a node and everything below it, depth first."""
+        node = self._resolve(path)
+        if node is None:
+            return
+        stack = [(path if path.startswith("/") else "/" + path, node)]
+        while stack:
+            node_path, node = stack.pop()
+            yield node_path, node
+            if node.children:
+                prefix = node_path.rstrip("/")
+                stack.extend((f"{prefix}/{name}", child)
+                             for name, child in reversed(node.children.items()))
+    
+    def read_bytes(self, path: str) -> Optional[bytes]:
+        """Read a file's content as it was when the snapshot was taken."""
+        if self.closed:
+            raise ValueError("read from a closed VFS snapshot")
+        node = self._resolve(path)
+        if node is None or node.children is not None or "mirror" in node.metadata:
+            return None
+        if not node.content_hash:
+            return b""
+        return self._read_body(node.content_hash)
+    
+    def read_file(self, path: str) -> Optional[str]:
+        """Read a file as text; None if it is missing or not UTF-8."""
+        data = self.read_bytes(path)
+        if data is None:
+            return None
+        try:
+            return data.decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+    
+    def get_size(self, path: str) -> int:
+        """Get the size of a file or total size of a directory."""
+        node = self._resolve(path)
+        if node is None:
+            return 0
+        return node.total_size if node.children is not None else node.size
+    
+    def close(self):
+        """Let the VFS reclaim bodies only this snapshot still references."""
+        self.closed = True
+    
+    def __enter__(self) -> "VFSSnapshot":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
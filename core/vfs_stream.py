@@ -0,0 +1,141 @@
+"""
+GlassOS VFS Streams
+Chunked read and write handles for large Virtual File System files.
+"""
+
+import io
+import mmap
+from typing import BinaryIO, Callable, Iterator, Union
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class VFSReadStream:
+    """
+    Read handle on a file body.
+    Reads never touch the VFS lock; the body is immutable once written.
+    """
+    
+    def __init__(self, raw: BinaryIO, size: int):
+        """
+        Wrap an open body.
+        
+        Args:
+            raw: Seekable binary file object positioned at the start
+            size: Body size in bytes
+        """
+        self._raw = raw
+        self.size = size
+        self._maps = []
+    
+    def read(self, size: int = -1) -> bytes:
+        """Read up to size bytes (everything left if negative)."""
+        return self._raw.read(size)
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """Move the read position."""
+        return self._raw.seek(offset, whence)
+    
+    def tell(self) -> int:
+        """Current read position."""
+        return self._raw.tell()
+    
+    def chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield the rest of the body in chunks."""
+        while True:
+            chunk = self._raw.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    
+    def __iter__(self) -> Iterator[bytes]:
+        return self.chunks()
+    
+    def memoryview(self) -> memoryview:
+        """
+        Zero-copy view of the whole body, memory-mapped when the body is
+        a file on disk. Valid until the stream is closed.
+        """
+        if self.size == 0:
+            return memoryview(b"")
+        try:
+            fileno = self._raw.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            # Not file-backed; fall back to one copy
+            position = self._raw.tell()
+            self._raw.seek(0)
+            data = self._raw.read()
+            self._raw.seek(position)
+            return memoryview(data)
+        mapped = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return memoryview(mapped)
+    
+    def close(self):
+        """Release the body and any mappings. Views must be released first."""
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+        self._raw.close()
+    
+    def __enter__(self) -> "VFSReadStream":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class VFSWriteStream:
+    """
+    Write handle that streams a new body to disk, tracking its size as it
+    goes. The file is replaced atomically on close(); until then readers
+    keep seeing the old body.
+    """
+    
+    def __init__(self, writer, commit: Callable[[object], bool]):
+        """
+        Wrap a blob writer.
+        
+        Args:
+            writer: Blob writer receiving the bytes
+            commit: Called with the writer on close; installs the body and
+                returns whether the file could be written
+        """
+        self._writer = writer
+        self._commit = commit
+        self._closed = False
+    
+    @property
+    def size(self) -> int:
+        """Bytes written so far."""
+        return self._writer.size
+    
+    def write(self, data: Union[bytes, bytearray, memoryview, str]) -> int:
+        """Append bytes (or text, encoded as UTF-8)."""
+        if self._closed:
+            raise ValueError("write to a closed VFS stream")
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        return self._writer.write(data)
+    
+    def close(self) -> bool:
+        """Install the written body; returns False if the file could not be written."""
+        if self._closed:
+            return False
+        self._closed = True
+        return self._commit(self._writer)
+    
+    def abort(self):
+        """Discard everything written."""
+        if not self._closed:
+            self._closed = True
+            self._writer.abort()
+    
+    def __enter__(self) -> "VFSWriteStream":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,365 @@
+"""
+GlassOS VFS Mirror Sync
+Keeps a VFS directory in step with a real directory tree, so real files
+are searched and queried through the VFS indexes instead of the disk.
+
+Every real file and folder becomes a body-less VFS entry with its size
+and modification time, and its inode in metadata["mirror"]. A pass stats
+each entry but only writes those whose size, mtime or inode changed, and
+a rename within a folder (same inode, new name) is applied as a rename.
+The mount directory belongs to the mirror. VFS writes, deletes, renames
+and moves there are refused, and mirrored files read as None: their
+content is on disk. Entries no longer on disk are removed, but VFS data
+found under the mount (say, files written there before it was mirrored)
+is never deleted: it is moved to a recovery directory beside the mount,
+"/Storage (recovered)", keeping its path below the mount.
+
+A mirrored file can still have a version history: keep_version() adds
+the real content to it just before the file is overwritten on disk.
+"""
+
+import os
+import threading
+import time
+from itertools import islice
+from pathlib import Path
+from stat import S_ISDIR, S_ISLNK
+from typing import Any, Dict, List, Optional, Tuple
+
+from .vfs import FileType, VFSNode
+from .vfs_history import HISTORY_SIZE_LIMIT
+from .vfs_query import parse_query
+
+RESCAN_INTERVAL = 300.0  # Seconds between full passes, for changes made outside GlassOS
+
+
+class MirrorSync:
+    """
+    Mirrors a real directory tree into a VFS directory on a background thread.
+    
+    Real paths are given as storage paths, relative to the source root
+    and starting with "/" (e.g. "/Documents/notes.txt"), as
+    StorageProvider names them.
+    """
+    
+    def __init__(self, vfs, source_root: Path, mount: str = "/Storage",
+                 interval: float = RESCAN_INTERVAL):
+        """
+        Initialize the mirror. Nothing is synced until start() or sync().
+        
+        Args:
+            vfs: VirtualFileSystem to mirror into
+            source_root: Real directory to mirror
+            mount: VFS directory the tree appears under
+            interval: Seconds between full rescans, or 0 to rescan only on start
+        """
+        self._vfs = vfs
+        self.source_root = Path(source_root)
+        self.mount = "/" + mount.strip("/")
+        self.recovery = f"{self.mount} (recovered)"
+        self._interval = interval
+        self._cond = threading.Condition()
+        self._requests: Dict[str, bool] = {}  # Storage path -> recursive
+        self._busy = False
+        self._sync_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.last_sync: Dict[str, Any] = {}
+    
+    def vfs_path(self, storage_path: str) -> str:
+        """Map a storage path to the VFS path of its mirror."""
+        storage_path = storage_path.replace("\\", "/").strip("/")
+        return f"{self.mount}/{storage_path}" if storage_path else self.mount
+    
+    def storage_path(self, vfs_path: str) -> Optional[str]:
+        """Map a mirrored VFS path back to its storage path; None if outside the mount."""
+        if vfs_path == self.mount:
+            return "/"
+        if vfs_path.startswith(self.mount + "/"):
+            return vfs_path[len(self.mount):]
+        return None
+    
+    def _real_path(self, storage_path: str) -> Path:
+        return self.source_root / storage_path.lstrip("/")
+    
+    def start(self):
+        """Run a full sync, then keep rescanning and serving notify() on a background thread."""
+        with self._cond:
+            self._requests["/"] = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="vfs-mirror", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+    
+    def notify(self, storage_path: str):
+        """
+        Queue a sync after a path was created, changed, removed or renamed:
+        its folder's listing, and the path itself with everything below it.
+        """
+        storage_path = "/" + storage_path.replace("\\", "/").strip("/")
+        with self._cond:
+            if storage_path != "/":
+                parent = storage_path.rpartition("/")[0] or "/"
+                self._requests.setdefault(parent, False)
+            self._requests[storage_path] = True
+            self._cond.notify_all()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued sync is done; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._requests and not self._busy, timeout)
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self._interval if self._interval else None
+                while not self._requests:
+                    if deadline is None:
+                        self._cond.wait()
+                    elif time.monotonic() >= deadline:
+                        self._requests["/"] = True
+                    else:
+                        self._cond.wait(deadline - time.monotonic())
+                requests, self._requests = self._requests, {}
+                self._busy = True
+            try:
+                for storage_path, recursive in self._coalesce(requests):
+                    self.sync(storage_path, recursive)
+            except Exception as e:
+                print(f"⚠️  Error syncing storage mirror: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+    
+    @staticmethod
+    def _coalesce(requests: Dict[str, bool]) -> List[Tuple[str, bool]]:
+        """Order requests parents first, dropping those a recursive one above already covers."""
+        def depth(path: str) -> int:
+            return path.count("/") if path != "/" else 0
+        
+        kept: List[Tuple[str, bool]] = []
+        for path, recursive in sorted(requests.items(), key=lambda item: depth(item[0])):
+            if any(covering == "/" or path.startswith(covering + "/")
+                   for covering, deep in kept if deep):
+                continue
+            kept.append((path, recursive))
+        return kept
+    
+    def sync(self, storage_path: str = "/", recursive: bool = True) -> Dict[str, Any]:
+        """
+        Bring the mirror of a path up to date now, on the calling thread.
+        A directory's listing is synced, and with `recursive` every folder
+        below it too; a file's entry alone is synced.
+        
+        Args:
+            storage_path: Path to sync, "/" for the whole tree
+            recursive: Also sync the folders below a directory
+        
+        Returns:
+            Counts of directories listed and entries added, updated,
+            removed, recovered (see _recover) and unchanged, with the
+            seconds taken
+        """
+        storage_path = "/" + storage_path.replace("\\", "/").strip("/")
+        counts = {"directories": 0, "added": 0, "updated": 0, "removed": 0, "recovered": 0,
+                  "unchanged": 0}
+        start = time.perf_counter()
+        
+        with self._sync_lock:
+            if storage_path == "/":
+                pending = self._sync_mount(counts)
+            else:
+                pending = self._sync_entry(storage_path, counts)
+            while pending:
+                subdirectories = self._sync_directory(pending.pop(), counts)
+                if recursive:
+                    pending.extend(subdirectories)
+        
+        counts["seconds"] = time.perf_counter() - start
+        self.last_sync = dict(counts, path=storage_path, finished=time.time())
+        return counts
+    
+    def _sync_mount(self, counts: Dict[str, Any]) -> List[str]:
+        """Mirror the source root as the mount directory; returns ["/"] if it can be listed."""
+        try:
+            stat = os.stat(self.source_root)
+        except OSError as e:
+            print(f"⚠️  Error syncing {self.source_root}: {e}")
+            return []
+        parent = self.mount.rpartition("/")[0] or "/"
+        if not self._vfs.is_directory(parent):
+            self._vfs.create_directory(parent)
+        self._mirror(self.mount, self._vfs.get_node(self.mount), True, stat, counts)
+        return ["/"] if self._vfs.is_directory(self.mount) else []
+    
+    def _sync_entry(self, storage_path: str, counts: Dict[str, Any]) -> List[str]:
+        """Sync one path's own entry; returns it if it is a directory whose listing needs syncing."""
+        vfs_path = self.vfs_path(storage_path)
+        if not self._vfs.is_directory(vfs_path.rpartition("/")[0]):
+            return []  # Its folder is not mirrored yet; the pass that adds it covers this
+        try:
+            stat = os.stat(self._real_path(storage_path), follow_symlinks=False)
+        except OSError:
+            return []  # Gone; a sync of its folder removes the entry
+        if S_ISLNK(stat.st_mode):
+            return []
+        is_directory = S_ISDIR(stat.st_mode)
+        self._mirror(vfs_path, self._vfs.get_node(vfs_path), is_directory, stat, counts)
+        return [storage_path] if is_directory else []
+    
+    def _sync_directory(self, storage_path: str, counts: Dict[str, Any]) -> List[str]:
+        """Sync a directory's listing against the disk; returns the storage paths of its subdirectories."""
+        found: Dict[str, Tuple[bool, os.stat_result]] = {}
+        try:
+            with os.scandir(self._real_path(storage_path)) as entries:
+                for entry in entries:
+                    if entry.is_symlink():
+                        continue
+                    found[entry.name] = (entry.is_dir(follow_symlinks=False),
+                                         entry.stat(follow_symlinks=False))
+        except OSError as e:
+            print(f"⚠️  Error syncing {storage_path}: {e}")
+            return []
+        counts["directories"] += 1
+        
+        vfs_dir = self.vfs_path(storage_path)
+        with self._vfs.transaction():
+            existing = {node.name: node for node in self._vfs.list_directory(vfs_dir)}
+            vanished = [node for name, node in existing.items() if name not in found]
+            by_inode = {node.metadata["mirror"]["inode"]: node
+                        for node in vanished if "mirror" in node.metadata}
+            for name, (is_directory, stat) in found.items():
+                node = existing.get(name)
+                renamed = by_inode.pop(stat.st_ino, None) if node is None else None
+                if (renamed is not None and (renamed.file_type == FileType.DIRECTORY) == is_directory
+                        and self._vfs.rename_mirror_entry(f"{vfs_dir}/{renamed.name}", name)):
+                    vanished.remove(renamed)
+                    node = renamed
+                self._mirror(f"{vfs_dir}/{name}", node, is_directory, stat, counts)
+            for node in vanished:
+                self._remove(f"{vfs_dir}/{node.name}", node, counts)
+        
+        prefix = storage_path.rstrip("/")
+        return [f"{prefix}/{name}" for name, (is_directory, _) in found.items() if is_directory]
+    
+    def _mirror(self, vfs_path: str, node: Optional[VFSNode], is_directory: bool,
+                stat: os.stat_result, counts: Dict[str, Any]):
+        """Add or update one entry, unless its size, mtime and inode already match."""
+        source = {"inode": stat.st_ino}
+        if node is not None:
+            same_type = (node.file_type == FileType.DIRECTORY) == is_directory and not node.content_hash
+            if (same_type and node.mtime == stat.st_mtime and node.metadata.get("mirror") == source
+                    and (is_directory or node.size == stat.st_size)):
+                counts["unchanged"] += 1
+                return
+            if not same_type:
+                self._remove(vfs_path, node, counts)
+                node = None
+        if self._vfs.mirror_entry(vfs_path, is_directory, stat.st_size, stat.st_mtime, source):
+            counts["added" if node is None else "updated"] += 1
+    
+    def _remove(self, vfs_path: str, node: VFSNode, counts: Dict[str, Any]):
+        """
+        Remove an entry that is not (or no longer of that type) on disk,
+        after moving any VFS data in it to the recovery directory. If that
+        fails the entry is kept, and the disk entry is not mirrored over it.
+        """
+        recovered = [self._recover(path) for path in self._vfs_data(vfs_path, node)]
+        counts["recovered"] += sum(recovered)
+        if not all(recovered):
+            return
+        if self._vfs.exists(vfs_path) and self._vfs.remove_mirror_entry(vfs_path):
+            counts["removed"] += 1
+    
+    def _vfs_data(self, vfs_path: str, node: VFSNode) -> List[str]:
+        """Paths at or under an entry that were created through the VFS, not mirrored, topmost only."""
+        if "mirror" not in node.metadata or node.content_hash:
+            return [vfs_path]
+        if node.file_type != FileType.DIRECTORY:
+            return []
+        found = []
+        for child in self._vfs.list_directory(vfs_path):
+            found.extend(self._vfs_data(f"{vfs_path}/{child.name}", child))
+        return found
+    
+    def _recover(self, vfs_path: str) -> bool:
+        """Move VFS data from under the mount to the same place under the recovery directory."""
+        target = self.recovery + self.storage_path(vfs_path).rstrip("/")
+        parent, _, name = target.rpartition("/")
+        parent = parent or "/"
+        path = ""
+        for part in parent.strip("/").split("/"):
+            path += "/" + part
+            if not self._vfs.is_directory(path) and not self._vfs.create_directory(path):
+                break
+        if self._vfs.exists(target):
+            moved = False
+        elif vfs_path.rpartition("/")[2] == name:
+            moved = self._vfs.move_mirror_entry(vfs_path, parent)
+        else:
+            moved = self._vfs.rename_mirror_entry(vfs_path, name)  # The mount itself
+        if moved:
+            print(f"⚠️  Storage mirror moved {vfs_path} to {target}: it held VFS data not on disk")
+        else:
+            print(f"⚠️  Storage mirror kept {vfs_path}: it holds VFS data not on disk, "
+                  f"and could not be moved to {target}")
+        return moved
+    
+    def keep_version(self, storage_path: str, replacement: Optional[bytes] = None) -> bool:
+        """
+        Add a real file's content to its history just before it is
+        overwritten, unless it already holds `replacement`.
+        
+        Args:
+            storage_path: File about to be overwritten
+            replacement: Content it is about to be overwritten with
+        
+        Returns:
+            True if a version was added
+        """
+        real_path = self._real_path(storage_path)
+        vfs_path = self.vfs_path(storage_path)
+        try:
+            stat = os.stat(real_path)
+            if stat.st_size > HISTORY_SIZE_LIMIT:
+                return False
+            data = real_path.read_bytes()
+        except OSError as e:
+            print(f"⚠️  Error keeping a version of {storage_path}: {e}")
+            return False
+        if data == replacement:
+            return False
+        if not self._vfs.exists(vfs_path):
+            self.sync(storage_path, recursive=False)  # Created since the last pass
+        return self._vfs.add_mirror_version(vfs_path, data, stat.st_mtime)
+    
+    def list_versions(self, storage_path: str) -> List[Dict[str, Any]]:
+        """List a real file's earlier versions, oldest first (see VirtualFileSystem.list_versions)."""
+        return self._vfs.list_versions(self.vfs_path(storage_path))
+    
+    def read_version(self, storage_path: str, version: int) -> Optional[bytes]:
+        """Read an earlier version of a real file by its list_versions() number."""
+        return self._vfs.read_version(self.vfs_path(storage_path), version)
+    
+    def search(self, text: str, storage_path: str = "/", limit: int = 100) -> List[Tuple[str, VFSNode]]:
+        """
+        Search the mirrored tree by name, or with a structured query (see
+        core/vfs_query.py) whose in: filter is a storage path.
+        
+        Returns:
+            (storage path, node) pairs
+        """
+        scope = self.vfs_path(storage_path)
+        if self._vfs.is_structured_query(text):
+            query = parse_query(text)
+            if query.scope is not None:
+                query.scope = self.vfs_path(query.scope)
+            nodes = islice(self._vfs.query(query, scope), limit)
+        else:
+            nodes = self._vfs.search_ranked(text, scope, limit=limit)
+        results = []
+        for node in nodes:
+            path = self.storage_path(node.path)
+            if path is not None:
+                results.append((path, node))
+        return results
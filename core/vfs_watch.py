@@ -0,0 +1,199 @@
+"""
+GlassOS VFS Watches
+Change notifications for Virtual File System paths.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Any, List, Optional
+
+CREATED = "created"
+MODIFIED = "modified"
+DELETED = "deleted"
+RENAMED = "renamed"  # Renames and moves; old_path is set
+
+# What two events on the same path within one batch collapse into;
+# None means they cancel out
+_MERGED = {
+    (CREATED, MODIFIED): CREATED,
+    (CREATED, DELETED): None,
+    (MODIFIED, MODIFIED): MODIFIED,
+    (MODIFIED, DELETED): DELETED,
+    (DELETED, CREATED): MODIFIED,
+}
+
+
+@dataclass(frozen=True)
+class WatchEvent:
+    """One change to a path."""
+    kind: str
+    path: str
+    old_path: Optional[str] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert event to dictionary."""
+        return {"kind": self.kind, "path": self.path, "old_path": self.old_path}
+
+
+def _join(parent: str, name: str) -> str:
+    return f"{parent}/{name}" if parent != "/" else f"/{name}"
+
+
+def events_from_records(records: List[Dict[str, Any]]) -> List[WatchEvent]:
+    """Translate VFS mutation records into change events."""
+    events = []
+    for record in records:
+        op = record.get("op")
+        path = record.get("path", "")
+        if op == "batch":
+            events.extend(events_from_records(record["records"]))
+        elif op == "mkdir":
+            events.append(WatchEvent(CREATED, path))
+        elif op in ("write", "mirror"):
+            # New files are written with ctime == mtime
+            kind = CREATED if record.get("ctime") == record.get("mtime") else MODIFIED
+            events.append(WatchEvent(kind, path))
+        elif op == "delete":
+            events.append(WatchEvent(DELETED, path))
+        elif op == "rename":
+            parent = path.rpartition("/")[0] or "/"
+            events.append(WatchEvent(RENAMED, _join(parent, record["name"]), path))
+        elif op == "move":
+            events.append(WatchEvent(RENAMED, _join(record["dest"], path.rpartition("/")[2]), path))
+        elif path:
+            events.append(WatchEvent(MODIFIED, path))
+    return events
+
+
+def coalesce(events: List[WatchEvent]) -> List[WatchEvent]:
+    """
+    Collapse events on the same path into one, in order of first change
+    (e.g. created then modified is just created). A rename ends merging
+    for both of its paths.
+    """
+    merged: List[Optional[WatchEvent]] = []
+    positions: Dict[str, int] = {}
+    for event in events:
+        if event.kind == RENAMED:
+            positions.pop(event.old_path, None)
+            positions.pop(event.path, None)
+            merged.append(event)
+            continue
+        position = positions.get(event.path)
+        if position is None:
+            positions[event.path] = len(merged)
+            merged.append(event)
+            continue
+        previous = merged[position]
+        kind = _MERGED.get((previous.kind, event.kind), event.kind)
+        if kind is None:
+            merged[position] = None
+            del positions[event.path]
+        else:
+            merged[position] = replace(previous, kind=kind)
+    return [event for event in merged if event is not None]
+
+
+class Watch:
+    """A subscription to changes under one path."""
+    
+    def __init__(self, path: str, recursive: bool, callback: Callable[[List[WatchEvent]], None]):
+        """
+        Initialize the watch.
+        
+        Args:
+            path: Normalized path to watch
+            recursive: Also report changes below direct children
+            callback: Receives each batch of events
+        """
+        self.path = path
+        self.recursive = recursive
+        self.callback = callback
+        self.active = True
+        self._prefix = path.rstrip("/") + "/"
+    
+    def _affects(self, path: str, kind: str) -> bool:
+        if path == self.path:
+            return True
+        if path.startswith(self._prefix):
+            return self.recursive or "/" not in path[len(self._prefix):]
+        # Deleting or moving an ancestor takes the watched path with it
+        return kind in (DELETED, RENAMED) and self.path.startswith(path + "/")
+    
+    def matches(self, event: WatchEvent) -> bool:
+        """Check whether an event concerns this watch."""
+        if self._affects(event.path, event.kind):
+            return True
+        return event.old_path is not None and self._affects(event.old_path, event.kind)
+    
+    def cancel(self):
+        """Stop receiving events."""
+        self.active = False
+
+
+class WatchDispatcher:
+    """
+    Delivers change events to watches on a dedicated thread.
+    
+    Events are queued by the VFS change listener, collected for `delay`
+    seconds so bursts arrive as one batch, filtered per watch and
+    coalesced. Callbacks run on the dispatcher thread, never under the
+    VFS lock.
+    """
+    
+    def __init__(self, delay: float = 0.05):
+        """
+        Initialize the dispatcher.
+        
+        Args:
+            delay: Seconds to collect events before delivering a batch
+        """
+        self._delay = delay
+        self._cond = threading.Condition()
+        self._queue: List[WatchEvent] = []
+        self._watches: List[Watch] = []
+        self._thread: Optional[threading.Thread] = None
+    
+    def add(self, watch: Watch):
+        """Start delivering events to a watch."""
+        with self._cond:
+            self._watches.append(watch)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="vfs-watch", daemon=True)
+                self._thread.start()
+    
+    def remove(self, watch: Watch):
+        """Stop delivering events to a watch."""
+        watch.cancel()
+        with self._cond:
+            if watch in self._watches:
+                self._watches.remove(watch)
+    
+    def submit(self, records: List[Dict[str, Any]]):
+        """Queue the events for applied mutation records. Called with the VFS lock held."""
+        if not self._watches:
+            return
+        events = events_from_records(records)
+        with self._cond:
+            self._queue.extend(events)
+            self._cond.notify_all()
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+            # Let the rest of a burst arrive
+            time.sleep(self._delay)
+            with self._cond:
+                events, self._queue = self._queue, []
+                watches = [watch for watch in self._watches if watch.active]
+            for watch in watches:
+                matched = [event for event in events if watch.matches(event)]
+                if not matched or not watch.active:
+                    continue
+                try:
+                    watch.callback(coalesce(matched))
+                except Exception as e:
+                    print(f"⚠️  Error in VFS watch callback: {e}")
@@ -145,6 +145,7 @@ def main():
     
     # Initialize Virtual File System
     vfs = initialize_vfs()
+    app.aboutToQuit.connect(vfs.flush)  # Fold the VFS journal into the index
     
     # Create and show desktop environment
     desktop = DesktopEnvironment(app, config, vfs)
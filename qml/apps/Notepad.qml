@@ -122,6 +122,33 @@ Rectangle {
         loadDirectoryContents("/Documents")
     }
     
+    function showHistoryDialog() {
+        historyModel.clear()
+        var versions = Storage.listVersions(filePath)
+        // Newest first
+        for (var i = versions.length - 1; i >= 0; i--) {
+            historyModel.append({
+                version: versions[i].version,
+                modified: versions[i].modified.replace("T", " ").split(".")[0],
+                size: versions[i].size
+            })
+        }
+        historyList.currentIndex = -1
+        historyDialog.visible = true
+    }
+    
+    function loadVersion(version, size) {
+        var content = Storage.readVersion(filePath, version)
+        if (content === "" && size > 0) {
+            showNotification("Could not read that version!", true)
+            return false
+        }
+        // Saving makes it current; the text it replaces joins the history
+        textArea.text = content
+        showNotification("Earlier version loaded - save to keep it")
+        return true
+    }
+    
     function loadDirectoryContents(path) {
         openDialog.currentPath = path
         var items = Storage.listDirectory(path)
@@ -271,6 +298,11 @@ Rectangle {
                                 text: "Save As..."; shortcut: "Ctrl+Shift+S"; icon: "📥"
                                 onClicked: { fileMenu.close(); showSaveAsDialog() }
                             }
+                            MenuItem { 
+                                text: "Version History..."; icon: "🕘"
+                                enabled: filePath !== ""
+                                onClicked: { fileMenu.close(); showHistoryDialog() }
+                            }
                             MenuSeparator {}
                             
                             // Recent files
@@ -1021,6 +1053,149 @@ Rectangle {
         }
     }
     
+    // ===== VERSION HISTORY DIALOG =====
+    Rectangle {
+        id: historyDialog
+        anchors.fill: parent
+        color: Qt.rgba(0, 0, 0, 0.7)
+        visible: false
+        z: 1000
+        
+        MouseArea { anchors.fill: parent; onClicked: {} }
+        
+        Rectangle {
+            anchors.centerIn: parent
+            width: 420
+            height: 360
+            radius: 12
+            color: Qt.rgba(0.12, 0.14, 0.18, 0.98)
+            border.width: 1
+            border.color: Qt.rgba(1,1,1,0.1)
+            
+            Column {
+                anchors.fill: parent
+                anchors.margins: 20
+                spacing: 12
+                
+                Text {
+                    text: "Version History"
+                    color: "#fff"
+                    font.pixelSize: 18
+                    font.bold: true
+                }
+                
+                Rectangle {
+                    width: parent.width
+                    height: parent.height - 100
+                    radius: 6
+                    color: Qt.rgba(0,0,0,0.3)
+                    
+                    Text {
+                        anchors.centerIn: parent
+                        text: "No earlier versions saved"
+                        color: "#666"
+                        font.pixelSize: 12
+                        visible: historyModel.count === 0
+                    }
+                    
+                    ListView {
+                        id: historyList
+                        anchors.fill: parent
+                        anchors.margins: 4
+                        clip: true
+                        model: ListModel { id: historyModel }
+                        
+                        delegate: Rectangle {
+                            width: ListView.view.width
+                            height: 32
+                            radius: 4
+                            color: ListView.isCurrentItem ? Qt.rgba(0.3, 0.5, 0.8, 0.4) : (historyItemMouse.containsMouse ? Qt.rgba(1,1,1,0.08) : "transparent")
+                            
+                            Row {
+                                anchors.fill: parent
+                                anchors.leftMargin: 12
+                                spacing: 10
+                                
+                                Text {
+                                    text: "🕘"
+                                    font.pixelSize: 14
+                                    anchors.verticalCenter: parent.verticalCenter
+                                }
+                                
+                                Text {
+                                    text: model.modified
+                                    color: "#fff"
+                                    font.pixelSize: 13
+                                    anchors.verticalCenter: parent.verticalCenter
+                                }
+                                
+                                Text {
+                                    text: model.size + " bytes"
+                                    color: "#888"
+                                    font.pixelSize: 11
+                                    anchors.verticalCenter: parent.verticalCenter
+                                }
+                            }
+                            
+                            MouseArea {
+                                id: historyItemMouse
+                                anchors.fill: parent
+                                hoverEnabled: true
+                                cursorShape: Qt.PointingHandCursor
+                                
+                                onClicked: historyList.currentIndex = index
+                                
+                                onDoubleClicked: {
+                                    if (loadVersion(model.version, model.size)) {
+                                        historyDialog.visible = false
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+                
+                Row {
+                    anchors.right: parent.right
+                    spacing: 12
+                    
+                    Rectangle {
+                        width: 80; height: 36; radius: 6
+                        color: cancelHistoryMouse.containsMouse ? Qt.rgba(1,1,1,0.15) : Qt.rgba(1,1,1,0.08)
+                        Text { anchors.centerIn: parent; text: "Cancel"; color: "#aaa"; font.pixelSize: 13 }
+                        MouseArea { 
+                            id: cancelHistoryMouse
+                            anchors.fill: parent
+                            hoverEnabled: true
+                            cursorShape: Qt.PointingHandCursor
+                            onClicked: historyDialog.visible = false
+                        }
+                    }
+                    
+                    Rectangle {
+                        width: 80; height: 36; radius: 6
+                        color: confirmHistoryMouse.containsMouse ? Qt.rgba(0.3, 0.5, 0.8, 1) : Qt.rgba(0.3, 0.5, 0.8, 0.8)
+                        opacity: historyList.currentIndex >= 0 ? 1 : 0.5
+                        Text { anchors.centerIn: parent; text: "Load"; color: "#fff"; font.pixelSize: 13; font.bold: true }
+                        MouseArea { 
+                            id: confirmHistoryMouse
+                            anchors.fill: parent
+                            hoverEnabled: true
+                            cursorShape: Qt.PointingHandCursor
+                            enabled: historyList.currentIndex >= 0
+                            onClicked: {
+                                var item = historyModel.get(historyList.currentIndex)
+                                if (loadVersion(item.version, item.size)) {
+                                    historyDialog.visible = false
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+    
     // ===== NOTIFICATION =====
     Rectangle {
         id: notification
@@ -0,0 +1,24 @@
+"""
+Shared fixtures for the GlassOS test suite.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.vfs import VirtualFileSystem
+
+
+@pytest.fixture
+def open_vfs(tmp_path):
+    """Open (or reopen) an initialized VFS stored under tmp_path."""
+    def opener(**kwargs) -> VirtualFileSystem:
+        vfs = VirtualFileSystem(tmp_path / "vfs", **kwargs)
+        vfs.initialize()
+        return vfs
+    return opener
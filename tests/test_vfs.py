@@ -0,0 +1,266 @@
+"""
+Tests for the Virtual File System: concurrency, binary files, lazy
+shards, batches, listing, walk and glob.
+"""
+
+import gzip
+import struct
+
+import pytest
+
+import core.vfs
+from benchmarks.vfs_benchmark import run_stress
+
+
+def shard_pending(vfs, name: str) -> bool:
+    """Whether a top-level directory's shard is still unloaded."""
+    return vfs._root.children[name].inode in vfs._pending_shards
+
+
+def test_stress_readers_never_see_half_applied_changes():
+    counts, errors = run_stress(seconds=2, readers=4)
+    assert counts["reads"] > 0 and counts["writes"] > 0
+    assert errors == []
+
+
+def bmp_file(width: int, height: int) -> bytes:
+    """A minimal 24-bit bitmap with a BITMAPINFOHEADER."""
+    row = b"\0" * ((width * 3 + 3) & ~3)
+    pixels = row * height
+    info = struct.pack("<IiiHHIIiiII", 40, width, height, 1, 24, 0, len(pixels), 0, 0, 0, 0)
+    return b"BM" + struct.pack("<IHHI", 14 + len(info) + len(pixels), 0, 0, 14 + len(info)) + info + pixels
+
+
+def test_binary_round_trip_and_ranged_reads(open_vfs):
+    vfs = open_vfs()
+    data = bytes(range(256)) * 64
+    assert vfs.write_bytes("/Pictures/blob.bin", data)
+    assert vfs.read_bytes("/Pictures/blob.bin") == data
+    assert vfs.read_range("/Pictures/blob.bin", 1000, 24) == data[1000:1024]
+    assert vfs.read_range("/Pictures/blob.bin", len(data) - 4, 100) == data[-4:]
+    with vfs.open_read("/Pictures/blob.bin") as stream:
+        assert bytes(stream.memoryview()[256:512]) == data[256:512]
+    assert vfs.get_node("/Pictures/blob.bin").size == len(data)
+
+
+def test_content_type_from_header(open_vfs):
+    vfs = open_vfs()
+    png = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", 4, 2) + b"\0" * 16
+    vfs.write_bytes("/Pictures/a.png", png)
+    vfs.write_bytes("/Pictures/a.bmp", bmp_file(3, 2))
+    vfs.write_bytes("/Pictures/a.gz", gzip.compress(b"x"))
+    vfs.write_bytes("/Pictures/raw.bin", b"\x00\x01\x02")
+    vfs.write_file("/Documents/caf\u00e9.txt", "caf\u00e9 " * 200)
+    vfs.write_file("/Documents/bm.txt", "BMW service notes: oil, brakes, tyres")
+    
+    assert vfs.content_type("/Pictures/a.png") == "png"
+    assert vfs.content_type("/Pictures/a.bmp") == "bmp"
+    assert vfs.content_type("/Pictures/a.gz") == "gzip"
+    assert vfs.content_type("/Pictures/raw.bin") == "binary"
+    assert vfs.content_type("/Documents/caf\u00e9.txt") == "text"
+    assert vfs.content_type("/Documents/bm.txt") == "text"
+    assert vfs.content_type("/Documents") is None
+
+
+def test_bmp_needs_a_consistent_header(open_vfs):
+    vfs = open_vfs()
+    bitmap = bmp_file(3, 2)
+    vfs.write_bytes("/Pictures/truncated.bmp", bitmap[:-4])
+    vfs.write_bytes("/Pictures/bad_dib.bmp", bitmap[:14] + struct.pack("<I", 41) + bitmap[18:])
+    assert vfs.content_type("/Pictures/truncated.bmp") == "binary"
+    assert vfs.content_type("/Pictures/bad_dib.bmp") == "binary"
+
+
+def test_lazy_shard_loads_on_access(open_vfs):
+    vfs = open_vfs()
+    for i in range(5):
+        vfs.create_file(f"/Music/track{i}.mp3", f"body{i}")
+    vfs.flush()
+    
+    reopened = open_vfs()
+    assert shard_pending(reopened, "Music")
+    assert reopened.read_file("/Music/track3.mp3") == "body3"
+    assert not shard_pending(reopened, "Music")
+    assert len(reopened.list_directory("/Music")) == 5
+
+
+def test_failed_shard_load_stays_pending(open_vfs, monkeypatch):
+    vfs = open_vfs()
+    for i in range(5):
+        vfs.create_file(f"/Music/track{i}.mp3", f"body{i}")
+    vfs.flush()
+    shard = vfs._shard_files["Music"][1]
+    
+    reader = core.vfs.IndexReader
+    def broken(path, *args, **kwargs):
+        if str(path).endswith(shard):
+            raise OSError(5, "I/O error")
+        return reader(path, *args, **kwargs)
+    
+    monkeypatch.setattr(core.vfs, "IndexReader", broken)
+    reopened = open_vfs()
+    assert reopened.read_file("/Music/track0.mp3") is None
+    assert shard_pending(reopened, "Music")
+    assert not reopened.create_file("/Music/new.mp3", "new")
+    assert not reopened.delete("/Music")
+    assert reopened.create_file("/Documents/fine.txt", "ok")
+    reopened.flush()
+    
+    # Once the shard reads again, nothing in it was lost
+    monkeypatch.setattr(core.vfs, "IndexReader", reader)
+    recovered = open_vfs()
+    assert [recovered.read_file(f"/Music/track{i}.mp3") for i in range(5)] == [f"body{i}" for i in range(5)]
+    assert recovered.read_file("/Documents/fine.txt") == "ok"
+
+
+@pytest.mark.parametrize("lazy_shards", [True, False])
+def test_missing_shard_keeps_the_rest_of_the_tree(open_vfs, lazy_shards):
+    vfs = open_vfs()
+    vfs.create_file("/Documents/important.txt", "keep")
+    vfs.create_file("/Music/track.mp3", "body")
+    vfs.flush()
+    (vfs.shards_path / vfs._shard_files["Music"][1]).unlink()
+    
+    reopened = open_vfs(lazy_shards=lazy_shards)
+    assert reopened.read_file("/Documents/important.txt") == "keep"
+    assert reopened.is_directory("/Music")
+    assert shard_pending(reopened, "Music")
+    assert not reopened.create_file("/Music/new.mp3", "new")
+    assert reopened.create_file("/Documents/more.txt", "more")
+    reopened.flush()
+    
+    again = open_vfs()
+    assert again.read_file("/Documents/important.txt") == "keep"
+    assert again.read_file("/Documents/more.txt") == "more"
+    assert again.is_directory("/Music")
+
+
+@pytest.mark.parametrize("ops", [
+    [("mkdir", "/Batch"), ("rename", "/Batch")],
+    [("mkdir", "/Batch"), ("write", "/Batch/x.txt", 5)],
+    [("mkdir", "/Batch"), ("frobnicate", "/Batch")],
+    [("mkdir", "/Batch"), ()],
+])
+def test_malformed_batch_applies_nothing(open_vfs, ops):
+    vfs = open_vfs()
+    with pytest.raises(ValueError):
+        vfs.apply_batch(ops)
+    assert not vfs.exists("/Batch")
+
+
+def test_batch_replays_as_one_record(open_vfs):
+    vfs = open_vfs()
+    results = vfs.apply_batch([
+        ("mkdir", "/Batch"),
+        ("write", "/Batch/x.txt", b"1"),
+        ("rename", "/Batch/x.txt", "y.txt"),
+        ("move", "/Batch/y.txt", "/Documents"),
+        ("delete", "/Missing"),
+    ])
+    assert results == [True, True, True, True, False]
+    
+    reopened = open_vfs()
+    assert reopened.is_directory("/Batch")
+    assert reopened.read_bytes("/Documents/y.txt") == b"1"
+
+
+@pytest.fixture
+def listing_vfs(open_vfs):
+    vfs = open_vfs()
+    for name, size in (("b.txt", 30), ("a.txt", 10), ("c.log", 20)):
+        vfs.create_file(f"/Tree/{name}", "x" * size)
+    vfs.create_file("/Tree/Sub/deep.txt", "x")
+    vfs.create_file("/Tree/Sub/Inner/deeper.txt", "x")
+    vfs.create_file("/Tree/Skip/hidden.txt", "x")
+    return vfs
+
+
+def test_iter_directory_pages_sorted_listings(listing_vfs):
+    vfs = listing_vfs
+    names = lambda nodes: [node.name for node in nodes]
+    assert names(vfs.iter_directory("/Tree")) == ["b.txt", "a.txt", "c.log", "Sub", "Skip"]
+    assert names(vfs.iter_directory("/Tree", sort_key="name")) == ["a.txt", "b.txt", "c.log", "Skip", "Sub"]
+    assert names(vfs.iter_directory("/Tree", sort_key="type")) == ["Skip", "Sub", "a.txt", "b.txt", "c.log"]
+    assert names(vfs.iter_directory("/Tree", 1, 2, sort_key="-size")) == ["c.log", "a.txt"]
+    assert names(vfs.iter_directory("/Tree", 4, 10, sort_key="name")) == ["Sub"]
+    
+    # A cached order is replaced once the directory changes
+    vfs.create_file("/Tree/aa.txt", "x")
+    assert names(vfs.iter_directory("/Tree", 0, 2, sort_key="name")) == ["a.txt", "aa.txt"]
+    with pytest.raises(ValueError):
+        list(vfs.iter_directory("/Tree", sort_key="colour"))
+    assert list(vfs.iter_directory("/Tree/a.txt")) == []
+
+
+def test_walk_and_glob(listing_vfs):
+    vfs = listing_vfs
+    walked = []
+    for dir_path, dir_names, file_names in vfs.walk("/Tree"):
+        walked.append((dir_path, sorted(file_names)))
+        if "Skip" in dir_names:
+            dir_names.remove("Skip")
+    assert walked == [
+        ("/Tree", ["a.txt", "b.txt", "c.log"]),
+        ("/Tree/Sub", ["deep.txt"]),
+        ("/Tree/Sub/Inner", ["deeper.txt"]),
+    ]
+    
+    assert sorted(vfs.glob("/Tree/*.txt")) == ["/Tree/a.txt", "/Tree/b.txt"]
+    assert sorted(vfs.glob("/Tree/[ab].*")) == ["/Tree/a.txt", "/Tree/b.txt"]
+    assert sorted(vfs.glob("/Tree/?.log")) == ["/Tree/c.log"]
+    assert sorted(vfs.glob("/Tree/**/deep*.txt")) == ["/Tree/Sub/Inner/deeper.txt", "/Tree/Sub/deep.txt"]
+    assert sorted(vfs.glob("/Tree/Sub/**")) == ["/Tree/Sub", "/Tree/Sub/Inner", "/Tree/Sub/Inner/deeper.txt",
+                                                "/Tree/Sub/deep.txt"]
+    assert list(vfs.glob("/Tree/Sub/deep.txt")) == ["/Tree/Sub/deep.txt"]
+    assert list(vfs.glob("/Tree/missing/*")) == []
+
+
+def test_usage_is_maintained_through_every_change(open_vfs):
+    vfs = open_vfs()
+    vfs.create_file("/Usage/a.txt", "x" * 100)
+    vfs.create_file("/Usage/Sub/b.txt", "x" * 50)
+    vfs.write_file("/Usage/a.txt", "x" * 70)
+    vfs.create_file("/Other/c.txt", "x" * 5)
+    vfs.move("/Other/c.txt", "/Usage/Sub")
+    vfs.rename("/Usage/Sub", "Moved")
+    vfs.apply_batch([("write", "/Usage/d.txt", b"1234"), ("delete", "/Usage/Moved/b.txt")])
+    
+    usage = vfs.get_usage("/Usage")
+    assert (usage["bytes"], usage["files"], usage["directories"]) == (79, 3, 1)
+    walked = sum(vfs.get_node(f"{d}/{name}").size for d, _, files in vfs.walk("/Usage") for name in files)
+    assert walked == 79
+    assert vfs.get_usage("/Other")["bytes"] == 0
+    assert vfs.get_usage("/Usage/a.txt") is None
+
+
+def test_quotas_limit_writes_streams_moves_and_batches(open_vfs):
+    vfs = open_vfs(max_versions=5)
+    assert vfs.set_quota("/Logs", max_bytes=100, max_files=3) is False  # No such directory
+    vfs.create_directory("/Logs")
+    vfs.create_file("/Elsewhere/big.log", "x" * 95)
+    assert vfs.set_quota("/Logs", max_bytes=100, max_files=3)
+    
+    assert vfs.create_file("/Logs/a.log", "x" * 60)
+    assert not vfs.create_file("/Logs/b.log", "x" * 41)
+    assert vfs.write_file("/Logs/a.log", "x" * 100)  # Replacing counts only the difference
+    assert vfs.write_file("/Logs/a.log", "x" * 10)  # Earlier versions do not count
+    assert not vfs.move("/Elsewhere/big.log", "/Logs")
+    with vfs.open_write("/Logs/stream.log") as stream:
+        stream.write(b"x" * 91)
+    assert not vfs.exists("/Logs/stream.log")
+    assert vfs.create_file("/Logs/b.log", "")
+    assert vfs.create_file("/Logs/c.log", "")
+    assert vfs.apply_batch([("write", "/Logs/d.log", b"")]) == [False]
+    
+    # A tighter quota above wins
+    vfs.create_directory("/Logs/App")
+    vfs.set_quota("/", max_bytes=vfs.get_usage("/")["bytes"] + 5)
+    assert vfs.get_usage("/Logs/App")["available_bytes"] == 5
+    assert vfs.get_usage("/Logs")["available_files"] == 0
+    vfs.flush()
+    
+    reopened = open_vfs()
+    assert reopened.get_usage("/Logs")["quota_bytes"] == 100
+    assert not reopened.create_file("/Logs/App/e.log", "x" * 6)
+    assert reopened.set_quota("/Logs") and reopened.set_quota("/")
+    assert reopened.create_file("/Logs/App/e.log", "x" * 500)
@@ -0,0 +1,71 @@
+"""
+Tests for the SQLite storage backend.
+"""
+
+import sqlite3
+
+import pytest
+
+from core.vfs_backend import SQLiteBackend
+
+
+@pytest.fixture
+def open_sqlite(open_vfs, tmp_path):
+    """Open (or reopen) a VFS stored in tmp_path/vfs.db."""
+    def opener(**kwargs):
+        return open_vfs(backend=SQLiteBackend(tmp_path / "vfs.db"), **kwargs)
+    return opener
+
+
+def tree(vfs) -> list:
+    return sorted((node.path, node.inode, node.size, node.content_hash) for node in vfs._nodes.values())
+
+
+def test_sqlite_round_trip(open_sqlite, tmp_path):
+    vfs = open_sqlite()
+    vfs.create_file("/Documents/a.txt", "alpha")
+    vfs.write_bytes("/Pictures/blob.bin", bytes(range(256)) * 100)
+    with vfs.open_write("/Music/stream.bin") as stream:
+        for _ in range(10):
+            stream.write(b"chunk" * 1000)
+    vfs.create_directory("/Documents/Sub")
+    vfs.rename("/Documents/a.txt", "b.txt")
+    vfs.move("/Documents/b.txt", "/Documents/Sub")
+    vfs.write_file("/Documents/Sub/b.txt", "alpha beta")
+    vfs.delete("/Documents/Notes")
+    vfs.flush()
+    
+    reopened = open_sqlite()
+    assert tree(reopened) == tree(vfs)
+    assert reopened.read_file("/Documents/Sub/b.txt") == "alpha beta"
+    assert reopened.read_version("/Documents/Sub/b.txt", 0) == b"alpha"
+    assert reopened.read_bytes("/Pictures/blob.bin") == bytes(range(256)) * 100
+    assert reopened.read_range("/Music/stream.bin", 4995, 10) == b"chunkchunk"
+    assert not reopened.index_path.exists() and not reopened.journal_path.exists()
+    
+    connection = sqlite3.connect(tmp_path / "vfs.db")
+    assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+
+
+def test_sqlite_drops_orphaned_bodies(open_sqlite, tmp_path):
+    vfs = open_sqlite()
+    vfs.create_file("/Documents/a.txt", "kept")
+    vfs._backend.put(b"never referenced")
+    vfs.flush()
+    
+    reopened = open_sqlite()
+    connection = sqlite3.connect(tmp_path / "vfs.db")
+    assert connection.execute("SELECT count(*) FROM content WHERE data = ?", (b"never referenced",)).fetchone() == (0,)
+    assert reopened.read_file("/Documents/a.txt") == "kept"
+
+
+def test_sqlite_name_search(open_sqlite):
+    vfs = open_sqlite()
+    for name in ("report.txt", "my_report_draft.txt", "notes.md", "ab.txt"):
+        vfs.create_file(f"/Documents/{name}", "x")
+    vfs.flush()
+    
+    reopened = open_sqlite()
+    assert sorted(node.name for node in reopened.search("report")) == ["my_report_draft.txt", "report.txt"]
+    assert [node.name for node in reopened.search("ab")] == ["ab.txt"]
+    assert [node.name for node in reopened.search_ranked("report", limit=1)] == ["report.txt"]
@@ -0,0 +1,79 @@
+"""
+Tests for transparent compression of VFS file bodies.
+"""
+
+import os
+
+import pytest
+
+from core.vfs_compression import BodyCache, BodyCodec
+
+
+def stored_size(vfs, path: str) -> int:
+    """Bytes the file's body takes in the blob store, in whichever form it is kept."""
+    content_hash = vfs.get_node(path).content_hash
+    for blob_path in (vfs._blobs._blob_path(content_hash), vfs._blobs._compressed_path(content_hash)):
+        if blob_path.exists():
+            return blob_path.stat().st_size
+    raise AssertionError(f"no blob for {path}")
+
+
+def test_codec_compresses_only_what_pays_off():
+    codec = BodyCodec(level=6, threshold=100)
+    text = b"log line: all systems nominal\n" * 100
+    packed = codec.compress(text)
+    assert packed is not None and len(packed) < len(text) // 10
+    assert codec.compress(b"short" * 10) is None
+    assert codec.compress(os.urandom(1000)) is None
+    assert BodyCodec(level=0).compress(text) is None
+    with pytest.raises(ValueError):
+        BodyCodec(level=10)
+    
+    stats = codec.stats.to_dict()
+    assert stats["compressed_bodies"] == 1 and stats["incompressible_bodies"] == 1
+    assert stats["ratio"] == len(text) / len(packed)
+
+
+def test_body_cache_evicts_least_recently_used():
+    cache = BodyCache(max_bytes=400)
+    cache.put("a", b"a" * 100)
+    cache.put("b", b"b" * 100)
+    cache.put("c", b"c" * 100)
+    cache.get("a")
+    cache.put("d", b"d" * 100)
+    cache.put("e", b"e" * 100)
+    assert cache.get("b") is None and cache.get("a") is not None
+    assert cache.nbytes <= 400
+    cache.put("huge", b"h" * 200)  # Over a quarter of the budget
+    assert cache.get("huge") is None
+
+
+def test_text_is_stored_compressed_and_read_back(open_vfs):
+    vfs = open_vfs(compression_threshold=512)
+    text = '{"event": "tick", "ok": true}\n' * 2000
+    noise = os.urandom(4096)
+    vfs.write_file("/Documents/log.json", text)
+    vfs.write_bytes("/Pictures/noise.bin", noise)
+    vfs.write_file("/Documents/tiny.txt", "tiny")
+    
+    assert stored_size(vfs, "/Documents/log.json") < len(text) // 3
+    assert stored_size(vfs, "/Pictures/noise.bin") == len(noise)
+    assert stored_size(vfs, "/Documents/tiny.txt") == 4
+    assert vfs.read_file("/Documents/log.json") == text
+    assert vfs.read_range("/Documents/log.json", 30, 30) == text[30:60].encode()
+    vfs.flush()
+    
+    reopened = open_vfs(compression_threshold=512)
+    assert reopened.read_file("/Documents/log.json") == text
+    assert reopened.read_file("/Documents/log.json") == text
+    stats = reopened.get_compression_stats()
+    assert stats["decompressions"] == 1 and stats["cache_hits"] >= 1
+    assert vfs.get_compression_stats()["ratio"] > 3
+
+
+def test_level_zero_stores_verbatim(open_vfs):
+    vfs = open_vfs(compression_level=0)
+    text = "same line\n" * 1000
+    vfs.write_file("/Documents/plain.txt", text)
+    assert stored_size(vfs, "/Documents/plain.txt") == len(text)
+    assert vfs.read_file("/Documents/plain.txt") == text
@@ -0,0 +1,137 @@
+"""
+Tests for VFS snapshots and file version history.
+"""
+
+import threading
+
+import core.vfs
+import core.vfs_history
+from core.vfs_history import apply_delta, make_delta
+from core.vfs_sync import MirrorSync
+
+
+def test_delta_round_trip():
+    older = "".join(f"line {i}\n" for i in range(100))
+    newer = older.replace("line 50\n", "line fifty\n").replace("line 99\n", "")
+    delta = make_delta(newer, older)
+    assert apply_delta(newer, delta) == older
+    assert len(delta) < 100  # Shared lines are ranges, not text
+
+
+def test_delta_gives_up_past_the_line_limit(monkeypatch):
+    monkeypatch.setattr(core.vfs_history, "DELTA_LINE_LIMIT", 10)
+    older = "".join(f"{i % 3}\n" for i in range(50))
+    newer = "".join(f"{(i + 1) % 3}\n" for i in range(50))
+    assert make_delta(newer, older) is None
+    # Shared lines at both ends do not count towards the limit
+    edited = "head\n" * 100 + "middle\n" + "tail\n" * 100
+    assert apply_delta(edited, make_delta(edited, edited.replace("middle", "centre"))) == \
+        edited.replace("middle", "centre")
+
+
+def test_versions_and_restore(open_vfs):
+    vfs = open_vfs(max_versions=3)
+    for text in ("one\n", "one\ntwo\n", "one\ntwo\nthree\n", "four\n"):
+        vfs.write_file("/Documents/notes.txt", text)
+    vfs.write_bytes("/Documents/notes.txt", b"\xff\xfe binary")
+    vfs.flush()
+    
+    assert [entry["version"] for entry in vfs.list_versions("/Documents/notes.txt")] == [0, 1, 2]
+    assert [vfs.read_version("/Documents/notes.txt", i) for i in range(3)] == \
+        [b"one\ntwo\n", b"one\ntwo\nthree\n", b"four\n"]
+    assert vfs.read_version("/Documents/notes.txt", 3) is None
+    
+    assert vfs.restore_version("/Documents/notes.txt", 1)
+    assert vfs.read_file("/Documents/notes.txt") == "one\ntwo\nthree\n"
+    assert vfs.read_version("/Documents/notes.txt", 2) == b"\xff\xfe binary"
+    vfs.flush()
+    
+    reopened = open_vfs(max_versions=3)
+    assert [reopened.read_version("/Documents/notes.txt", i) for i in range(3)] == \
+        [b"one\ntwo\nthree\n", b"four\n", b"\xff\xfe binary"]
+
+
+def test_version_delta_is_computed_off_the_lock(open_vfs, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    threads = []
+    
+    def slow_delta(newer, older):
+        threads.append(threading.current_thread())
+        started.set()
+        release.wait(5)
+        return make_delta(newer, older)
+    
+    monkeypatch.setattr(core.vfs, "make_delta", slow_delta)
+    vfs = open_vfs()
+    old = "".join(f"line {i}\n" for i in range(1000))
+    vfs.write_file("/Documents/big.txt", old)
+    vfs.write_file("/Documents/big.txt", old.replace("line 500\n", "edited\n"))
+    
+    # Other callers, writers included, go ahead while the delta is computed
+    assert started.wait(5)
+    assert threads[0] is not threading.current_thread()
+    assert vfs.create_file("/Documents/other.txt", "x")
+    assert vfs.read_version("/Documents/big.txt", 0).decode() == old
+    release.set()
+    vfs.flush()
+    
+    entry = vfs.get_node("/Documents/big.txt").metadata["versions"][0]
+    assert "delta" in entry and "hash" not in entry
+    assert open_vfs().read_version("/Documents/big.txt", 0).decode() == old
+
+
+def test_large_rewrite_keeps_a_full_copy(open_vfs, monkeypatch):
+    monkeypatch.setattr(core.vfs_history, "DELTA_LINE_LIMIT", 10)
+    vfs = open_vfs()
+    old = "".join(f"{i % 3}\n" for i in range(500))
+    vfs.write_file("/Documents/rows.txt", old)
+    vfs.write_file("/Documents/rows.txt", "".join(f"{(i + 1) % 3}\n" for i in range(500)))
+    vfs.flush()
+    
+    entry = vfs.get_node("/Documents/rows.txt").metadata["versions"][0]
+    assert "hash" in entry
+    assert vfs.read_version("/Documents/rows.txt", 0).decode() == old
+
+
+def test_snapshot_is_isolated_from_later_changes(open_vfs):
+    vfs = open_vfs()
+    vfs.write_file("/Documents/a.txt", "before")
+    snapshot = vfs.snapshot()
+    vfs.write_file("/Documents/a.txt", "after")
+    vfs.create_file("/Documents/b.txt", "new")
+    vfs.delete("/Documents/Notes")
+    vfs.flush()
+    
+    assert snapshot.read_file("/Documents/a.txt") == "before"
+    assert not snapshot.exists("/Documents/b.txt")
+    assert snapshot.is_directory("/Documents/Notes")
+    assert vfs.read_file("/Documents/a.txt") == "after"
+    snapshot.close()
+
+
+def test_mirrored_file_keeps_versions(open_vfs, tmp_path):
+    root = tmp_path / "real"
+    (root / "Documents").mkdir(parents=True)
+    note = root / "Documents" / "note.txt"
+    body = "".join(f"line {i}\n" for i in range(100))
+    drafts = ["draft 1\n" + body, "draft 2\n" + body, "draft 3\n" + body, "final\n"]
+    note.write_text(drafts[0])
+    vfs = open_vfs(max_versions=3)
+    mirror = MirrorSync(vfs, root, interval=0)
+    mirror.sync()
+    
+    # What StorageProvider.writeFile does for Notepad; saving unchanged text adds nothing
+    for text in (drafts[1], drafts[1], drafts[2], drafts[3]):
+        mirror.keep_version("/Documents/note.txt", text.encode())
+        note.write_text(text)
+        mirror.sync("/Documents/note.txt")
+    vfs.flush()
+    
+    versions = vfs.get_node("/Storage/Documents/note.txt").metadata["versions"]
+    assert ["hash" in entry for entry in versions] == [False, False, True]
+    assert [mirror.read_version("/Documents/note.txt", i).decode() for i in range(3)] == drafts[:3]
+    assert not vfs.restore_version("/Storage/Documents/note.txt", 0)
+    
+    reopened = MirrorSync(open_vfs(max_versions=3), root, interval=0)
+    assert [entry["version"] for entry in reopened.list_versions("/Documents/note.txt")] == [0, 1, 2]
+    assert reopened.read_version("/Documents/note.txt", 0).decode() == drafts[0]
@@ -0,0 +1,43 @@
+"""
+Tests for the VFS write-ahead journal: replay and recovery from torn appends.
+"""
+
+
+def crash_mid_append(vfs):
+    """Leave half a record at the end of the journal, as a crash mid-append would."""
+    with open(vfs.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"op":"write","path":"/Documents/torn.txt","si')
+
+
+def test_journal_replay_restores_unflushed_changes(open_vfs):
+    vfs = open_vfs()
+    vfs.create_file("/Documents/a.txt", "first")
+    vfs.write_file("/Documents/a.txt", "second")
+    vfs.create_directory("/Documents/Sub")
+    vfs.rename("/Documents/a.txt", "b.txt")
+    vfs.move("/Documents/b.txt", "/Documents/Sub")
+    stats = vfs.get_stats()
+    
+    # Reopen without flushing: the journal alone carries the changes
+    reopened = open_vfs()
+    assert reopened.read_file("/Documents/Sub/b.txt") == "second"
+    assert not reopened.exists("/Documents/a.txt")
+    assert reopened.get_stats()["total_nodes"] == stats["total_nodes"]
+
+
+def test_torn_tail_is_truncated_before_appending(open_vfs):
+    vfs = open_vfs()
+    vfs.create_file("/Documents/a.txt", "a")
+    crash_mid_append(vfs)
+    
+    recovered = open_vfs()
+    assert recovered.read_file("/Documents/a.txt") == "a"
+    assert not recovered.exists("/Documents/torn.txt")
+    assert recovered.journal_path.read_bytes().endswith(b"\n")
+    recovered.create_file("/Documents/b.txt", "b")
+    recovered.create_file("/Documents/c.txt", "c")
+    crash_mid_append(recovered)
+    
+    # Records written after the first recovery survive the second crash
+    again = open_vfs()
+    assert [again.read_file(f"/Documents/{name}.txt") for name in "abc"] == ["a", "b", "c"]
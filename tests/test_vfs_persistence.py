@@ -0,0 +1,103 @@
+"""
+Tests for VFS persistence: durable bodies and background saves.
+"""
+
+import time
+
+import pytest
+
+import core.vfs
+import core.vfs_blobstore
+import core.vfs_persistence
+from core.vfs_journal import VFSJournal
+
+
+@pytest.fixture
+def disk_events(monkeypatch):
+    """Record blob fsyncs, journal appends and index writes, in order."""
+    events = []
+    fsync_file = core.vfs_blobstore.fsync_file
+    append = VFSJournal.append
+    write_index_file = core.vfs.VirtualFileSystem._write_index_file
+    
+    def fsync_blob(path):
+        events.append(("fsync", path.parent.name + path.name))
+        fsync_file(path)
+    
+    def journal_append(self, record, fsync=False):
+        events.append(("journal", record.get("hash")))
+        return append(self, record, fsync)
+    
+    def index_write(self, path, records, journal_seq):
+        events.append(("index", path.name))
+        return write_index_file(self, path, records, journal_seq)
+    
+    monkeypatch.setattr(core.vfs_blobstore, "fsync_file", fsync_blob)
+    monkeypatch.setattr(VFSJournal, "append", journal_append)
+    monkeypatch.setattr(core.vfs.VirtualFileSystem, "_write_index_file", index_write)
+    return events
+
+
+def test_always_policy_syncs_each_body_before_its_journal_record(open_vfs, disk_events):
+    vfs = open_vfs(fsync_policy="always")
+    disk_events.clear()
+    vfs.create_file("/Documents/a.txt", "body")
+    stream = vfs.open_write("/Documents/b.bin")
+    stream.write(b"streamed")
+    stream.close()
+    
+    hashes = [content_hash for kind, content_hash in disk_events if kind == "journal"]
+    assert len(hashes) == 2
+    for content_hash in hashes:
+        assert disk_events.index(("fsync", content_hash)) < disk_events.index(("journal", content_hash))
+
+
+def test_snapshot_policy_syncs_bodies_before_the_index(open_vfs, disk_events):
+    vfs = open_vfs(fsync_policy="snapshot")
+    disk_events.clear()
+    vfs.create_file("/Documents/a.txt", "body")
+    content_hash = vfs.get_node("/Documents/a.txt").content_hash
+    assert ("fsync", content_hash) not in disk_events
+    
+    vfs.flush()
+    kinds = [kind for kind, _ in disk_events]
+    assert disk_events.index(("fsync", content_hash)) < kinds.index("index")
+
+
+def test_never_policy_leaves_bodies_to_the_os(open_vfs, disk_events):
+    vfs = open_vfs(fsync_policy="never")
+    vfs.create_file("/Documents/a.txt", "body")
+    vfs.flush()
+    assert not [event for event in disk_events if event[0] == "fsync"]
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_failed_save_is_retried_with_backoff(open_vfs, monkeypatch, journal):
+    monkeypatch.setattr(core.vfs_persistence, "RETRY_DELAY", 0.05)
+    write_index_file = core.vfs.VirtualFileSystem._write_index_file
+    attempts = []
+    
+    def flaky(self, path, records, journal_seq):
+        attempts.append(time.monotonic())
+        if len(attempts) <= 2:
+            raise OSError(28, "No space left on device")
+        return write_index_file(self, path, records, journal_seq)
+    
+    vfs = open_vfs(journal=journal)
+    monkeypatch.setattr(core.vfs.VirtualFileSystem, "_write_index_file", flaky)
+    vfs.create_file("/Documents/a.txt", "unsaved")
+    vfs.flush()
+    
+    # No further change is made: the worker retries on its own
+    deadline = time.monotonic() + 5
+    while len(attempts) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(attempts) >= 3
+    assert attempts[1] - attempts[0] >= 0.05 * 0.9
+    assert attempts[2] - attempts[1] >= 0.1 * 0.9  # Doubled after the second failure
+    vfs._persistence.flush()
+    
+    monkeypatch.setattr(core.vfs.VirtualFileSystem, "_write_index_file", write_index_file)
+    if journal:
+        vfs.journal_path.unlink()  # Only the index may hold the change now
+    assert open_vfs(journal=journal).read_file("/Documents/a.txt") == "unsaved"
@@ -0,0 +1,95 @@
+"""
+Tests for structured VFS queries: parsing, planning and execution.
+"""
+
+import time
+from datetime import datetime
+
+import pytest
+
+from core.vfs_query import DAY, parse_query
+
+NOW = datetime(2024, 3, 15, 12, 0).timestamp()
+
+
+def test_parse_filters_and_terms():
+    query = parse_query('Report "q1 draft" type:file ext:.PDF size:>1MB in:/Documents note:x', now=NOW)
+    assert query.terms == ["report", "q1 draft", "note:x"]
+    assert query.file_type == "file"
+    assert query.extension == ".pdf"
+    assert query.size == (1024 ** 2 + 1, None)
+    assert query.scope == "/Documents"
+    assert query.is_structured
+    assert not parse_query("just words").is_structured
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("size:<=10k", (None, 10 * 1024 + 1)),
+    ("size:1k..2k", (1024, 2 * 1024 + 1)),
+    ("size:1.5MB", (3 * 1024 ** 2 // 2, 3 * 1024 ** 2 // 2 + 1)),
+    ("size:>1k size:<1m", (1025, 1024 ** 2)),
+])
+def test_parse_sizes(text, expected):
+    assert parse_query(text).size == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("modified:<7d", (NOW - 7 * DAY, None)),
+    ("modified:>2w", (None, NOW - 14 * DAY)),
+    ("modified:>=2024-01-01", (datetime(2024, 1, 1).timestamp(), None)),
+    ("modified:2024-01-01..2024-02-01", (datetime(2024, 1, 1).timestamp(), datetime(2024, 2, 2).timestamp())),
+    ("modified:today", (datetime(2024, 3, 15).timestamp(), datetime(2024, 3, 16).timestamp())),
+])
+def test_parse_times(text, expected):
+    assert parse_query(text, now=NOW).mtime == expected
+
+
+@pytest.mark.parametrize("text", ["size:>lots", "type:pipe", "modified:<soon"])
+def test_parse_rejects_bad_filters(text):
+    with pytest.raises(ValueError):
+        parse_query(text)
+
+
+@pytest.fixture
+def query_vfs(open_vfs):
+    vfs = open_vfs()
+    for i in range(200):
+        vfs.create_file(f"/Data/row{i}.csv", "x" * (i % 10))
+    vfs.write_bytes("/Data/big_report.pdf", b"x" * (2 * 1024 ** 2))
+    vfs.create_file("/Documents/report.txt", "x" * 100)
+    vfs.create_file("/Documents/Sub/report.pdf", "x" * 2000)
+    return vfs
+
+
+def paths(nodes) -> list:
+    return sorted(node.path for node in nodes)
+
+
+def test_query_results(query_vfs):
+    vfs = query_vfs
+    assert paths(vfs.query("size:>1MB")) == ["/Data/big_report.pdf"]
+    assert paths(vfs.query("report ext:pdf")) == ["/Data/big_report.pdf", "/Documents/Sub/report.pdf"]
+    assert paths(vfs.query("report in:/Documents type:file")) == ["/Documents/Sub/report.pdf",
+                                                                  "/Documents/report.txt"]
+    assert paths(vfs.query("type:dir", "/Documents")) == ["/Documents", "/Documents/Notes", "/Documents/Sub"]
+    assert paths(vfs.query("size:1k..3k modified:<1h")) == ["/Documents/Sub/report.pdf"]
+    assert paths(vfs.query(parse_query("size:1k..3k modified:<1h", now=time.time() + 2 * 3600))) == []
+    assert list(vfs.query("row in:/Missing")) == []
+    assert vfs.is_structured_query("size:>1k") and not vfs.is_structured_query("size:>what")
+
+
+def test_query_plans_from_the_most_selective_index(query_vfs):
+    vfs = query_vfs
+    assert vfs.explain_query("size:>1MB") == {"index": "size", "candidates": 1}
+    assert vfs.explain_query("big_report type:file")["index"] == "name"
+    assert vfs.explain_query("type:file in:/Documents/Sub") == {"index": "scope", "candidates": 2}
+    assert vfs.explain_query("modified:>1w") == {"index": "modified", "candidates": 0}
+
+
+def test_query_streams_results(query_vfs):
+    results = query_vfs.query("row type:file")
+    first = next(results)
+    assert first.name.startswith("row")
+    # Changes made while a query is being read do not break it
+    query_vfs.delete("/Data/row199.csv")
+    assert len(list(results)) >= 198
@@ -0,0 +1,60 @@
+"""
+Tests for VFS name and full-text content search.
+"""
+
+
+def test_search_ranked_orders_exact_prefix_and_fuzzy(open_vfs):
+    vfs = open_vfs()
+    for name in ("my_report_draft.txt", "report.txt", "reports_2024.md", "r-e-p-o-r-t.log"):
+        vfs.create_file(f"/Documents/{name}", "x")
+    
+    names = [node.name for node in vfs.search_ranked("report", "/Documents")]
+    assert names == ["report.txt", "reports_2024.md", "my_report_draft.txt", "r-e-p-o-r-t.log"]
+    assert [node.name for node in vfs.search_ranked("report", "/Documents", limit=2)] == names[:2]
+
+
+def test_short_terms_search_unloaded_shards(open_vfs):
+    vfs = open_vfs()
+    vfs.create_file("/Music/ab.mp3", "x")
+    vfs.create_file("/Pictures/xab.png", "x")
+    vfs.flush()
+    
+    # After a restart only the root index is loaded; one- and two-letter
+    # terms skip the trigram index, so the scan must load the shards itself
+    reopened = open_vfs()
+    assert [node.path for node in reopened.search_ranked("ab")] == ["/Music/ab.mp3", "/Pictures/xab.png"]
+
+
+def content_search(vfs, query: str, path: str = "/") -> list:
+    vfs._content.wait()  # Indexing runs on a background thread
+    return sorted(node.path for node in vfs.search_content(query, path))
+
+
+def test_content_search_words_phrases_and_prefixes(open_vfs):
+    vfs = open_vfs(full_text=True)
+    vfs.create_file("/Documents/a.txt", "The quick brown fox jumps over the lazy dog")
+    vfs.create_file("/Documents/b.txt", "A brown dog, quick to anger")
+    vfs.create_file("/Pictures/c.txt", "quickly browning toast")
+    vfs.write_bytes("/Pictures/raw.bin", b"\0quick brown")
+    
+    assert content_search(vfs, "quick brown") == ["/Documents/a.txt", "/Documents/b.txt"]
+    assert content_search(vfs, '"brown fox"') == ["/Documents/a.txt"]
+    assert content_search(vfs, '"fox brown"') == []
+    assert content_search(vfs, "brown*") == ["/Documents/a.txt", "/Documents/b.txt", "/Pictures/c.txt"]
+    assert content_search(vfs, "quick*", "/Pictures") == ["/Pictures/c.txt"]
+    assert content_search(vfs, "") == []
+
+
+def test_content_index_follows_writes_deletes_and_reopen(open_vfs):
+    vfs = open_vfs(full_text=True)
+    vfs.create_file("/Documents/a.txt", "alpha beta")
+    vfs.create_file("/Documents/b.txt", "alpha")
+    vfs.write_file("/Documents/a.txt", "gamma")
+    vfs.delete("/Documents/b.txt")
+    
+    assert content_search(vfs, "alpha") == []
+    assert content_search(vfs, "gamma") == ["/Documents/a.txt"]
+    vfs.flush()
+    
+    assert content_search(open_vfs(full_text=True), "gamma") == ["/Documents/a.txt"]
+    assert open_vfs().search_content("gamma") == []  # Off unless asked for
@@ -0,0 +1,60 @@
+"""
+Tests for streaming reads and writes of VFS files.
+"""
+
+import io
+import mmap
+
+import pytest
+
+
+def test_streamed_write_replaces_the_body_on_close(open_vfs):
+    vfs = open_vfs()
+    vfs.write_file("/Music/song.bin", "old")
+    chunk = bytes(range(256)) * 4096
+    
+    stream = vfs.open_write("/Music/song.bin")
+    for _ in range(4):
+        stream.write(chunk)
+    stream.write("tail")
+    assert stream.size == 4 * len(chunk) + 4
+    assert vfs.read_file("/Music/song.bin") == "old"  # Not installed until closed
+    assert stream.close()
+    
+    assert vfs.get_node("/Music/song.bin").size == 4 * len(chunk) + 4
+    with vfs.open_read("/Music/song.bin") as reader:
+        assert reader.size == 4 * len(chunk) + 4
+        assert [len(part) for part in reader.chunks(len(chunk))] == [len(chunk)] * 4 + [4]
+        reader.seek(-4, io.SEEK_END)
+        assert reader.read() == b"tail"
+        reader.seek(len(chunk) + 10)
+        assert reader.tell() == len(chunk) + 10
+        assert reader.read(2) == chunk[10:12]
+        
+        view = reader.memoryview()
+        assert isinstance(view.obj, mmap.mmap)  # Mapped from disk, not copied
+        assert view[2 * len(chunk):2 * len(chunk) + 5] == chunk[:5]
+        view.release()
+    
+    assert vfs.open_read("/Music") is None
+    assert vfs.open_read("/Music/missing.bin") is None
+
+
+def test_aborted_stream_leaves_the_file_alone(open_vfs):
+    vfs = open_vfs()
+    vfs.write_file("/Documents/a.txt", "kept")
+    
+    with pytest.raises(RuntimeError):
+        with vfs.open_write("/Documents/a.txt") as stream:
+            stream.write(b"partial")
+            raise RuntimeError("interrupted")
+    assert vfs.read_file("/Documents/a.txt") == "kept"
+    with pytest.raises(ValueError):
+        stream.write(b"more")
+    assert not stream.close()
+    
+    stream = vfs.open_write("/Documents/new.txt")
+    stream.write(b"never")
+    stream.abort()
+    assert not vfs.exists("/Documents/new.txt")
+    assert vfs.open_write("/Documents") is None
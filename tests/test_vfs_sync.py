@@ -0,0 +1,99 @@
+"""
+Tests for the storage mirror: syncing real files into the VFS.
+"""
+
+import os
+
+import pytest
+
+from core.vfs_sync import MirrorSync
+
+
+@pytest.fixture
+def real_tree(tmp_path):
+    root = tmp_path / "real"
+    (root / "Documents" / "Sub").mkdir(parents=True)
+    (root / "Pictures").mkdir()
+    (root / "Documents" / "a.txt").write_text("hello")
+    (root / "Documents" / "Sub" / "big.bin").write_bytes(b"x" * 5000)
+    (root / "Pictures" / "p.png").write_bytes(b"p" * 10)
+    return root
+
+
+def test_mirror_sync_and_incremental_update(open_vfs, real_tree):
+    vfs = open_vfs()
+    mirror = MirrorSync(vfs, real_tree, interval=0)
+    counts = mirror.sync()
+    assert counts["removed"] == 0
+    big = vfs.get_node("/Storage/Documents/Sub/big.bin")
+    assert big.size == 5000
+    assert big.metadata["mirror"]["inode"] == os.stat(real_tree / "Documents" / "Sub" / "big.bin").st_ino
+    
+    counts = mirror.sync()
+    assert counts["added"] == counts["updated"] == counts["removed"] == 0
+    
+    inode = vfs.get_node("/Storage/Documents/Sub").inode
+    (real_tree / "Documents" / "a.txt").write_text("hello world")
+    (real_tree / "Documents" / "Sub").rename(real_tree / "Documents" / "Sub2")
+    (real_tree / "Pictures" / "p.png").unlink()
+    mirror.sync()
+    assert vfs.get_node("/Storage/Documents/Sub2").inode == inode
+    assert vfs.get_node("/Storage/Documents/a.txt").size == 11
+    assert not vfs.exists("/Storage/Pictures/p.png")
+    assert [path for path, _ in mirror.search("size:>1k")] == ["/Documents/Sub2/big.bin"]
+
+
+def test_mirror_is_read_only_through_vfs(open_vfs, real_tree):
+    vfs = open_vfs()
+    vfs.create_file("/Storage/Documents/a.txt", "vfs body")
+    MirrorSync(vfs, real_tree, interval=0).sync()
+    
+    path = "/Storage/Documents/a.txt"
+    assert vfs.read_bytes(path) is None
+    assert vfs.open_read(path) is None
+    assert not vfs.write_file(path, "edited")
+    assert vfs.open_write(path) is None
+    assert not vfs.create_file("/Storage/Documents/new.txt", "x")
+    assert not vfs.create_directory("/Storage/Documents/New")
+    assert not vfs.delete(path)
+    assert not vfs.rename(path, "b.txt")
+    assert not vfs.move(path, "/Documents")
+    assert not vfs.move("/Documents/Notes", "/Storage/Documents")
+    assert not vfs.delete("/Storage")
+    assert vfs.get_node(path).size == 5
+
+
+def test_vfs_data_under_the_mount_is_recovered(open_vfs, real_tree):
+    vfs = open_vfs()
+    vfs.create_file("/Storage/Documents/a.txt", "vfs body")
+    vfs.create_file("/Storage/Documents/Drafts/plan.txt", "plan")
+    vfs.create_file("/Storage/notes.txt", "notes")
+    mirror = MirrorSync(vfs, real_tree, interval=0)
+    assert mirror.sync()["recovered"] == 3
+    
+    assert vfs.get_node("/Storage/Documents/a.txt").metadata["mirror"]
+    assert not vfs.exists("/Storage/Documents/Drafts")
+    assert vfs.read_file("/Storage (recovered)/Documents/a.txt") == "vfs body"
+    assert vfs.read_file("/Storage (recovered)/Documents/Drafts/plan.txt") == "plan"
+    assert vfs.read_file("/Storage (recovered)/notes.txt") == "notes"
+    
+    # Recovered data is ordinary VFS data again, and survives a reopen
+    assert vfs.write_file("/Storage (recovered)/notes.txt", "edited")
+    vfs.flush()
+    assert open_vfs().read_file("/Storage (recovered)/notes.txt") == "edited"
+
+
+def test_vfs_data_is_kept_if_it_cannot_be_recovered(open_vfs, real_tree):
+    vfs = open_vfs()
+    mirror = MirrorSync(vfs, real_tree, interval=0)
+    (real_tree / "Documents" / "a.txt").unlink()
+    mirror.sync()
+    vfs.create_file("/Storage (recovered)/Documents/a.txt", "taken")
+    
+    # A VFS file under a mirrored folder, as a tree from before the mirror could hold
+    vfs.create_file("/Elsewhere/a.txt", "mine")
+    assert vfs.move_mirror_entry("/Elsewhere/a.txt", "/Storage/Documents")
+    mirror.sync()
+    assert vfs.read_file("/Storage/Documents/a.txt") == "mine"
+    assert vfs.read_file("/Storage (recovered)/Documents/a.txt") == "taken"
+    assert not vfs.move("/Storage/Documents/a.txt", "/Elsewhere")
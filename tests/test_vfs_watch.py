@@ -0,0 +1,94 @@
+"""
+Tests for VFS change notifications.
+"""
+
+import queue
+
+from core.vfs_watch import (CREATED, DELETED, MODIFIED, RENAMED, WatchEvent, coalesce,
+                            events_from_records)
+
+
+def watcher(vfs, path: str, recursive: bool):
+    """Watch a path; returns a function that waits for the next batch of (kind, path, old_path)."""
+    batches = queue.Queue()
+    vfs.watch(path, recursive, batches.put)
+    
+    def next_batch() -> list:
+        return [(event.kind, event.path, event.old_path) for event in batches.get(timeout=5)]
+    
+    return next_batch
+
+
+def test_coalesce_merges_changes_to_one_path():
+    events = [
+        WatchEvent(CREATED, "/a"), WatchEvent(MODIFIED, "/a"),
+        WatchEvent(CREATED, "/b"), WatchEvent(DELETED, "/b"),
+        WatchEvent(DELETED, "/c"), WatchEvent(CREATED, "/c"),
+        WatchEvent(MODIFIED, "/d"), WatchEvent(RENAMED, "/e", "/d"), WatchEvent(MODIFIED, "/e"),
+    ]
+    assert coalesce(events) == [
+        WatchEvent(CREATED, "/a"),
+        WatchEvent(MODIFIED, "/c"),
+        WatchEvent(MODIFIED, "/d"),
+        WatchEvent(RENAMED, "/e", "/d"),
+        WatchEvent(MODIFIED, "/e"),
+    ]
+
+
+def test_records_become_events():
+    records = [
+        {"op": "batch", "records": [{"op": "mkdir", "path": "/A"}]},
+        {"op": "write", "path": "/A/x", "ctime": 1.0, "mtime": 1.0},
+        {"op": "write", "path": "/A/x", "ctime": 1.0, "mtime": 2.0},
+        {"op": "rename", "path": "/A/x", "name": "y"},
+        {"op": "move", "path": "/A/y", "dest": "/"},
+        {"op": "delete", "path": "/y"},
+    ]
+    assert events_from_records(records) == [
+        WatchEvent(CREATED, "/A"),
+        WatchEvent(CREATED, "/A/x"),
+        WatchEvent(MODIFIED, "/A/x"),
+        WatchEvent(RENAMED, "/A/y", "/A/x"),
+        WatchEvent(RENAMED, "/y", "/A/y"),
+        WatchEvent(DELETED, "/y"),
+    ]
+
+
+def test_watch_delivers_one_coalesced_batch(open_vfs):
+    vfs = open_vfs()
+    vfs.create_file("/Documents/old.txt", "x")
+    direct = watcher(vfs, "/Documents", recursive=False)
+    deep = watcher(vfs, "/Documents", recursive=True)
+    
+    with vfs.transaction():
+        vfs.create_file("/Documents/new.txt", "1")
+        vfs.write_file("/Documents/new.txt", "2")
+        vfs.create_file("/Documents/Notes/deep.txt", "x")
+        vfs.create_file("/Documents/gone.txt", "x")
+        vfs.delete("/Documents/gone.txt")
+        vfs.rename("/Documents/old.txt", "renamed.txt")
+        vfs.create_file("/Pictures/elsewhere.png", "x")
+    
+    assert direct() == [
+        ("created", "/Documents/new.txt", None),
+        ("renamed", "/Documents/renamed.txt", "/Documents/old.txt"),
+    ]
+    assert deep() == [
+        ("created", "/Documents/new.txt", None),
+        ("created", "/Documents/Notes/deep.txt", None),
+        ("renamed", "/Documents/renamed.txt", "/Documents/old.txt"),
+    ]
+
+
+def test_watched_directory_deleted_and_unwatched(open_vfs):
+    vfs = open_vfs()
+    batches = queue.Queue()
+    watch = vfs.watch("/Documents/Notes", False, batches.put)
+    vfs.delete("/Documents")
+    assert [(event.kind, event.path) for event in batches.get(timeout=5)] == [("deleted", "/Documents")]
+    
+    vfs.unwatch(watch)
+    other = watcher(vfs, "/", recursive=False)
+    vfs.create_directory("/Documents")
+    assert other() == [("created", "/Documents", None)]
+    assert batches.empty()